@@ -3,45 +3,27 @@ Agente RPA para Windows 7 - Servidor Flask API
 Soporta: Desktop automation + Excel/CSV
 """
 
+import json
 import logging
 import platform
 import os
 import sys
 from pathlib import Path
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 
+from log_pipeline import LogPipeline, read_log_since, stream_log_response, tail_log
+
 # Configurar logging
-# Crear archivo de log de texto legible (se sobrescribe en cada ejecución)
-log_file = 'agente_win7_output.txt'
-with open(log_file, 'w', encoding='utf-8') as f:
-    f.write('=' * 70 + '\n')
-    f.write('Agente RPA - Windows 7 - Log de Ejecución\n')
-    f.write('=' * 70 + '\n\n')
-
-# Handler para archivo de texto legible (solo INFO y superiores, sin formato complejo)
-file_handler = logging.FileHandler(log_file, encoding='utf-8', mode='a')
-file_handler.setLevel(logging.DEBUG)
-file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-
-# Handler para archivo de log técnico (formato completo)
-technical_log_handler = logging.FileHandler('agente_win7.log', encoding='utf-8')
-technical_log_handler.setLevel(logging.DEBUG)
-technical_log_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-
-# Handler para consola
-console_handler = logging.StreamHandler(sys.stdout)
-console_handler.setLevel(logging.INFO)
-console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-
-# Configurar logging root
-logging.basicConfig(
-    level=logging.DEBUG,
-    handlers=[
-        console_handler,
-        file_handler,
-        technical_log_handler
-    ]
+# Pipeline asíncrono: los handlers de consola, log legible (se sobrescribe en
+# cada ejecución) y log técnico (rota por tamaño) escriben desde un thread
+# en background; el executor y el picker solo encolan registros
+log_pipeline = LogPipeline.setup(
+    output_file='agente_win7_output.txt',
+    technical_file='agente_win7.log',
+    header=('=' * 70 + '\n' +
+            'Agente RPA - Windows 7 - Log de Ejecución\n' +
+            '=' * 70 + '\n\n')
 )
 
 logger = logging.getLogger(__name__)
@@ -67,9 +49,11 @@ CORS(app, origins=[
 # Importar motores de automatización
 try:
     from engine import DesktopEngine, ExcelEngine, WorkflowExecutor, ElementPicker
+    from engine.desktop import DesktopEngineError
+    from engine.ui_tree import diff_snapshots
 
     # Inicializar motores globales
-    desktop_engine = DesktopEngine(timeout=30)
+    desktop_engine = DesktopEngine(backend='auto', timeout=30)  # Backend por app (probe + cache)
     excel_engine = ExcelEngine(use_com=False)  # Pandas por defecto
     executor = WorkflowExecutor(desktop_engine, excel_engine)
     element_picker = ElementPicker()  # Singleton
@@ -174,6 +158,55 @@ def execute_workflow():
         }), 500
 
 
+@app.route('/execute/preflight', methods=['POST'])
+def preflight_workflow():
+    """
+    Valida los selectores de un workflow sin ejecutarlo
+
+    Resuelve todos los selectores (incluidos los de loops e if/else)
+    contra un único snapshot del árbol de la ventana conectada.
+
+    Body: el mismo workflow que /execute
+    Query params:
+        handle: Handle de la ventana a validar (opcional)
+
+    Returns:
+        {
+            "status": "ok" | "failed",
+            "summary": {"total": 12, "ok": 10, "ambiguous": 1, "not_found": 1},
+            "snapshot": {"id": 3, "count": 240, "build_ms": 410.5, "truncated": false},
+            "selectors": [
+                {"node_id": "n3", "action": "type", "selector": "name:RUC|control_type:Edit",
+                 "strategy": "title+control_type", "matches": 2, "status": "ambiguous",
+                 "latency_ms": 0.4}
+            ]
+        }
+    """
+    try:
+        if not executor:
+            return jsonify({
+                'status': 'error',
+                'error': 'Executor no inicializado correctamente'
+            }), 500
+
+        workflow = request.json
+        if not workflow:
+            return jsonify({
+                'status': 'error',
+                'error': 'Body vacío. Se requiere workflow en formato JSON'
+            }), 400
+
+        result = executor.preflight(workflow, handle=request.args.get('handle', type=int))
+        return jsonify(result), 200
+
+    except Exception as e:
+        logger.error(f"Error en preflight de workflow: {e}")
+        return jsonify({
+            'status': 'error',
+            'error': str(e)
+        }), 500
+
+
 @app.route('/execute/stop', methods=['POST'])
 def stop_execution():
     """
@@ -416,15 +449,21 @@ def start_picker():
     elementos resaltados en rojo. CTRL+Click captura el elemento.
     ESC cancela la captura.
     
+    Con "session": true el picker no se detiene tras cada captura: cada
+    CTRL+Click se encola y se obtienen todas con GET /picker/captures.
+    ESC o /picker/stop terminan la sesión.
+    
     Body:
         {
-            "mode": "desktop" | "web"
+            "mode": "desktop" | "web",
+            "session": false
         }
     
     Returns:
         {
             "status": "started",
-            "mode": "desktop"
+            "mode": "desktop",
+            "session": false
         }
     """
     try:
@@ -436,16 +475,18 @@ def start_picker():
         
         data = request.json or {}
         mode = data.get('mode', 'desktop')
+        session = bool(data.get('session', False))
         
-        logger.info(f"Iniciando element picker en modo: {mode}")
+        logger.info(f"Iniciando element picker en modo: {mode} (sesión: {session})")
         
         # Iniciar el picker
-        success = element_picker.start(mode=mode)
+        success = element_picker.start(mode=mode, session=session)
         
         if success:
             return jsonify({
                 'status': 'started',
-                'mode': mode
+                'mode': mode,
+                'session': session
         }), 200
         else:
             return jsonify({
@@ -527,6 +568,42 @@ def get_picker_result():
         return jsonify({'status': 'error', 'error': str(e)}), 500
 
 
+@app.route('/picker/captures', methods=['GET'])
+def get_picker_captures():
+    """
+    Obtiene (y descarta) las capturas acumuladas de una sesión del picker.
+    
+    Los selectores de todas las capturas se calculan juntos, con un
+    snapshot del árbol por ventana. Se puede llamar durante la sesión o
+    después de terminarla.
+    
+    Returns:
+        {
+            "status": "success",
+            "active": true,
+            "captures": [
+                {"index": 1, "selector": "...", "properties": {...}, "screenshot": "..."},
+                ...
+            ]
+        }
+    """
+    try:
+        if not element_picker:
+            return jsonify({
+                'status': 'error',
+                'error': 'Element picker no disponible'
+            }), 500
+        
+        result = element_picker.drain_captures()
+        if result.get('status') == 'error':
+            return jsonify(result), 400
+        return jsonify(result), 200
+
+    except Exception as e:
+        logger.error(f"Error obteniendo capturas del picker: {e}")
+        return jsonify({'status': 'error', 'error': str(e)}), 500
+
+
 @app.route('/picker/stop', methods=['POST'])
 def stop_picker():
     """
@@ -559,6 +636,169 @@ def stop_picker():
 
 # ==================== DESKTOP AUTOMATION ====================
 
+@app.route('/desktop/backends', methods=['GET', 'DELETE'])
+def desktop_backends():
+    """
+    Consulta o reinicia el cache de backends por aplicación
+
+    GET retorna el backend elegido por aplicación con las mediciones del probe.
+    DELETE descarta el cache (query param opcional `app` = "proceso|clase").
+
+    Returns:
+        {
+            "backends": {
+                "sistema.exe|ThunderRT6FormDC": {
+                    "backend": "win32",
+                    "probed_at": 1734900000.0,
+                    "results": {"win32": {...}, "uia": {...}}
+                }
+            }
+        }
+    """
+    try:
+        if not desktop_engine or not desktop_engine.backend_registry:
+            return jsonify({'error': 'Selección automática de backend no disponible'}), 500
+
+        registry = desktop_engine.backend_registry
+        if request.method == 'DELETE':
+            registry.forget(request.args.get('app'))
+
+        return jsonify({'backends': registry.get_entries()}), 200
+
+    except Exception as e:
+        logger.error(f"Error consultando backends: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/desktop/selector-stats', methods=['GET', 'DELETE'])
+def desktop_selector_stats():
+    """
+    Consulta o reinicia el historial de estrategias de selector por aplicación
+
+    GET retorna intentos, éxitos y latencias por tipo de estrategia.
+    DELETE descarta el historial (query param opcional `app` = "proceso|clase").
+
+    Returns:
+        {
+            "apps": {
+                "sistema.exe|ThunderRT6FormDC": {
+                    "path": {"attempts": 40, "successes": 40, "samples": [...]},
+                    "title+control_type": {"attempts": 12, "successes": 9, "samples": [...]}
+                }
+            }
+        }
+    """
+    try:
+        if not desktop_engine:
+            return jsonify({'error': 'Desktop engine no disponible'}), 500
+
+        stats = desktop_engine.selector_stats
+        if request.method == 'DELETE':
+            stats.forget(request.args.get('app'))
+
+        return jsonify({'apps': stats.get_entries(request.args.get('app'))}), 200
+
+    except Exception as e:
+        logger.error(f"Error consultando historial de selectores: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+def _compact_json(payload: dict, status: int = 200) -> Response:
+    """Respuesta JSON sin espacios (snapshots de árbol pueden tener miles de nodos)"""
+    body = json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+    return Response(body, status=status, mimetype='application/json')
+
+
+@app.route('/desktop/tree', methods=['GET', 'DELETE'])
+def desktop_tree():
+    """
+    Serializa el árbol de elementos de una ventana en un solo recorrido
+
+    Query params:
+        handle: Handle de la ventana (por defecto, la app conectada)
+        max_depth: Profundidad máxima (default 40)
+        max_nodes: Nodos máximos (default 5000)
+        max_age: Antigüedad aceptada del cache en segundos (default 5)
+        refresh: "1" para ignorar el cache
+
+    DELETE descarta los snapshots cacheados (de `handle` o todos).
+
+    Returns:
+        {
+            "id": 12, "hwnd": 197890, "count": 153, "truncated": false,
+            "fields": ["parent", "depth", "ct", "cls", "name", "aid", "idx", "rect", "handle"],
+            "nodes": [[null, 0, "Window", "ThunderRT6FormDC", "Sistema", null, 0, [0, 0, 800, 600], 197890], ...]
+        }
+    """
+    try:
+        if not desktop_engine:
+            return jsonify({'error': 'Desktop engine no disponible'}), 500
+
+        handle = request.args.get('handle', type=int)
+        if request.method == 'DELETE':
+            desktop_engine.tree_cache.clear(handle)
+            return jsonify({'status': 'cleared', 'cache': desktop_engine.tree_cache.get_stats()}), 200
+
+        snapshot = desktop_engine.snapshot_tree(
+            handle=handle,
+            max_depth=request.args.get('max_depth', default=40, type=int),
+            max_nodes=request.args.get('max_nodes', default=5000, type=int),
+            max_age=request.args.get('max_age', type=float),
+            refresh=request.args.get('refresh') == '1'
+        )
+        return _compact_json(snapshot.to_compact())
+
+    except DesktopEngineError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error serializando árbol de ventana: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/desktop/tree/diff', methods=['GET'])
+def desktop_tree_diff():
+    """
+    Compara dos snapshots de la misma ventana
+
+    Query params:
+        base: ID de un snapshot cacheado
+        target: ID de otro snapshot (por defecto, un recorrido nuevo de la misma ventana)
+
+    Returns:
+        {
+            "base": 12, "target": 13,
+            "added": [{"key": "Window.X[0]/Pane.Y[0]/Edit.Z[2]", "node": [...]}],
+            "removed": [...],
+            "changed": [{"key": "...", "changes": {"name": ["antes", "después"]}}]
+        }
+    """
+    try:
+        if not desktop_engine:
+            return jsonify({'error': 'Desktop engine no disponible'}), 500
+
+        base_id = request.args.get('base', type=int)
+        base = desktop_engine.tree_cache.find(base_id) if base_id else None
+        if base is None:
+            return jsonify({'error': f'Snapshot base no encontrado: {base_id}'}), 404
+
+        target_id = request.args.get('target', type=int)
+        if target_id:
+            target = desktop_engine.tree_cache.find(target_id)
+            if target is None:
+                return jsonify({'error': f'Snapshot target no encontrado: {target_id}'}), 404
+        else:
+            target = desktop_engine.snapshot_tree(handle=base.hwnd, max_depth=base.max_depth,
+                                                  max_nodes=base.max_nodes, refresh=True)
+
+        return _compact_json(diff_snapshots(base, target))
+
+    except DesktopEngineError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error comparando snapshots: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/desktop/windows', methods=['GET'])
 def list_windows():
     """
@@ -678,6 +918,9 @@ def run_diagnostic():
                     'version': None
                 }
 
+        # Estado del pipeline de logging
+        diagnostic['logging'] = log_pipeline.get_stats()
+
         # Estado de los motores
         diagnostic['engines'] = {
             'desktop': desktop_engine is not None,
@@ -699,30 +942,48 @@ def get_logs():
     """
     Retorna logs recientes del agente
 
+    Lee el log técnico desde el final por bloques: el costo depende de las
+    líneas pedidas, no del tamaño del historial.
+
     Query params:
-        - lines: Número de líneas a retornar (default: 50)
+        - lines: Número de líneas a retornar (default: 50, alias: limit)
+        - since: Cursor en bytes de una respuesta anterior; retorna solo
+                 lo escrito después (default: últimas N líneas)
+        - level: Nivel mínimo (DEBUG, INFO, WARNING, ERROR, CRITICAL)
+        - logger: Prefijo del logger (ej: engine.executor)
 
     Returns:
         {
-            "logs": [str]
+            "logs": [str],
+            "next_since": int  // Cursor para la próxima consulta
         }
     """
     try:
-        lines = int(request.args.get('lines', 50))
+        lines = int(request.args.get('lines', request.args.get('limit', 50)))
+        since = request.args.get('since')
+        level = request.args.get('level')
+        logger_name = request.args.get('logger')
 
         log_file = Path(__file__).parent / 'agente_win7.log'
 
         if not log_file.exists():
-            return jsonify({'logs': []}), 200
-
-        # Leer últimas N líneas del log
-        with open(log_file, 'r', encoding='utf-8') as f:
-            all_lines = f.readlines()
-            recent_logs = all_lines[-lines:] if len(all_lines) > lines else all_lines
-
-        return jsonify({
-            'logs': [line.strip() for line in recent_logs]
-        }), 200
+            return jsonify({'logs': [], 'next_since': 0}), 200
+
+        try:
+            if since is not None:
+                recent_logs, cursor = read_log_since(
+                    str(log_file), int(since), lines, level, logger_name
+                )
+            else:
+                recent_logs, cursor = tail_log(str(log_file), lines, level, logger_name)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        return Response(
+            stream_log_response(recent_logs, cursor),
+            status=200,
+            mimetype='application/json'
+        )
 
     except Exception as e:
         logger.error(f"Error obteniendo logs: {e}")
@@ -0,0 +1,290 @@
+"""
+Selección automática de backend pywinauto (uia / win32) por aplicación
+Prueba ambos backends una vez por aplicación destino, mide latencia y éxito,
+y persiste el ganador por nombre de proceso + clase de ventana
+
+Compatible con Windows 7 (Python 3.8)
+"""
+
+import ctypes
+import ctypes.wintypes
+import json
+import logging
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from pywinauto import Desktop
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+# Orden de preferencia ante empate (win32 es el más estable en Windows 7)
+BACKENDS = ('win32', 'uia')
+DEFAULT_BACKEND = 'win32'
+
+# Archivo de cache persistente (agente-win7/backend_cache.json)
+DEFAULT_STORE_PATH = Path(__file__).parent.parent / 'backend_cache.json'
+
+# Hijos a inspeccionar durante el probe (acota el costo en ventanas grandes)
+PROBE_CHILD_LIMIT = 20
+
+# Espera máxima a un probe en curso de otro thread (UIA puede colgarse en Windows 7)
+PROBE_WAIT_TIMEOUT = 30.0  # segundos
+
+# En Windows 7 UIA se prueba solo si win32 no sirve (falla o no ve hijos:
+# WPF, Qt, Java): sus access violations y cuelgues son el riesgo del probe
+IS_WINDOWS_7 = hasattr(sys, 'getwindowsversion') and sys.getwindowsversion()[:2] <= (6, 1)
+
+GA_ROOT = 2
+
+
+class BackendRegistry:
+    """
+    Cache persistente del backend ganador por aplicación
+
+    La clave es "process_name|class_name" de la ventana top-level, así
+    el picker y el executor usan el mismo backend para la misma app.
+    """
+
+    def __init__(self, store_path: Optional[Path] = None,
+                 default_backend: str = DEFAULT_BACKEND):
+        """
+        Inicializa el registro
+
+        Args:
+            store_path: Archivo JSON donde persistir resultados
+            default_backend: Backend a usar si no se puede identificar la app
+        """
+        self.store_path = Path(store_path) if store_path else DEFAULT_STORE_PATH
+        self.default_backend = default_backend
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._desktops: Dict[str, Desktop] = {}
+        # Probes en curso: clave de app -> evento que se activa al publicar el resultado
+        self._pending: Dict[str, threading.Event] = {}
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+        self._user32 = ctypes.windll.user32
+        self._load()
+
+    # ==================== PERSISTENCIA ====================
+
+    def _load(self) -> None:
+        try:
+            if self.store_path.exists():
+                self._entries = json.loads(self.store_path.read_text(encoding='utf-8'))
+                logger.info(f"Cache de backends cargado: {len(self._entries)} aplicaciones")
+        except Exception as e:
+            logger.warning(f"No se pudo leer cache de backends: {e}")
+            self._entries = {}
+
+    def _save(self) -> None:
+        """Persiste el cache; el JSON se arma bajo el lock y se escribe fuera de él"""
+        with self._lock:
+            data = json.dumps(self._entries, indent=2)
+        try:
+            with self._save_lock:
+                tmp_path = self.store_path.with_suffix('.tmp')
+                tmp_path.write_text(data, encoding='utf-8')
+                tmp_path.replace(self.store_path)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar cache de backends: {e}")
+
+    # ==================== IDENTIFICACIÓN DE APP ====================
+
+    def root_window_at(self, x: int, y: int) -> Optional[int]:
+        """Retorna el handle de la ventana top-level bajo un punto de pantalla"""
+        try:
+            point = ctypes.wintypes.POINT(x, y)
+            hwnd = self._user32.WindowFromPoint(point)
+            if not hwnd:
+                return None
+            return self._user32.GetAncestor(hwnd, GA_ROOT) or hwnd
+        except Exception:
+            return None
+
+    def app_key(self, hwnd: int) -> Optional[str]:
+        """
+        Clave de aplicación para un handle: "process_name|class_name"
+
+        Solo usa llamadas user32 (no accesibilidad), por eso es barata.
+        """
+        try:
+            buffer = ctypes.create_unicode_buffer(256)
+            self._user32.GetClassNameW(hwnd, buffer, 256)
+            class_name = buffer.value
+
+            pid = ctypes.wintypes.DWORD()
+            self._user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+            process_name = str(pid.value)
+            if PSUTIL_AVAILABLE and pid.value:
+                try:
+                    process_name = psutil.Process(pid.value).name()
+                except Exception:
+                    pass
+
+            return f"{process_name.lower()}|{class_name}"
+        except Exception as e:
+            logger.debug(f"No se pudo identificar la aplicación de {hwnd}: {e}")
+            return None
+
+    # ==================== SELECCIÓN ====================
+
+    def get_backend(self, hwnd: Optional[int], wait: bool = True) -> str:
+        """
+        Retorna el backend para la aplicación dueña de `hwnd`
+
+        La primera vez para una aplicación se ejecuta el probe y se persiste
+        el resultado. El probe corre fuera del lock: los demás usuarios del
+        registro (get_desktop, otras apps) no lo esperan.
+
+        Args:
+            hwnd: Ventana de la aplicación
+            wait: False en el hover del picker: no se espera ningún probe; si
+                  la app no tiene resultado, el probe corre en segundo plano y
+                  mientras tanto se usa default_backend
+        """
+        if not hwnd:
+            return self.default_backend
+
+        key = self.app_key(hwnd)
+        if key is None:
+            return self.default_backend
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                return entry['backend']
+            done = self._pending.get(key)
+            owner = done is None
+            if owner:
+                done = self._pending[key] = threading.Event()
+
+        if owner and wait:
+            self._run_probe(key, hwnd, done)
+        elif owner:
+            threading.Thread(target=self._run_probe, args=(key, hwnd, done),
+                             name='backend-probe', daemon=True).start()
+        if not wait:
+            return self.default_backend
+
+        if not done.wait(PROBE_WAIT_TIMEOUT):
+            logger.warning(f"Probe de backend para {key} sin terminar; se usa {self.default_backend}")
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry['backend'] if entry is not None else self.default_backend
+
+    def _run_probe(self, key: str, hwnd: int, done: threading.Event) -> None:
+        """Ejecuta el probe de una app y publica el resultado"""
+        try:
+            entry = self._probe(key, hwnd)
+            with self._lock:
+                self._entries[key] = entry
+            self._save()
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+            done.set()
+
+    def get_desktop(self, backend: str) -> Desktop:
+        """Retorna un Desktop pywinauto cacheado para el backend"""
+        with self._lock:
+            desktop = self._desktops.get(backend)
+            if desktop is None:
+                desktop = Desktop(backend=backend)
+                self._desktops[backend] = desktop
+            return desktop
+
+    def forget(self, key: Optional[str] = None) -> None:
+        """Descarta resultados (de una app o todos) para forzar un nuevo probe"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+        self._save()
+
+    def get_entries(self) -> Dict[str, Dict[str, Any]]:
+        """Retorna una copia del cache (para diagnóstico)"""
+        with self._lock:
+            return json.loads(json.dumps(self._entries))
+
+    def _probe(self, key: str, hwnd: int) -> Dict[str, Any]:
+        """
+        Prueba cada backend sobre la ventana y elige el ganador
+
+        En Windows 7, UIA solo se prueba si win32 falla o no ve hijos.
+        """
+        results = {}
+        for backend in BACKENDS:
+            if backend == 'uia' and IS_WINDOWS_7:
+                win32 = results.get('win32', {})
+                if win32.get('ok') and win32.get('children'):
+                    continue
+            results[backend] = self._probe_backend(backend, hwnd)
+
+        successful = [b for b in BACKENDS if results.get(b, {}).get('ok')]
+        if successful:
+            winner = min(successful, key=lambda b: (results[b]['latency_ms'], BACKENDS.index(b)))
+        else:
+            winner = self.default_backend
+
+        logger.info(f"Backend elegido para {key}: {winner} ({results})")
+        return {
+            'backend': winner,
+            'probed_at': time.time(),
+            'results': results
+        }
+
+    def _probe_backend(self, backend: str, hwnd: int) -> Dict[str, Any]:
+        """
+        Mide una búsqueda típica: ventana por handle, hijos y from_point al centro
+
+        Los access violations de UIA en Windows 7 llegan como OSError y
+        cuentan como fallo del backend.
+        """
+        start = time.perf_counter()
+        try:
+            window = self.get_desktop(backend).window(handle=hwnd).wrapper_object()
+            rect = window.rectangle()
+            children = window.children()
+            for child in children[:PROBE_CHILD_LIMIT]:
+                child.window_text()
+                child.rectangle()
+
+            center_x = (rect.left + rect.right) // 2
+            center_y = (rect.top + rect.bottom) // 2
+            self.get_desktop(backend).from_point(center_x, center_y)
+
+            return {
+                'ok': True,
+                'latency_ms': round((time.perf_counter() - start) * 1000, 2),
+                'children': len(children)
+            }
+        except Exception as e:
+            return {
+                'ok': False,
+                'latency_ms': round((time.perf_counter() - start) * 1000, 2),
+                'error': str(e)[:200]
+            }
+
+
+_registry: Optional[BackendRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_backend_registry() -> BackendRegistry:
+    """Retorna el registro compartido por DesktopEngine y ElementPicker"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = BackendRegistry()
+        return _registry
@@ -0,0 +1,92 @@
+"""
+Acceso al portapapeles de Windows (texto Unicode)
+Usado para pegar bloques de datos en grillas en una sola operación,
+conservando y restaurando el contenido previo del usuario
+
+Compatible con Windows 7 (Python 3.8)
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+try:
+    import win32clipboard
+    import win32con
+    CLIPBOARD_AVAILABLE = True
+except ImportError:
+    CLIPBOARD_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+# Otra aplicación puede tener el portapapeles abierto: reintentos breves
+OPEN_RETRIES = 10
+OPEN_RETRY_DELAY = 0.05  # segundos
+
+
+class ClipboardError(Exception):
+    """No se pudo leer o escribir el portapapeles"""
+    pass
+
+
+@contextmanager
+def _opened() -> Iterator[None]:
+    if not CLIPBOARD_AVAILABLE:
+        raise ClipboardError("pywin32 no está instalado (win32clipboard)")
+    last_error = None
+    for _ in range(OPEN_RETRIES):
+        try:
+            win32clipboard.OpenClipboard()
+            break
+        except Exception as e:
+            last_error = e
+            time.sleep(OPEN_RETRY_DELAY)
+    else:
+        raise ClipboardError(f"Portapapeles ocupado por otra aplicación: {last_error}")
+    try:
+        yield
+    finally:
+        win32clipboard.CloseClipboard()
+
+
+def get_text() -> Optional[str]:
+    """Texto actual del portapapeles (None si no contiene texto)"""
+    with _opened():
+        if not win32clipboard.IsClipboardFormatAvailable(win32con.CF_UNICODETEXT):
+            return None
+        return win32clipboard.GetClipboardData(win32con.CF_UNICODETEXT)
+
+
+def set_text(text: str) -> None:
+    """Reemplaza el contenido del portapapeles por `text`"""
+    with _opened():
+        win32clipboard.EmptyClipboard()
+        win32clipboard.SetClipboardData(win32con.CF_UNICODETEXT, text)
+
+
+@contextmanager
+def preserved() -> Iterator[None]:
+    """
+    Restaura el texto previo del portapapeles al salir
+
+    Solo se conserva texto: si el usuario tenía otro formato (imagen,
+    archivos) el portapapeles queda vacío.
+    """
+    try:
+        previous = get_text()
+    except ClipboardError as e:
+        logger.debug(f"No se pudo leer el portapapeles previo: {e}")
+        previous = None
+    try:
+        yield
+    finally:
+        try:
+            if previous is not None:
+                set_text(previous)
+            else:
+                with _opened():
+                    win32clipboard.EmptyClipboard()
+        except ClipboardError as e:
+            logger.debug(f"No se pudo restaurar el portapapeles: {e}")
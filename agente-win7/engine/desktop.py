@@ -3,16 +3,46 @@ Motor de automatización Desktop con pywinauto
 Soporta aplicaciones Win32, WinForms y WPF
 """
 
+import ctypes
 import logging
 import time
-from typing import Dict, Optional, Any
-from pywinauto import Application, Desktop, findwindows
+from typing import Dict, List, Optional, Any, Tuple
+from pywinauto import Application, Desktop, findwindows, win32defines
+from pywinauto.controls.common_controls import ListViewWrapper as Win32ListViewWrapper
 from pywinauto.controls.uiawrapper import UIAWrapper
-from pywinauto.controls.win32_controls import ButtonWrapper
+from pywinauto.controls.win32_controls import ButtonWrapper, ComboBoxWrapper, ListBoxWrapper
+from pywinauto.remote_memory_block import RemoteMemoryBlock
+from pywinauto.timings import TimeoutError as WaitTimeoutError
+
+from . import clipboard
+from .backend_probe import get_backend_registry
+from .selector_stats import PHASE_ENABLED, PHASE_EXISTS, get_selector_stats, selector_kind
+from .ui_path import (KEY_CONTROL_TYPE, KEY_NAME, element_signature, match_segment,
+                      signature_matches)
+from .ui_tree import DEFAULT_MAX_DEPTH, DEFAULT_MAX_NODES, TreeCache, TreeSnapshot
+from .vision import TemplateMatcher, VisionSelectorError
 
 logger = logging.getLogger(__name__)
 
 
+# Tiempo por intento cuando un selector tiene estrategias alternativas:
+# se recorren en orden aprendido hasta agotar el timeout total
+FALLBACK_ATTEMPT_TIMEOUT = 2.0  # segundos
+
+# Espera máxima a que un elemento encontrado se habilite (click / escritura)
+ENABLED_TIMEOUT = 10  # segundos
+
+# Extracción de tablas: tipos de fila/encabezado en UIA y nodos máximos del recorrido
+TABLE_ROW_TYPES = ('DataItem', 'ListItem', 'TreeItem', 'Custom')
+TABLE_HEADER_TYPES = ('Header', 'HeaderItem')
+TABLE_MAX_NODES = 20000
+LISTVIEW_TEXT_CHARS = 1024  # caracteres máximos por celda de un ListView win32
+
+# Pegado de bloques: espera a que la grilla procese el pegado (por cada 100 filas)
+PASTE_SETTLE = 0.5  # segundos
+PASTE_SETTLE_PER_100_ROWS = 0.5  # segundos
+
+
 class DesktopEngineError(Exception):
     """Excepción base para errores del motor desktop"""
     pass
@@ -31,20 +61,31 @@ class WindowNotFoundError(DesktopEngineError):
 class DesktopEngine:
     """
     Motor de automatización para aplicaciones de escritorio Windows
-    Usa pywinauto con backend UIA (UI Automation) por defecto
+    Usa pywinauto con backend UIA (UI Automation) por defecto, o 'auto'
+    para elegir por aplicación el backend que ganó el probe (compartido con el picker)
     """
 
-    def __init__(self, backend: str = "uia", timeout: int = 30):
+    def __init__(self, backend: str = "uia", timeout: int = 30,
+                 adaptive_timeouts: bool = True):
         """
         Inicializa el motor desktop
 
         Args:
-            backend: Backend de pywinauto ('uia' o 'win32')
+            backend: Backend de pywinauto ('uia', 'win32' o 'auto')
             timeout: Timeout por defecto en segundos para operaciones
+            adaptive_timeouts: Usar por selector el timeout aprendido de su
+                historial de latencias (acotado por `timeout`)
         """
         self.backend = backend
         self.timeout = timeout
+        self.adaptive_timeouts = adaptive_timeouts
         self.current_app: Optional[Application] = None
+        self.current_backend: Optional[str] = None
+        self.backend_registry = get_backend_registry() if backend == 'auto' else None
+        self.vision = TemplateMatcher()
+        self.tree_cache = TreeCache()
+        self.selector_stats = get_selector_stats()
+        self._app_key: Optional[str] = None
         logger.info(f"DesktopEngine inicializado (backend: {backend}, timeout: {timeout}s)")
 
     def connect_to_window(self, window_title: Optional[str] = None,
@@ -76,9 +117,12 @@ class DesktopEngine:
             if not criteria:
                 raise ValueError("Debe proporcionar al menos un criterio de búsqueda")
 
-            app = Application(backend=self.backend).connect(**criteria, timeout=self.timeout)
+            backend = self._resolve_backend(criteria)
+            app = Application(backend=backend).connect(**criteria, timeout=self.timeout)
             self.current_app = app
-            logger.info(f"Conectado a ventana: {window_title or process_id}")
+            self.current_backend = backend
+            self._app_key = None
+            logger.info(f"Conectado a ventana: {window_title or process_id} (backend: {backend})")
             return app
 
         except findwindows.ElementNotFoundError as e:
@@ -99,23 +143,179 @@ class DesktopEngine:
             Objeto Application lanzado
         """
         try:
-            app = Application(backend=self.backend).start(path, timeout=self.timeout)
+            backend = self.default_backend
+            app = Application(backend=backend).start(path, timeout=self.timeout)
 
             if wait_for_idle:
                 app.wait_cpu_usage_lower(threshold=5, timeout=self.timeout)
 
+            # En modo auto, reconectar con el backend elegido para esta app
+            if self.backend_registry:
+                try:
+                    hwnd = app.top_window().handle
+                    chosen = self.backend_registry.get_backend(hwnd)
+                    if chosen != backend:
+                        app = Application(backend=chosen).connect(process=app.process)
+                        backend = chosen
+                except Exception as e:
+                    logger.warning(f"No se pudo elegir backend para {path}: {e}")
+
             self.current_app = app
-            logger.info(f"Aplicación lanzada: {path}")
+            self.current_backend = backend
+            self._app_key = None
+            logger.info(f"Aplicación lanzada: {path} (backend: {backend})")
             return app
 
         except Exception as e:
             logger.error(f"Error lanzando aplicación: {e}")
             raise
 
-    def find_element(self, selector: Dict[str, Any]) -> UIAWrapper:
+    def find_element(self, selector: Dict[str, Any],
+                     timeout: Optional[float] = None) -> UIAWrapper:
         """
         Encuentra un elemento en la ventana actual
 
+        Cada resolución se registra (éxito y latencia) en el historial de
+        selectores de la aplicación destino. Sin timeout explícito se usa el
+        aprendido para el selector (p99 × factor), así un elemento que
+        normalmente aparece en 200 ms falla en segundos y no en self.timeout.
+
+        Args:
+            selector: Dict con criterios de búsqueda (ver _find_single), o
+                - strategies: Lista de selectores alternativos; se prueban en
+                  el orden aprendido para la app (más rápido y confiable primero)
+            timeout: Timeout en segundos (aprendido o self.timeout si es None)
+
+        Returns:
+            Elemento encontrado
+
+        Raises:
+            ElementNotFoundError: Si no se encuentra el elemento
+        """
+        if selector.get('strategies'):
+            return self._find_ranked(selector['strategies'], timeout)
+        if timeout is None:
+            timeout = self._learned_timeout(selector) or self.timeout
+        return self._find_recorded(selector, timeout)
+
+    def _find_ranked(self, alternatives: List[Dict[str, Any]],
+                     timeout: Optional[float] = None) -> UIAWrapper:
+        """
+        Prueba las estrategias alternativas en orden aprendido hasta el timeout
+
+        Cada intento usa el timeout aprendido de esa estrategia, o
+        FALLBACK_ATTEMPT_TIMEOUT si no tiene historial, así una estrategia
+        rota no consume todo el timeout antes del fallback. Sin timeout
+        explícito, el total es la suma de los aprendidos (una sola pasada)
+        si todas tienen historial, o self.timeout si no.
+
+        Un intento cortado por ese tope no cuenta como fallo (el elemento
+        puede no haber aparecido todavía). Si después otra estrategia lo
+        encuentra, las cortadas se verifican sin espera: ahí el elemento
+        existe, así que no encontrarlo sí es un fallo de la estrategia.
+        """
+        ranked = self.selector_stats.rank(self._target_app_key(), alternatives)
+        learned = [self._learned_timeout(selector) for selector in ranked]
+        if timeout is None:
+            timeout = sum(learned) if all(learned) else self.timeout
+        deadline = time.time() + timeout
+        errors = []
+        capped: List[Dict[str, Any]] = []
+
+        while True:
+            for position, selector in enumerate(ranked):
+                remaining = max(0.0, deadline - time.time())
+                attempt_timeout = min(learned[position] or FALLBACK_ATTEMPT_TIMEOUT, timeout)
+                cut = attempt_timeout < remaining
+                try:
+                    element = self._find_recorded(selector, min(attempt_timeout, remaining),
+                                                  record_failure=not cut)
+                except ElementNotFoundError as e:
+                    errors.append(f"{selector_kind(selector)}: {e}")
+                    if cut and selector not in capped:
+                        capped.append(selector)
+                    continue
+                if position > 0:
+                    logger.info(f"Elemento encontrado con estrategia alternativa: {selector_kind(selector)}")
+                for other in capped:
+                    if other is not selector:
+                        try:
+                            self._find_recorded(other, 0)
+                        except ElementNotFoundError:
+                            pass
+                return element
+
+            if time.time() >= deadline:
+                raise ElementNotFoundError(
+                    f"Ninguna estrategia encontró el elemento: {'; '.join(errors[-len(ranked):])}"
+                )
+            time.sleep(0.5)
+
+    def _find_recorded(self, selector: Dict[str, Any], timeout: float,
+                       record_failure: bool = True) -> UIAWrapper:
+        """Resuelve una estrategia y registra el resultado en el historial"""
+        if selector.get('coordinates'):
+            return self._find_single(selector, timeout)
+
+        start = time.perf_counter()
+        try:
+            element = self._find_single(selector, timeout)
+        except ElementNotFoundError:
+            if record_failure:
+                self.selector_stats.record(self._target_app_key(), selector,
+                                           (time.perf_counter() - start) * 1000, False)
+            raise
+        self.selector_stats.record(self._target_app_key(), selector,
+                                   (time.perf_counter() - start) * 1000, True)
+        return element
+
+    def _learned_timeout(self, selector: Dict[str, Any], phase: str = PHASE_EXISTS,
+                         maximum: Optional[float] = None) -> Optional[float]:
+        """Timeout aprendido del selector en segundos, o None si no hay historial suficiente"""
+        if not self.adaptive_timeouts or selector.get('coordinates'):
+            return None
+        maximum = self.timeout if maximum is None else maximum
+        learned = self.selector_stats.timeout_for(self._target_app_key(), selector, maximum, phase)
+        if learned is not None:
+            logger.debug(f"Timeout aprendido ({phase}) {learned}s para {selector_kind(selector)}")
+        return learned
+
+    def _wait_enabled(self, element: UIAWrapper, selector: Dict[str, Any]) -> None:
+        """
+        Espera a que el elemento esté habilitado con el timeout aprendido
+
+        Raises:
+            DesktopEngineError: Si no se habilita antes del timeout
+        """
+        timeout = self._learned_timeout(selector, PHASE_ENABLED, ENABLED_TIMEOUT) or ENABLED_TIMEOUT
+        start = time.perf_counter()
+        try:
+            element.wait('enabled', timeout=timeout)
+        except WaitTimeoutError:
+            self.selector_stats.record(self._target_app_key(), selector,
+                                       (time.perf_counter() - start) * 1000, False, PHASE_ENABLED)
+            raise DesktopEngineError(f"El elemento no se habilitó en {timeout}s: {selector}")
+        self.selector_stats.record(self._target_app_key(), selector,
+                                   (time.perf_counter() - start) * 1000, True, PHASE_ENABLED)
+
+    def _target_app_key(self) -> str:
+        """Clave "proceso|clase" de la app conectada ('desktop' si no hay)"""
+        if self._app_key is None:
+            key = None
+            try:
+                if self.current_app:
+                    key = get_backend_registry().app_key(self.current_app.top_window().handle)
+            except Exception as e:
+                logger.debug(f"No se pudo identificar la app conectada: {e}")
+            if key is None:
+                return 'desktop'
+            self._app_key = key
+        return self._app_key
+
+    def _find_single(self, selector: Dict[str, Any], timeout: float) -> UIAWrapper:
+        """
+        Resuelve un selector de una sola estrategia
+
         Args:
             selector: Dict con criterios de búsqueda
                 - auto_id: AutomationId del elemento
@@ -124,6 +324,9 @@ class DesktopEngine:
                 - class_name: Nombre de clase del control
                 - found_index: Índice del elemento si hay múltiples (0-based)
                 - coordinates: [x, y] para click directo por coordenadas
+                - image: ID de imagen de referencia (template matching sobre la ventana)
+                - path: Lista de segmentos desde la ventana top-level (selector 'path:')
+            timeout: Timeout en segundos
 
         Returns:
             Elemento encontrado
@@ -138,10 +341,18 @@ class DesktopEngine:
                 # Retornar un wrapper especial para coordenadas
                 # El método click() manejará esto
                 return {'type': 'coordinates', 'x': coords[0], 'y': coords[1]}
+
+        # Caso especial: imagen de referencia (se resuelve a coordenadas)
+        if selector.get('image'):
+            return self._find_by_image(selector['image'], timeout)
         
         if not self.current_app:
             raise DesktopEngineError("No hay aplicación conectada. Use connect_to_window() primero")
 
+        # Ruta de ancestros: un nivel de hijos por segmento, sin recorrer todo el árbol
+        if selector.get('path'):
+            return self._find_by_path(selector['path'], timeout)
+
         try:
             # Construir criterios de búsqueda
             criteria = {}
@@ -209,13 +420,15 @@ class DesktopEngine:
                 # Buscar primer elemento (sin índice)
                 element = window.child_window(**criteria)
             
-            element.wait('exists', timeout=self.timeout)
+            element.wait('exists', timeout=timeout)
 
             logger.info(f"Elemento encontrado: {criteria} (found_index={found_index})")
             return element
 
-        except findwindows.ElementNotFoundError as e:
+        except (findwindows.ElementNotFoundError, WaitTimeoutError):
             raise ElementNotFoundError(f"Elemento no encontrado: {selector}")
+        except ElementNotFoundError:
+            raise
         except Exception as e:
             logger.error(f"Error buscando elemento: {e}")
             raise
@@ -248,7 +461,7 @@ class DesktopEngine:
                 return
 
             # Asegurar que el elemento esté habilitado y visible
-            element.wait('enabled', timeout=10)
+            self._wait_enabled(element, selector)
             element.set_focus()
 
             if double:
@@ -278,7 +491,20 @@ class DesktopEngine:
         """
         try:
             element = self.find_element(selector)
-            element.wait('enabled', timeout=10)
+
+            # Caso especial: coordenadas (o imagen resuelta) - click y teclado
+            if isinstance(element, dict) and element.get('type') == 'coordinates':
+                import pywinauto.keyboard as keyboard
+                import pywinauto.mouse as mouse
+                mouse.click(coords=(element['x'], element['y']))
+                if clear_first:
+                    keyboard.send_keys('^a{BACKSPACE}')
+                keyboard.send_keys(text, with_spaces=True, pause=0.05)
+                logger.info(f"Texto escrito: '{text}' en coordenadas ({element['x']}, {element['y']})")
+                time.sleep(0.3)
+                return
+
+            self._wait_enabled(element, selector)
             element.set_focus()
 
             if clear_first:
@@ -316,6 +542,248 @@ class DesktopEngine:
             logger.error(f"Error leyendo texto: {e}")
             raise
 
+    def extract_table(self, selector: Dict[str, Any], max_rows: Optional[int] = None,
+                      cell_values: bool = False) -> Dict[str, Any]:
+        """
+        Lee filas y columnas de una grilla, lista o tabla en un solo recorrido
+
+        ListView/ListBox/ComboBox win32 se leen con sus mensajes de lista
+        (todas las celdas en una pasada); en UIA se toma un snapshot del
+        control (filas y celdas leídas juntas desde element_info) en lugar
+        de consultar celda por celda.
+
+        Args:
+            selector: Criterios para encontrar el control
+            max_rows: Filas máximas a leer (None = todas)
+            cell_values: En UIA, leer el ValuePattern de cada celda (más lento,
+                         necesario en grillas cuyo nombre de celda no es el valor)
+
+        Returns:
+            Dict con 'columns', 'rows' (lista de dicts columna -> texto),
+            'truncated' y 'method' ('win32_listview', 'win32_list' o 'uia_tree')
+
+        Raises:
+            ElementNotFoundError: Si no se encuentra el control
+            DesktopEngineError: Si el selector no apunta a un elemento
+        """
+        start = time.perf_counter()
+        element = self.find_element(selector)
+        if isinstance(element, dict):
+            raise DesktopEngineError("extract_table requiere un selector de elemento, no de coordenadas/imagen")
+
+        try:
+            # child_window() devuelve un WindowSpecification: el tipo real está en el wrapper
+            if hasattr(element, 'wrapper_object'):
+                element = element.wrapper_object()
+            if isinstance(element, Win32ListViewWrapper):
+                columns, cells, truncated = self._table_from_listview(element, max_rows)
+                method = 'win32_listview'
+            elif isinstance(element, (ListBoxWrapper, ComboBoxWrapper)):
+                texts = element.item_texts()
+                truncated = max_rows is not None and len(texts) > max_rows
+                columns, cells = [''], [[text] for text in texts[:max_rows]]
+                method = 'win32_list'
+            else:
+                columns, cells, truncated = self._table_from_tree(element, max_rows, cell_values)
+                method = 'uia_tree'
+        except DesktopEngineError:
+            raise
+        except Exception as e:
+            raise DesktopEngineError(f"No se pudo leer la tabla: {e}")
+
+        columns = self._table_column_names(columns, max((len(row) for row in cells), default=0))
+        rows = [dict(zip(columns, row + [''] * (len(columns) - len(row)))) for row in cells]
+
+        elapsed_ms = round((time.perf_counter() - start) * 1000, 2)
+        logger.info(f"Tabla extraída ({method}): {len(rows)} filas x {len(columns)} columnas "
+                    f"en {elapsed_ms} ms")
+        return {'columns': columns, 'rows': rows, 'truncated': truncated, 'method': method}
+
+    @staticmethod
+    def _table_from_listview(element: Any, max_rows: Optional[int]) -> tuple:
+        """
+        ListView win32: encabezados y celdas columna por columna
+
+        get_item(row, col).text() reserva memoria en el proceso de la app por
+        cada celda. Aquí se reserva un solo bloque para toda la tabla: el
+        LVITEM se escribe una vez por columna y cada celda es un
+        LVM_GETITEMTEXT (índice de fila en wParam) más la lectura del texto.
+        """
+        headers = [column.get('text', '') for column in element.columns()]
+        width = max(1, len(headers))
+        count = element.item_count()
+        truncated = max_rows is not None and count > max_rows
+        if truncated:
+            count = max_rows
+
+        unicode = element.is_unicode()
+        message = win32defines.LVM_GETITEMTEXTW if unicode else win32defines.LVM_GETITEMTEXTA
+        char_size = 2 if unicode else 1
+        item = element.LVITEM()
+        text = element.create_buffer(LISTVIEW_TEXT_CHARS)
+        remote = RemoteMemoryBlock(element, size=ctypes.sizeof(item) + ctypes.sizeof(text))
+        text_address = remote.Address() + ctypes.sizeof(item)
+
+        cells = [[''] * width for _ in range(count)]
+        try:
+            for col in range(width):
+                item.mask = win32defines.LVIF_TEXT
+                item.iSubItem = col
+                item.pszText = text_address
+                item.cchTextMax = LISTVIEW_TEXT_CHARS
+                remote.Write(item)
+                for row in range(count):
+                    length = element.send_message(message, row, remote)
+                    if length:
+                        remote.Read(text, text_address, (length + 1) * char_size)
+                        cells[row][col] = element.text_decode(text.value)
+        finally:
+            remote.CleanUp()
+        return headers, cells, truncated
+
+    def _table_from_tree(self, element: Any, max_rows: Optional[int], cell_values: bool) -> tuple:
+        """
+        Grilla UIA: tabla -> filas -> celdas desde un snapshot de 2 niveles
+
+        Las filas de encabezado (Header o filas cuyas celdas son todas
+        HeaderItem) aportan los nombres de columna; las celdas de encabezado
+        de fila (WinForms DataGridView) se omiten.
+        """
+        snapshot = TreeSnapshot(element, max_depth=2, max_nodes=TABLE_MAX_NODES)
+        nodes = snapshot.nodes
+        headers: List[str] = []
+        cells: List[List[str]] = []
+        truncated = snapshot.truncated
+
+        for row_index in nodes[0].children:
+            row = nodes[row_index]
+            row_type = row.signature.get(KEY_CONTROL_TYPE)
+            children = [nodes[i] for i in row.children]
+            is_header = row_type == 'Header' or (
+                children and all(c.signature.get(KEY_CONTROL_TYPE) in TABLE_HEADER_TYPES
+                                 for c in children))
+            if is_header:
+                if not headers:
+                    headers = [c.signature.get(KEY_NAME) or '' for c in children]
+                continue
+            if row_type not in TABLE_ROW_TYPES:
+                continue
+            if max_rows is not None and len(cells) >= max_rows:
+                truncated = True
+                break
+
+            data = [c for c in children if c.signature.get(KEY_CONTROL_TYPE) not in TABLE_HEADER_TYPES]
+            if not data:
+                # Lista simple: la fila es la celda
+                data = [row]
+            cells.append([self._cell_text(c, cell_values) for c in data])
+
+        width = max((len(row) for row in cells), default=0)
+        if cells and len(headers) > width:
+            # Encabezado de filas (esquina superior izquierda) sin celda correspondiente
+            headers = headers[len(headers) - width:]
+        return headers, cells, truncated
+
+    @staticmethod
+    def _cell_text(node: Any, cell_values: bool) -> str:
+        if cell_values:
+            try:
+                value = node.element.iface_value.CurrentValue
+                if value is not None:
+                    return str(value)
+            except Exception:
+                pass
+        return node.signature.get(KEY_NAME) or ''
+
+    @staticmethod
+    def _table_column_names(headers: List[str], width: int) -> List[str]:
+        """Nombres de columna únicos: vacíos -> col_N, repetidos -> nombre_N"""
+        names: List[str] = []
+        seen: Dict[str, int] = {}
+        for position in range(max(width, len(headers))):
+            name = (headers[position] if position < len(headers) else '').strip()
+            name = name or f"col_{position + 1}"
+            if name in seen:
+                seen[name] += 1
+                name = f"{name}_{seen[name]}"
+            seen.setdefault(name, 1)
+            names.append(name)
+        return names
+
+    def paste_block(self, selector: Dict[str, Any], cells: List[List[str]],
+                    verify_selector: Optional[Dict[str, Any]] = None,
+                    verify_rows: Optional[List[int]] = None,
+                    offset: Tuple[int, int] = (0, 0)) -> Dict[str, Any]:
+        """
+        Pega un bloque de celdas en una grilla con una sola operación
+
+        Selecciona la celda inicial, copia el bloque como TSV al portapapeles
+        y envía Ctrl+V. El portapapeles previo del usuario se restaura.
+
+        Args:
+            selector: Celda inicial (o la grilla, si pega en la celda activa)
+            cells: Filas del bloque (lista de listas de textos)
+            verify_selector: Grilla a releer con extract_table para verificar
+            verify_rows: Filas del bloque (índices desde 0) a verificar
+            offset: (fila, columna) de la celda inicial dentro de la grilla leída
+
+        Returns:
+            Dict con 'rows', 'columns', 'checked' (celdas verificadas) y
+            'mismatches' (lista de {row, column, expected, actual})
+
+        Raises:
+            ElementNotFoundError: Si no se encuentra la celda o la grilla
+            DesktopEngineError: Si el portapapeles no está disponible
+        """
+        import pywinauto.keyboard as keyboard
+        import pywinauto.mouse as mouse
+
+        if not cells:
+            return {'rows': 0, 'columns': 0, 'checked': 0, 'mismatches': []}
+
+        # Tab y saltos de línea dentro de un valor partirían la celda
+        tsv = ''.join('\t'.join(value.replace('\t', ' ').replace('\r', ' ').replace('\n', ' ')
+                                 for value in row) + '\r\n' for row in cells)
+        width = max(len(row) for row in cells)
+
+        element = self.find_element(selector)
+        start = time.perf_counter()
+        try:
+            with clipboard.preserved():
+                clipboard.set_text(tsv)
+                if isinstance(element, dict) and element.get('type') == 'coordinates':
+                    mouse.click(coords=(element['x'], element['y']))
+                else:
+                    self._wait_enabled(element, selector)
+                    element.click_input()
+                keyboard.send_keys('^v')
+                # La grilla lee el portapapeles al procesar el pegado: esperar antes de restaurarlo
+                time.sleep(PASTE_SETTLE + PASTE_SETTLE_PER_100_ROWS * len(cells) / 100)
+        except clipboard.ClipboardError as e:
+            raise DesktopEngineError(f"No se pudo usar el portapapeles: {e}")
+
+        logger.info(f"Bloque pegado: {len(cells)} filas x {width} columnas en "
+                    f"{round((time.perf_counter() - start) * 1000, 2)} ms")
+
+        result: Dict[str, Any] = {'rows': len(cells), 'columns': width, 'checked': 0, 'mismatches': []}
+        if verify_selector is None or not verify_rows:
+            return result
+
+        row_offset, col_offset = offset
+        last_row = row_offset + max(verify_rows) + 1
+        table = self.extract_table(verify_selector, max_rows=last_row)
+        grid = [list(row.values()) for row in table['rows']]
+        for index in verify_rows:
+            expected_row = cells[index]
+            actual_row = grid[row_offset + index] if row_offset + index < len(grid) else []
+            for column, expected in enumerate(expected_row):
+                actual = actual_row[col_offset + column] if col_offset + column < len(actual_row) else None
+                result['checked'] += 1
+                if actual is None or ' '.join(str(actual).split()) != ' '.join(expected.split()):
+                    result['mismatches'].append({'row': index, 'column': column,
+                                                 'expected': expected, 'actual': actual})
+        return result
+
     def wait_for_element(self, selector: Dict[str, Any],
                          condition: str = 'exists',
                          timeout: Optional[int] = None) -> bool:
@@ -330,11 +798,12 @@ class DesktopEngine:
         Returns:
             True si la condición se cumple, False si timeout
         """
-        timeout = timeout or self.timeout
+        wait_timeout = timeout or self.timeout
 
         try:
-            element = self.find_element(selector)
-            element.wait(condition, timeout=timeout)
+            # Sin timeout explícito, la búsqueda usa el timeout aprendido del selector
+            element = self.find_element(selector, timeout=timeout)
+            element.wait(condition, timeout=wait_timeout)
             logger.info(f"Condición '{condition}' cumplida para {selector}")
             return True
 
@@ -366,7 +835,7 @@ class DesktopEngine:
             Lista de dict con info de ventanas (title, handle, class_name)
         """
         try:
-            desktop = Desktop(backend=self.backend)
+            desktop = Desktop(backend=self.default_backend)
             windows = desktop.windows()
 
             window_list = []
@@ -388,6 +857,138 @@ class DesktopEngine:
             logger.error(f"Error obteniendo lista de ventanas: {e}")
             return []
 
+    def snapshot_tree(self, handle: Optional[int] = None,
+                      max_depth: int = DEFAULT_MAX_DEPTH,
+                      max_nodes: int = DEFAULT_MAX_NODES,
+                      max_age: Optional[float] = None,
+                      refresh: bool = False) -> TreeSnapshot:
+        """
+        Retorna el snapshot del árbol de una ventana (cacheado por handle)
+
+        Args:
+            handle: Handle de la ventana top-level (por defecto, la ventana de la app conectada)
+            max_depth: Profundidad máxima a recorrer
+            max_nodes: Nodos máximos a recorrer
+            max_age: Antigüedad aceptada del cache en segundos
+            refresh: Forzar un recorrido nuevo
+
+        Raises:
+            DesktopEngineError: Si no hay ventana que recorrer
+        """
+        if handle:
+            if self.backend_registry:
+                backend = self.backend_registry.get_backend(handle)
+                desktop = self.backend_registry.get_desktop(backend)
+            else:
+                desktop = Desktop(backend=self.backend)
+            root_factory = lambda: desktop.window(handle=handle).wrapper_object()
+        else:
+            if not self.current_app:
+                raise DesktopEngineError("No hay aplicación conectada ni handle de ventana")
+            window = self.current_app.top_window().wrapper_object()
+            handle = window.handle
+            root_factory = lambda: window
+
+        return self.tree_cache.get(handle, root_factory, max_depth=max_depth,
+                                   max_nodes=max_nodes, max_age=max_age, refresh=refresh)
+
+    def preflight(self, selectors: List[Dict[str, Any]],
+                  handle: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Resuelve varios selectores contra un único snapshot de la ventana
+
+        No interactúa con la app: cada selector se evalúa sobre el mismo
+        recorrido del árbol (y una sola captura para selectores por imagen).
+
+        Args:
+            selectors: Selectores ya parseados (formato de find_element)
+            handle: Handle de la ventana (por defecto, la app conectada)
+
+        Returns:
+            Dict con 'snapshot' (métricas del recorrido) y 'results', uno por
+            selector: strategy, matches, status ('ok', 'ambiguous',
+            'not_found', 'error'), latency_ms y key del elemento elegido
+        """
+        state: Dict[str, Any] = {'handle': handle, 'snapshot': None, 'capture': None}
+        results = []
+
+        for selector in selectors:
+            if selector.get('strategies'):
+                # Mismo orden que usaría find_element; se reporta la primera que resuelve
+                ranked = self.selector_stats.rank(self._target_app_key(), selector['strategies'])
+                tried = [self._preflight_one(alternative, state) for alternative in ranked]
+                chosen = next((r for r in tried if r['status'] in ('ok', 'ambiguous')), tried[0])
+                result = dict(chosen)
+                result['selector'] = selector
+                result['alternatives'] = [
+                    {'strategy': r.get('strategy'), 'matches': r.get('matches', 0), 'status': r['status']}
+                    for r in tried
+                ]
+                result['latency_ms'] = round(sum(r['latency_ms'] for r in tried), 2)
+            else:
+                result = self._preflight_one(selector, state)
+            results.append(result)
+
+        snapshot = state['snapshot']
+        return {
+            'snapshot': {
+                'id': snapshot.id,
+                'count': len(snapshot.nodes),
+                'build_ms': snapshot.build_ms,
+                'truncated': snapshot.truncated
+            } if snapshot else None,
+            'results': results
+        }
+
+    def _preflight_one(self, selector: Dict[str, Any], state: Dict[str, Any]) -> Dict[str, Any]:
+        """Evalúa una sola estrategia; snapshot y captura se crean una vez en `state`"""
+        start = time.perf_counter()
+        result: Dict[str, Any] = {'selector': selector}
+        try:
+            if selector.get('coordinates'):
+                # Sin elemento que validar: solo se puede verificar el formato
+                result.update(strategy='coordinates', matches=1)
+
+            elif selector.get('image'):
+                if state['capture'] is None:
+                    state['capture'] = self._capture_target()
+                match = self.vision.locate(selector['image'], state['capture'][1])
+                result.update(strategy='image', matches=1 if match else 0)
+                if match:
+                    result['score'] = round(match.score, 3)
+
+            else:
+                if state['snapshot'] is None:
+                    state['snapshot'] = self.snapshot_tree(handle=state['handle'], refresh=True)
+                snapshot = state['snapshot']
+                nodes, strategy = snapshot.find(selector)
+                result.update(strategy=strategy, matches=len(nodes))
+                index = 0 if selector.get('path') else selector.get('found_index', 0)
+                if index < len(nodes):
+                    result['key'] = snapshot.node_key(nodes[index])
+
+            result['status'] = self._preflight_status(selector, result['matches'])
+
+        except (DesktopEngineError, VisionSelectorError) as e:
+            result.update(status='error', error=str(e))
+        except Exception as e:
+            logger.debug(f"Error en preflight de {selector}: {e}")
+            result.update(status='error', error=str(e))
+
+        result['latency_ms'] = round((time.perf_counter() - start) * 1000, 2)
+        return result
+
+    @staticmethod
+    def _preflight_status(selector: Dict[str, Any], matches: int) -> str:
+        """Clasifica el resultado de un selector en preflight"""
+        index = 0 if selector.get('path') else selector.get('found_index', 0)
+        if matches == 0 or index >= matches:
+            return 'not_found'
+        # Sin found_index explícito, find_element toma el primero de varios
+        if matches > 1 and 'found_index' not in selector:
+            return 'ambiguous'
+        return 'ok'
+
     def close_current_app(self) -> None:
         """Cierra la aplicación actual"""
         if self.current_app:
@@ -456,6 +1057,137 @@ class DesktopEngine:
             logger.debug(f"Error verificando criterios: {e}")
             return False
 
+    @property
+    def default_backend(self) -> str:
+        """Backend a usar cuando todavía no hay una app identificada"""
+        if self.backend_registry:
+            return self.backend_registry.default_backend
+        return self.backend
+
+    def _resolve_backend(self, criteria: Dict[str, Any]) -> str:
+        """
+        Elige el backend para la ventana que coincide con los criterios
+
+        En modo 'auto' localiza la ventana con win32 (estable en Windows 7)
+        y consulta el registro compartido; si no, usa el backend fijo.
+        """
+        if not self.backend_registry:
+            return self.backend
+
+        try:
+            handles = findwindows.find_windows(**criteria)
+        except Exception as e:
+            logger.debug(f"No se pudo localizar ventana para elegir backend: {e}")
+            handles = []
+
+        if not handles:
+            return self.default_backend
+        return self.backend_registry.get_backend(handles[0])
+
+    def _find_by_path(self, segments: list, timeout: float) -> UIAWrapper:
+        """
+        Resuelve un selector de ruta reintentando hasta el timeout
+
+        Raises:
+            ElementNotFoundError: Si la ruta no se resuelve antes del timeout
+        """
+        deadline = time.time() + timeout
+        while True:
+            try:
+                element = self._resolve_path(self.current_app.window(), segments)
+                if element is not None:
+                    return element
+            except (findwindows.ElementNotFoundError, OSError) as e:
+                logger.debug(f"Ruta todavía no disponible: {e}")
+
+            if time.time() >= deadline:
+                raise ElementNotFoundError(f"Elemento no encontrado por ruta: {segments}")
+            time.sleep(0.5)
+
+    def _resolve_path(self, window: Any, segments: list) -> Optional[UIAWrapper]:
+        """
+        Baja por la ruta leyendo solo la lista de hijos de cada nivel: O(profundidad)
+
+        Si un nivel cambió (el segmento no aparece entre los hijos), busca el
+        último segmento entre los descendientes del último ancestro resuelto.
+
+        Args:
+            window: Ventana top-level (WindowSpecification o wrapper)
+            segments: Segmentos de la ruta
+
+        Returns:
+            Elemento encontrado o None
+        """
+        current = window.wrapper_object() if hasattr(window, 'wrapper_object') else window
+
+        for depth, segment in enumerate(segments):
+            candidates = [(child, element_signature(child)) for child in current.children()]
+            child, exact = match_segment(candidates, segment)
+
+            if child is None:
+                logger.info(f"Ruta cambió en nivel {depth}; buscando en descendientes")
+                return self._path_fallback(current, segments[-1])
+
+            if not exact:
+                logger.info(f"Nivel {depth} de la ruta resuelto por similitud: {segment}")
+            current = child
+
+        logger.info(f"Elemento encontrado por ruta ({len(segments)} niveles)")
+        return current
+
+    def _path_fallback(self, ancestor: Any, target: Dict[str, Any]) -> Optional[UIAWrapper]:
+        """Busca el segmento final entre los descendientes del ancestro resuelto"""
+        matches = [el for el in ancestor.descendants()
+                   if signature_matches(element_signature(el), target)]
+        if not matches:
+            return None
+        index = min(target.get('idx', 0), len(matches) - 1)
+        return matches[index]
+
+    def _find_by_image(self, ref_id: str, timeout: float) -> Dict[str, Any]:
+        """
+        Resuelve un selector por imagen dentro de la ventana actual
+
+        Captura la ventana (o la pantalla si no hay app conectada) y busca la
+        referencia con template matching, reintentando hasta el timeout.
+
+        Args:
+            ref_id: ID de la imagen de referencia
+            timeout: Timeout en segundos
+
+        Returns:
+            Dict de coordenadas de pantalla (mismo formato que 'coordinates')
+
+        Raises:
+            ElementNotFoundError: Si la imagen no aparece antes del timeout
+        """
+        deadline = time.time() + timeout
+        while True:
+            try:
+                origin, capture = self._capture_target()
+                match = self.vision.locate(ref_id, capture)
+            except VisionSelectorError as e:
+                raise ElementNotFoundError(str(e))
+
+            if match:
+                x, y = origin[0] + match.x, origin[1] + match.y
+                logger.info(f"Imagen {ref_id} encontrada en ({x}, {y}) score={match.score:.3f}")
+                return {'type': 'coordinates', 'x': x, 'y': y}
+
+            if time.time() >= deadline:
+                raise ElementNotFoundError(f"Imagen de referencia no encontrada en pantalla: {ref_id}")
+            time.sleep(0.5)
+
+    def _capture_target(self):
+        """Captura la ventana actual; retorna ((left, top), imagen)"""
+        if self.current_app:
+            window = self.current_app.top_window()
+            rect = window.rectangle()
+            return (rect.left, rect.top), window.capture_as_image()
+
+        from PIL import ImageGrab
+        return (0, 0), ImageGrab.grab()
+
     def take_screenshot(self, path: str) -> bool:
         """
         Toma captura de pantalla
@@ -470,7 +1202,7 @@ class DesktopEngine:
             if self.current_app:
                 self.current_app.top_window().capture_as_image().save(path)
             else:
-                Desktop(backend=self.backend).top_window().capture_as_image().save(path)
+                Desktop(backend=self.default_backend).top_window().capture_as_image().save(path)
 
             logger.info(f"Screenshot guardado: {path}")
             return True
@@ -12,12 +12,18 @@ import io
 import logging
 import threading
 import time
-from typing import Dict, Optional, Any, Tuple
+from collections import deque
+from typing import Dict, List, Optional, Any, Tuple
 
 from PIL import Image, ImageGrab
-from pywinauto import Desktop
 from pywinauto.controls.uiawrapper import UIAWrapper
 
+from .backend_probe import get_backend_registry
+from .hit_test_cache import HitTestCache
+from .ui_path import build_path, encode_path
+from .ui_tree import TreeSnapshot
+from .vision import ReferenceStore, crop_reference
+
 try:
     import psutil
     PSUTIL_AVAILABLE = True
@@ -47,6 +53,7 @@ COLOR_RED = 0x0000FF  # BGR format
 WH_KEYBOARD_LL = 13
 WH_MOUSE_LL = 14
 WM_KEYDOWN = 0x0100
+WM_MOUSEMOVE = 0x0200
 WM_LBUTTONDOWN = 0x0201
 VK_CONTROL = 0x11
 VK_ESCAPE = 0x1B
@@ -57,6 +64,26 @@ PS_SOLID = 0
 # Mensajes
 WM_PAINT = 0x000F
 WM_DESTROY = 0x0002
+WM_QUIT = 0x0012
+WM_APP = 0x8000
+WM_PICKER_HOVER = WM_APP + 1  # Resultado del worker de hover listo
+
+# Cola de mensajes
+PM_NOREMOVE = 0x0000
+PM_REMOVE = 0x0001
+QS_ALLINPUT = 0x04FF
+
+# Hover: espera sin movimiento antes de resolver, y espera máxima en reposo
+HOVER_DEBOUNCE = 0.03  # segundos
+# Con el mouse en movimiento continuo se resuelve igual cada HOVER_MAX_WAIT
+HOVER_MAX_WAIT = 0.08  # segundos
+MAX_IDLE_WAIT_MS = 500
+
+# Estrategias alternativas incluidas en el selector generado
+MAX_SELECTOR_ALTERNATIVES = 3
+
+# Sesión: espera máxima de /picker/captures a que el worker resuelva selectores
+DRAIN_TIMEOUT = 15.0  # segundos
 
 
 # ==================== ESTRUCTURAS WIN32 ====================
@@ -137,6 +164,12 @@ class ElementPicker:
         # Usuario selecciona elemento...
         result = picker.get_result()
         picker.stop()
+    
+    Modo sesión (varios elementos con los mismos hooks y overlay):
+        picker.start(session=True)
+        # Cada CTRL+Click encola una captura; ESC termina la sesión
+        result = picker.drain_captures()
+        picker.stop()
     """
     
     # Estados posibles
@@ -170,13 +203,43 @@ class ElementPicker:
         # Elemento capturado
         self._captured_element = None
         self._captured_selector = None
+        self._captured_alternatives: List[str] = []
         self._captured_properties = None
         self._captured_screenshot = None
+        self._captured_image = None  # (imagen PIL sin reducir, bbox en pantalla)
+        
+        # Referencias para selectores por imagen
+        self._reference_store = ReferenceStore()
         
         # Threading
         self._picker_thread = None
+        self._picker_thread_id = None
         self._stop_event = threading.Event()
         
+        # Hover: el hook de mouse deja la última posición, un worker la resuelve
+        self._pending_hover = None
+        self._last_move_time = 0.0
+        self._pending_since = 0.0
+        self._hover_thread = None
+        self._hover_cond = threading.Condition()
+        self._hover_request = None
+        self._hover_result = None
+        self._hover_stats = {'moves': 0, 'coalesced': 0, 'resolved': 0}
+        
+        # Cache de rectángulos resueltos (solo se usa desde el worker de hover)
+        self._hit_cache = HitTestCache()
+        
+        # Sesión: el hook encola clicks, un worker los captura y resuelve selectores
+        self._session = False
+        self._capture_thread = None
+        self._capture_active = False
+        self._capture_cond = threading.Condition()
+        self._pending_clicks = deque()
+        self._session_pending: List[Dict[str, Any]] = []  # Capturadas, sin selector
+        self._session_ready: List[Dict[str, Any]] = []    # Con selector, listas para drenar
+        self._session_count = 0
+        self._drain_event = None
+        
         # Hooks
         self._keyboard_hook = None
         self._mouse_hook = None
@@ -191,19 +254,23 @@ class ElementPicker:
         self._gdi32 = ctypes.windll.gdi32
         self._kernel32 = ctypes.windll.kernel32
         
-        # Desktop para pywinauto - Windows 7: Solo usar win32 backend
-        self._desktop_win32 = Desktop(backend='win32')
+        # Backend por aplicación: el mismo registro que usa DesktopEngine en modo 'auto'
+        # (en Windows 7 el probe descarta UIA cuando lanza access violations)
+        self._backend_registry = get_backend_registry()
+        self._last_backend = self._backend_registry.default_backend
         
-        logger.info("ElementPicker inicializado (Windows 7 - solo win32 backend)")
+        logger.info("ElementPicker inicializado (backend por aplicación)")
     
     # ==================== API PÚBLICA ====================
     
-    def start(self, mode: str = 'desktop') -> bool:
+    def start(self, mode: str = 'desktop', session: bool = False) -> bool:
         """
         Inicia el selector de elementos.
         
         Args:
             mode: Modo de captura ('desktop' o 'web')
+            session: Si True, cada CTRL+Click encola una captura y el picker
+                     sigue activo hasta ESC o stop()
             
         Returns:
             True si se inició correctamente, False en caso de error
@@ -218,6 +285,10 @@ class ElementPicker:
             self._error_message = None
             self._clear_captured_data()
             self._stop_event.clear()
+            self._pending_hover = None
+            self._hover_stats = {'moves': 0, 'coalesced': 0, 'resolved': 0}
+            self._hit_cache.reset()
+            self._reset_session(session)
             
             # Iniciar thread del picker
             self._picker_thread = threading.Thread(
@@ -227,7 +298,7 @@ class ElementPicker:
             )
             self._picker_thread.start()
             
-            logger.info("ElementPicker iniciado en modo: %s", mode)
+            logger.info("ElementPicker iniciado en modo: %s (sesión: %s)", mode, session)
             return True
             
         except Exception as e:
@@ -241,9 +312,13 @@ class ElementPicker:
         try:
             self._stop_event.set()
             
-            # Esperar a que el thread termine
+            # Despertar el loop de mensajes del picker
+            if self._picker_thread_id:
+                self._user32.PostThreadMessageW(self._picker_thread_id, WM_QUIT, 0, 0)
+            
+            # Esperar a que el thread termine (en sesión resuelve antes las capturas pendientes)
             if self._picker_thread and self._picker_thread.is_alive():
-                self._picker_thread.join(timeout=2.0)
+                self._picker_thread.join(timeout=DRAIN_TIMEOUT if self._session else 2.0)
             
             self._cleanup_hooks()
             self._destroy_overlay()
@@ -261,9 +336,22 @@ class ElementPicker:
         Obtiene el estado actual del picker.
         
         Returns:
-            Dict con 'status' y opcionalmente 'error'
+            Dict con 'status', métricas de hover y opcionalmente 'error'
         """
-        result = {'status': self._status}
+        result = {
+            'status': self._status,
+            'hover': dict(self._hover_stats),
+            'hit_cache': self._hit_cache.get_stats()
+        }
+        
+        if self._session:
+            with self._capture_cond:
+                result['session'] = {
+                    'active': self._capture_active,
+                    'captured': self._session_count,
+                    'pending': len(self._pending_clicks) + len(self._session_pending),
+                    'ready': len(self._session_ready)
+                }
         
         if self._status == self.STATUS_ERROR and self._error_message:
             result['error'] = self._error_message
@@ -275,8 +363,9 @@ class ElementPicker:
         Obtiene el resultado de la captura.
         
         Returns:
-            Dict con selector, properties y screenshot si hay elemento capturado,
-            o error si no hay captura disponible
+            Dict con selector, alternatives (estrategias en orden de prioridad,
+            la primera es el selector), properties y screenshot si hay
+            elemento capturado, o error si no hay captura disponible
         """
         if self._status != self.STATUS_CAPTURED:
             return {
@@ -287,24 +376,82 @@ class ElementPicker:
         return {
             'status': 'success',
             'selector': self._captured_selector,
+            'alternatives': self._captured_alternatives,
             'properties': self._captured_properties,
             'screenshot': self._captured_screenshot
         }
     
+    def drain_captures(self, timeout: float = DRAIN_TIMEOUT) -> Dict[str, Any]:
+        """
+        Retorna y descarta las capturas de la sesión hechas hasta ahora.
+        
+        Los selectores de todas las capturas pendientes se calculan en un
+        solo paso, con un snapshot del árbol por ventana.
+        
+        Args:
+            timeout: Segundos máximos a esperar al worker de captura
+            
+        Returns:
+            Dict con 'captures' (selector, properties, screenshot de cada una,
+            en orden de click) y 'active' (si la sesión sigue abierta)
+        """
+        if not self._session:
+            return {
+                'status': 'error',
+                'error': 'El picker no está en modo sesión'
+            }
+        
+        with self._capture_cond:
+            worker_alive = self._capture_active
+            if worker_alive:
+                self._drain_event = threading.Event()
+                drain_event = self._drain_event
+                self._capture_cond.notify()
+        
+        if worker_alive and not drain_event.wait(timeout):
+            logger.warning("Timeout esperando selectores de la sesión; se retornan los listos")
+        
+        with self._capture_cond:
+            captures = self._session_ready
+            self._session_ready = []
+            active = self._capture_active
+        
+        return {
+            'status': 'success',
+            'captures': captures,
+            'active': active
+        }
+    
     def reset(self) -> None:
         """Reinicia el picker a estado idle."""
         self.stop()
         self._clear_captured_data()
+        self._reset_session(False)
         self._status = self.STATUS_IDLE
         self._error_message = None
     
     # ==================== LOOP PRINCIPAL ====================
     
     def _picker_loop(self) -> None:
-        """Loop principal del picker que corre en thread separado."""
+        """
+        Loop principal del picker que corre en thread separado.
+        
+        Es un loop de mensajes bloqueante: el thread duerme en
+        MsgWaitForMultipleObjects hasta que llega un evento del hook de
+        mouse/teclado, un resultado del worker de hover o la orden de parar.
+        Los movimientos del mouse se coalescen (solo cuenta la última
+        posición) y se resuelven tras HOVER_DEBOUNCE sin movimiento, o a
+        más tardar HOVER_MAX_WAIT después del primer movimiento pendiente
+        (el overlay sigue al cursor mientras se mueve).
+        """
         try:
             logger.info("Iniciando picker loop...")
             
+            # Crear la cola de mensajes del thread antes de publicar su id
+            msg = MSG()
+            self._user32.PeekMessageW(ctypes.byref(msg), None, 0, 0, PM_NOREMOVE)
+            self._picker_thread_id = self._kernel32.GetCurrentThreadId()
+            
             # Instalar hooks
             logger.info("Instalando hooks de teclado y mouse...")
             self._install_hooks()
@@ -314,81 +461,38 @@ class ElementPicker:
             
             logger.info("Hooks instalados correctamente. Overlay activo.")
             
-            # Loop de detección de elementos
-            last_update_time = 0
-            update_interval = 0.2  # Actualizar overlay cada 200ms (reducir access violations)
-            last_element_pos = None  # Trackear última posición para evitar accesos innecesarios
+            # Worker que resuelve el elemento bajo el cursor fuera de este thread
+            self._start_hover_worker()
+            if self._session:
+                self._start_capture_worker()
             
             while not self._stop_event.is_set():
                 try:
-                    current_time = time.time()
-                    
-                    # Obtener posición del mouse
-                    point = POINT()
-                    self._user32.GetCursorPos(ctypes.byref(point))
-                    current_pos = (point.x, point.y)
-                    
-                    # Solo intentar obtener elemento si ha pasado el intervalo Y cambió la posición
-                    should_update = ((current_time - last_update_time) >= update_interval and 
-                                    current_pos != last_element_pos)
+                    # Esperar mensajes; con hover pendiente, solo hasta que venza el debounce
+                    timeout_ms = MAX_IDLE_WAIT_MS
+                    if self._pending_hover is not None:
+                        remaining = self._hover_due() - time.time()
+                        timeout_ms = max(0, min(timeout_ms, int(remaining * 1000)))
                     
-                    if should_update:
-                        last_element_pos = current_pos
-                        # Obtener elemento bajo el cursor
-                        element = self._get_element_at_point(point.x, point.y)
-                        
-                        if element:
-                            # Intentar obtener rectángulo SOLO UNA VEZ con protección completa
-                            new_rect = None
-                            try:
-                                # Acceso seguro a rectangle() - puede fallar en Windows 7
-                                rect = element.rectangle()
-                                if rect and hasattr(rect, 'left'):
-                                    new_rect = (int(rect.left), int(rect.top), int(rect.right), int(rect.bottom))
-                                    
-                                    # Validar que el rectángulo sea razonable
-                                    if not (new_rect[2] > new_rect[0] and new_rect[3] > new_rect[1] and 
-                                            new_rect[0] >= 0 and new_rect[1] >= 0 and
-                                            new_rect[2] < 10000 and new_rect[3] < 10000):
-                                        new_rect = None
-                            except (AttributeError, OSError, ctypes.ArgumentError):
-                                # Errores de acceso a memoria - ignorar completamente
-                                new_rect = None
-                            except Exception:
-                                # Cualquier otro error - ignorar
-                                new_rect = None
-                            
-                            # Solo actualizar overlay si tenemos un rectángulo válido y cambió
-                            if new_rect and new_rect != self._current_element_rect:
-                                self._current_element_rect = new_rect
-                                self._update_overlay(new_rect)
-                                last_update_time = current_time
-                        else:
-                            # Si no hay elemento, ocultar overlay
-                            if self._overlay_hwnd and self._current_element_rect:
-                                try:
-                                    self._user32.ShowWindow(self._overlay_hwnd, 0)  # SW_HIDE
-                                    self._current_element_rect = None
-                                    last_update_time = current_time
-                                except Exception:
-                                    pass
+                    self._user32.MsgWaitForMultipleObjects(
+                        0, None, False, ctypes.wintypes.DWORD(timeout_ms), QS_ALLINPUT
+                    )
                     
-                    # Procesar mensajes de Windows (necesario para hooks)
-                    # Limitar a un máximo de mensajes por iteración para evitar saturación
-                    msg = MSG()
-                    msg_count = 0
-                    max_messages = 10  # Máximo de mensajes por iteración
-                    while msg_count < max_messages and self._user32.PeekMessageW(ctypes.byref(msg), None, 0, 0, 1):  # PM_REMOVE
-                        try:
-                            self._user32.TranslateMessage(ctypes.byref(msg))
-                            self._user32.DispatchMessageW(ctypes.byref(msg))
-                            msg_count += 1
-                        except Exception:
-                            # Si hay error procesando mensaje, continuar
+                    # Procesar todos los mensajes pendientes (los hooks corren aquí)
+                    while self._user32.PeekMessageW(ctypes.byref(msg), None, 0, 0, PM_REMOVE):
+                        if msg.message == WM_QUIT:
+                            self._stop_event.set()
                             break
+                        if msg.message == WM_PICKER_HOVER and not msg.hwnd:
+                            self._apply_hover_result()
+                            continue
+                        self._user32.TranslateMessage(ctypes.byref(msg))
+                        self._user32.DispatchMessageW(ctypes.byref(msg))
                     
-                    # Pequeña pausa para no saturar CPU
-                    time.sleep(0.05)
+                    # Debounce (o espera máxima) vencido: enviar la última posición al worker
+                    if self._pending_hover is not None and time.time() >= self._hover_due():
+                        self._request_hover(self._pending_hover)
+                        self._pending_hover = None
                     
                 except Exception as e:
                     logger.warning("Error en picker loop: %s", e)
@@ -402,28 +506,308 @@ class ElementPicker:
             logger.error("Error crítico en picker loop: %s", e, exc_info=True)
         finally:
             logger.info("Limpiando recursos del picker...")
+            self._stop_hover_worker()
             self._cleanup_hooks()
+            self._stop_capture_worker()
             self._destroy_overlay()
+            self._picker_thread_id = None
+    
+    def _hover_due(self) -> float:
+        """Momento en que se resuelve el hover pendiente: fin del debounce o espera máxima"""
+        return min(self._last_move_time + HOVER_DEBOUNCE, self._pending_since + HOVER_MAX_WAIT)
+    
+    # ==================== HOVER (WORKER) ====================
+    
+    def _start_hover_worker(self) -> None:
+        """Inicia el thread que resuelve elementos bajo el cursor."""
+        self._hover_request = None
+        self._hover_result = None
+        self._hover_thread = threading.Thread(
+            target=self._hover_worker_loop,
+            name="ElementPickerHoverThread",
+            daemon=True
+        )
+        self._hover_thread.start()
+    
+    def _stop_hover_worker(self) -> None:
+        """Despierta y espera al worker de hover."""
+        with self._hover_cond:
+            self._hover_cond.notify_all()
+        if self._hover_thread and self._hover_thread.is_alive():
+            self._hover_thread.join(timeout=1.0)
+        self._hover_thread = None
+    
+    def _request_hover(self, pos: Tuple[int, int]) -> None:
+        """Publica la última posición a resolver (reemplaza cualquier pedido previo)."""
+        with self._hover_cond:
+            if self._hover_request is not None:
+                self._hover_stats['coalesced'] += 1
+            self._hover_request = pos
+            self._hover_cond.notify()
+    
+    def _hover_worker_loop(self) -> None:
+        """Resuelve elemento + rectángulo y avisa al thread del picker."""
+        try:
+            import comtypes
+            comtypes.CoInitialize()
+        except Exception:
+            pass
+        
+        while not self._stop_event.is_set():
+            with self._hover_cond:
+                while self._hover_request is None and not self._stop_event.is_set():
+                    self._hover_cond.wait(MAX_IDLE_WAIT_MS / 1000.0)
+                if self._stop_event.is_set():
+                    break
+                x, y = self._hover_request
+                self._hover_request = None
+            
+            rect = self._resolve_hover_rect(x, y)
+            self._hover_stats['resolved'] += 1
+            
+            with self._hover_cond:
+                self._hover_result = rect
+            
+            # El overlay pertenece al thread del picker: actualizarlo allí
+            thread_id = self._picker_thread_id
+            if thread_id:
+                self._user32.PostThreadMessageW(thread_id, WM_PICKER_HOVER, 0, 0)
+    
+    def _resolve_hover_rect(self, x: int, y: int) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Obtiene el rectángulo del elemento bajo el punto, o None.
+        
+        Corre en el worker de hover; errores de acceso (comunes en Windows 7)
+        se ignoran y equivalen a "sin elemento". Si el punto cae dentro de un
+        control ya resuelto, responde desde el hit cache sin accesibilidad.
+        """
+        cached = self._hit_cache.lookup(x, y)
+        if cached is not None:
+            return cached.rect
+        
+        element = self._get_element_at_point(x, y, wait_probe=False)
+        if not element:
+            return None
+        
+        try:
+            # Acceso seguro a rectangle() - puede fallar en Windows 7
+            rect = element.rectangle()
+            if not rect or not hasattr(rect, 'left'):
+                return None
+            new_rect = (int(rect.left), int(rect.top), int(rect.right), int(rect.bottom))
+            
+            # Validar que el rectángulo sea razonable
+            if not (new_rect[2] > new_rect[0] and new_rect[3] > new_rect[1] and
+                    new_rect[0] >= 0 and new_rect[1] >= 0 and
+                    new_rect[2] < 10000 and new_rect[3] < 10000):
+                return None
+            
+            self._hit_cache.store(x, y, element, new_rect)
+            return new_rect
+        except (AttributeError, OSError, ctypes.ArgumentError):
+            # Errores de acceso a memoria - ignorar completamente
+            return None
+        except Exception:
+            return None
+    
+    def _apply_hover_result(self) -> None:
+        """Aplica el último resultado del worker al overlay (thread del picker)."""
+        with self._hover_cond:
+            new_rect = self._hover_result
+        
+        if new_rect:
+            if new_rect != self._current_element_rect:
+                self._current_element_rect = new_rect
+                self._update_overlay(new_rect)
+        elif self._overlay_hwnd and self._current_element_rect:
+            # Si no hay elemento, ocultar overlay
+            try:
+                self._user32.ShowWindow(self._overlay_hwnd, 0)  # SW_HIDE
+                self._current_element_rect = None
+            except Exception:
+                pass
+    
+    # ==================== SESIÓN (WORKER DE CAPTURA) ====================
+    
+    def _reset_session(self, session: bool) -> None:
+        """Descarta capturas de una sesión anterior y fija el modo."""
+        with self._capture_cond:
+            self._session = session
+            self._pending_clicks.clear()
+            self._session_pending = []
+            self._session_ready = []
+            self._session_count = 0
+            self._drain_event = None
+    
+    def _start_capture_worker(self) -> None:
+        """Inicia el thread que captura los clicks encolados por el hook."""
+        self._capture_active = True
+        self._capture_thread = threading.Thread(
+            target=self._capture_worker_loop,
+            name="ElementPickerCaptureThread",
+            daemon=True
+        )
+        self._capture_thread.start()
+    
+    def _stop_capture_worker(self) -> None:
+        """Despierta al worker de captura y espera a que resuelva lo pendiente."""
+        with self._capture_cond:
+            self._capture_cond.notify_all()
+        if self._capture_thread and self._capture_thread.is_alive():
+            self._capture_thread.join(timeout=DRAIN_TIMEOUT)
+    
+    def _capture_worker_loop(self) -> None:
+        """
+        Captura elemento + screenshot de cada click y resuelve selectores al drenar.
+        
+        Los wrappers COM se crean y se usan solo en este thread. Al terminar
+        la sesión (ESC o stop) resuelve las capturas pendientes antes de salir.
+        """
+        try:
+            import comtypes
+            comtypes.CoInitialize()
+        except Exception:
+            pass
+        
+        try:
+            while True:
+                with self._capture_cond:
+                    while (not self._pending_clicks and self._drain_event is None and
+                           not self._stop_event.is_set()):
+                        self._capture_cond.wait(MAX_IDLE_WAIT_MS / 1000.0)
+                    clicks = list(self._pending_clicks)
+                    self._pending_clicks.clear()
+                    drain_event = self._drain_event
+                    self._drain_event = None
+                    stopping = self._stop_event.is_set()
+                
+                for x, y in clicks:
+                    capture = self._capture_session_element(x, y)
+                    if capture is not None:
+                        with self._capture_cond:
+                            self._session_pending.append(capture)
+                
+                if drain_event is not None or stopping:
+                    self._resolve_session_selectors()
+                if drain_event is not None:
+                    drain_event.set()
+                if stopping:
+                    break
+        except Exception as e:
+            logger.error("Error en worker de captura: %s", e, exc_info=True)
+        finally:
+            # Un drenado que llegó mientras se cerraba la sesión no debe esperar el timeout
+            with self._capture_cond:
+                self._capture_active = False
+                if self._drain_event is not None:
+                    self._drain_event.set()
+                    self._drain_event = None
+    
+    def _capture_session_element(self, x: int, y: int) -> Optional[Dict[str, Any]]:
+        """
+        Captura lo que depende del instante del click (elemento, screenshot).
+        
+        found_index y ruta se dejan para _resolve_session_selectors.
+        """
+        element = self._get_element_at_point(x, y, wait_probe=False)
+        if not element:
+            logger.warning("Sesión: no se encontró elemento en (%s, %s)", x, y)
+            return None
+        
+        try:
+            properties, screenshot = self._capture_details(element, x, y, include_structure=False)
+            try:
+                root = element.top_level_parent()
+            except Exception:
+                root = None
+            
+            with self._capture_cond:
+                self._session_count += 1
+                number = self._session_count
+            
+            logger.info("Sesión: captura %d en (%s, %s)", number, x, y)
+            return {
+                'index': number,
+                'element': element,
+                'root': root,
+                'properties': properties,
+                'screenshot': screenshot
+            }
+        except Exception as e:
+            logger.error("Error capturando elemento de la sesión: %s", e)
+            return None
+    
+    def _resolve_session_selectors(self) -> None:
+        """Calcula found_index, ruta y selector de las capturas pendientes."""
+        with self._capture_cond:
+            pending = self._session_pending
+            self._session_pending = []
+        if not pending:
+            return
+        
+        # Un solo recorrido del árbol por ventana, compartido por todas sus capturas
+        snapshots: Dict[Any, Optional[TreeSnapshot]] = {}
+        for capture in pending:
+            root = capture.pop('root')
+            element = capture.pop('element')
+            properties = capture['properties']
+            
+            node = None
+            snapshot = None
+            if root is not None:
+                key = getattr(root, 'handle', None) or id(root)
+                if key not in snapshots:
+                    try:
+                        snapshots[key] = TreeSnapshot(root)
+                    except Exception as e:
+                        logger.debug("No se pudo tomar snapshot de la ventana: %s", e)
+                        snapshots[key] = None
+                snapshot = snapshots[key]
+                if snapshot is not None:
+                    node = snapshot.locate(element)
+            
+            if node is not None:
+                properties['found_index'] = snapshot.found_index(node)
+                path = snapshot.path(node)
+            else:
+                # Elemento fuera del snapshot (truncado o cambió la ventana)
+                properties['found_index'] = self._calculate_found_index(element)
+                path = build_path(element)
+            if path:
+                properties['path'] = path
+            
+            alternatives = self._generate_alternatives(properties)
+            capture['selector'] = alternatives[0] if alternatives else "unknown"
+            capture['alternatives'] = alternatives
+            with self._capture_cond:
+                self._session_ready.append(capture)
+        
+        logger.info("Sesión: %d selectores resueltos con %d snapshot(s)",
+                    len(pending), len(snapshots))
     
     # ==================== DETECCIÓN DE ELEMENTOS ====================
     
-    def _get_element_at_point(self, x: int, y: int) -> Optional[UIAWrapper]:
+    def _get_element_at_point(self, x: int, y: int, wait_probe: bool = True) -> Optional[UIAWrapper]:
         """
         Obtiene el elemento UI bajo las coordenadas especificadas.
         
-        Windows 7: Solo usa win32 backend (UIA no funciona correctamente).
+        Usa el backend elegido para la aplicación bajo el cursor
+        (probe una sola vez por app, cacheado en disco).
         
         Args:
             x: Coordenada X del mouse
             y: Coordenada Y del mouse
+            wait_probe: False en hover y sesión: una app nueva se resuelve con
+                        el backend por defecto mientras el probe corre aparte
             
         Returns:
             Elemento UIAWrapper o None
         """
-        # Windows 7: Solo usar win32 backend directamente
-        # UIA falla constantemente en Windows 7, no intentarlo
         try:
-            element = self._desktop_win32.from_point(x, y)
+            root_hwnd = self._backend_registry.root_window_at(x, y)
+            backend = self._backend_registry.get_backend(root_hwnd, wait=wait_probe)
+            self._last_backend = backend
+            element = self._backend_registry.get_desktop(backend).from_point(x, y)
             if element:
                 return element
         except Exception:
@@ -452,15 +836,12 @@ class ElementPicker:
                 return False
             
             self._captured_element = element
+            self._captured_properties, self._captured_screenshot = self._capture_details(element, x, y)
             
-            # Extraer propiedades (incluyendo coordenadas para fallback)
-            self._captured_properties = self._extract_properties(element, x, y)
-            
-            # Generar selector
-            self._captured_selector = self._generate_selector(self._captured_properties)
-            
-            # Capturar screenshot
-            self._captured_screenshot = self._capture_screenshot(element)
+            # Generar selector y estrategias alternativas
+            self._captured_alternatives = self._generate_alternatives(self._captured_properties)
+            self._captured_selector = (self._captured_alternatives[0]
+                                       if self._captured_alternatives else "unknown")
             
             self._status = self.STATUS_CAPTURED
             logger.info("Elemento capturado: %s", self._captured_selector)
@@ -474,7 +855,36 @@ class ElementPicker:
             logger.error("Error capturando elemento: %s", e)
             return False
     
-    def _extract_properties(self, element: UIAWrapper, x: int = 0, y: int = 0) -> Dict[str, Any]:
+    def _capture_details(self, element: UIAWrapper, x: int, y: int,
+                         include_structure: bool = True) -> Tuple[Dict[str, Any], Optional[str]]:
+        """
+        Extrae propiedades y screenshot del elemento capturado.
+        
+        Args:
+            element: Elemento UIAWrapper
+            x: Coordenada X del click
+            y: Coordenada Y del click
+            include_structure: Calcular found_index y ruta (recorren el árbol)
+            
+        Returns:
+            Tupla (propiedades, screenshot en base64 o None)
+        """
+        # Extraer propiedades (incluyendo coordenadas para fallback)
+        properties = self._extract_properties(element, x, y, include_structure)
+        
+        # Capturar screenshot (conserva también la imagen sin reducir)
+        screenshot = self._capture_screenshot(element)
+        
+        # Sin identificadores: guardar referencia visual en vez de depender de coordenadas
+        if self._needs_image_reference(properties):
+            image_ref = self._save_image_reference(x, y, properties)
+            if image_ref:
+                properties['image_ref'] = image_ref
+        
+        return properties, screenshot
+    
+    def _extract_properties(self, element: UIAWrapper, x: int = 0, y: int = 0,
+                            include_structure: bool = True) -> Dict[str, Any]:
         """
         Extrae las propiedades relevantes del elemento.
         
@@ -488,6 +898,7 @@ class ElementPicker:
             element: Elemento UIAWrapper
             x: Coordenada X donde se capturó (para fallback)
             y: Coordenada Y donde se capturó (para fallback)
+            include_structure: Calcular found_index y ruta de ancestros
             
         Returns:
             Dict con propiedades del elemento
@@ -552,6 +963,9 @@ class ElementPicker:
             if x > 0 or y > 0:
                 properties['coordinates'] = [x, y]
             
+            # Backend con el que se resolvió (el executor usa el mismo para esta app)
+            properties['backend'] = self._last_backend
+            
             # ==================== ESTADOS ====================
             
             try:
@@ -583,12 +997,23 @@ class ElementPicker:
             except Exception:
                 pass
             
+            if not include_structure:
+                return properties
+            
             # ==================== FOUND_INDEX (CRÍTICO PARA WIN7) ====================
             # Calcula la posición del elemento entre hermanos del mismo tipo
             # Esencial para apps antiguas que no tienen AutomationId
             
             properties['found_index'] = self._calculate_found_index(element)
             
+            # ==================== RUTA DE ANCESTROS ====================
+            # Cadena de segmentos desde la ventana top-level; el executor la
+            # resuelve en O(profundidad) en vez de recorrer todos los descendientes
+            
+            path = build_path(element)
+            if path:
+                properties['path'] = path
+            
         except Exception as e:
             logger.error("Error extrayendo propiedades: %s", e)
         
@@ -681,16 +1106,35 @@ class ElementPicker:
         except Exception:
             return False
     
-    def _generate_selector(self, properties: Dict[str, Any]) -> str:
+    def _generate_alternatives(self, properties: Dict[str, Any]) -> List[str]:
         """
-        Genera un selector único basado en las propiedades del elemento.
+        Estrategias alternativas del elemento que se entregan con la captura.
+        
+        Son las primeras MAX_SELECTOR_ALTERNATIVES de _generate_selectors;
+        la primera es el selector principal. Como lista (["auto_id:txtRuc",
+        "name:RUC|control_type:Edit"]) DesktopEngine las prueba en el orden
+        aprendido para la aplicación y usa las demás como fallback.
+        
+        Args:
+            properties: Dict con propiedades del elemento
+            
+        Returns:
+            Lista de selectores "tipo:valor" o "tipo1:valor1|tipo2:valor2"
+        """
+        return self._generate_selectors(properties)[:MAX_SELECTOR_ALTERNATIVES]
+    
+    def _generate_selectors(self, properties: Dict[str, Any]) -> List[str]:
+        """
+        Genera todas las estrategias aplicables, en orden de prioridad.
         
         Prioridad para Windows 7 y apps antiguas:
         1. auto_id (más confiable, pero apps antiguas no lo tienen)
-        2. name + control_type + found_index
-        3. class_name + control_type + found_index
-        4. control_type + found_index
-        5. coordinates (fallback absoluto)
+        2. path (ruta de ancestros con índice entre hermanos)
+        3. name + control_type + found_index
+        4. class_name + control_type + found_index
+        5. image (referencia visual recortada de la captura)
+        6. control_type + found_index (solo si no hay nada mejor)
+        7. coordinates (solo si no hay ninguna otra: no se puede verificar)
         
         El found_index se agrega cuando hay riesgo de ambigüedad
         (nombres genéricos, sin auto_id).
@@ -699,15 +1143,20 @@ class ElementPicker:
             properties: Dict con propiedades del elemento
             
         Returns:
-            Selector en formato "tipo:valor" o "tipo1:valor1|tipo2:valor2"
+            Lista de selectores (puede estar vacía)
         """
         found_index = properties.get('found_index', 0)
+        selectors = []
         
         # Prioridad 1: AutomationId (el más confiable, no necesita found_index)
         if properties.get('auto_id'):
-            return "auto_id:{}".format(properties['auto_id'])
+            selectors.append("auto_id:{}".format(properties['auto_id']))
+        
+        # Prioridad 2: Ruta de ancestros (found_index relativo al padre, no al árbol completo)
+        if properties.get('path'):
+            selectors.append(encode_path(properties['path']))
         
-        # Prioridad 2: Nombre + tipo de control + found_index si es necesario
+        # Prioridad 3: Nombre + tipo de control + found_index si es necesario
         if properties.get('name'):
             name = properties['name']
             control_type = properties.get('control_type', '')
@@ -730,9 +1179,9 @@ class ElementPicker:
             if is_generic or found_index > 0:
                 selector_parts.append("found_index:{}".format(found_index))
             
-            return "|".join(selector_parts)
+            selectors.append("|".join(selector_parts))
         
-        # Prioridad 3: Clase + tipo de control + found_index
+        # Prioridad 4: Clase + tipo de control + found_index
         if properties.get('class_name'):
             class_name = properties['class_name']
             control_type = properties.get('control_type', '')
@@ -745,21 +1194,25 @@ class ElementPicker:
             # Siempre agregar found_index cuando no hay auto_id ni name
             selector_parts.append("found_index:{}".format(found_index))
             
-            return "|".join(selector_parts)
+            selectors.append("|".join(selector_parts))
         
-        # Prioridad 4: Solo tipo de control + found_index
-        if properties.get('control_type'):
-            return "control_type:{}|found_index:{}".format(
+        # Prioridad 5: Imagen de referencia (sobrevive a movimientos de ventana)
+        if properties.get('image_ref'):
+            selectors.append("image:{}".format(properties['image_ref']))
+        
+        # Prioridad 6: Solo tipo de control + found_index
+        if not selectors and properties.get('control_type'):
+            selectors.append("control_type:{}|found_index:{}".format(
                 properties['control_type'], 
                 found_index
-            )
+            ))
         
         # Fallback absoluto: Coordenadas
-        if properties.get('coordinates'):
+        if not selectors and properties.get('coordinates'):
             coords = properties['coordinates']
-            return "coordinates:{},{}".format(coords[0], coords[1])
+            selectors.append("coordinates:{},{}".format(coords[0], coords[1]))
         
-        return "unknown"
+        return selectors
     
     def _capture_screenshot(self, element: UIAWrapper) -> Optional[str]:
         """
@@ -792,6 +1245,7 @@ class ElementPicker:
             
             # Capturar región
             screenshot = ImageGrab.grab(bbox=bbox)
+            self._captured_image = (screenshot.copy(), bbox)
             
             # Limitar tamaño máximo (500x500)
             max_size = (500, 500)
@@ -813,6 +1267,41 @@ class ElementPicker:
             logger.debug("Error capturando screenshot: %s", e)
             return None
     
+    def _needs_image_reference(self, properties: Dict[str, Any]) -> bool:
+        """True si el selector solo podría caer en coordenadas"""
+        return not any(properties.get(key) for key in
+                       ('auto_id', 'name', 'class_name', 'control_type'))
+    
+    def _save_image_reference(self, x: int, y: int,
+                              properties: Dict[str, Any]) -> Optional[str]:
+        """
+        Recorta y guarda la referencia visual alrededor del punto de click.
+        
+        Usa la captura sin reducir que produjo _capture_screenshot.
+        
+        Args:
+            x: Coordenada X del click
+            y: Coordenada Y del click
+            properties: Propiedades del elemento (ventana y proceso para metadata)
+            
+        Returns:
+            ID de la referencia o None si no hay captura
+        """
+        if not self._captured_image:
+            return None
+        
+        try:
+            image, bbox = self._captured_image
+            crop, offset = crop_reference(image, bbox, x, y)
+            meta = {
+                'window_title': properties.get('window_title'),
+                'process_name': properties.get('process_name')
+            }
+            return self._reference_store.save(crop, offset, meta)
+        except Exception as e:
+            logger.debug("Error guardando referencia de imagen: %s", e)
+            return None
+    
     # ==================== OVERLAY VISUAL ====================
     
     def _update_overlay(self, rect: Tuple[int, int, int, int]) -> None:
@@ -1069,11 +1558,28 @@ class ElementPicker:
     def _mouse_hook_proc(self, nCode: int, wParam: int, lParam: int) -> int:
         """Callback para el hook de mouse."""
         try:
-            if nCode >= 0 and wParam == WM_LBUTTONDOWN:
+            if nCode >= 0 and wParam == WM_MOUSEMOVE:
+                # Solo registrar la posición: el loop aplica debounce y coalescing
+                mouse_struct = ctypes.cast(lParam, ctypes.POINTER(MSLLHOOKSTRUCT)).contents
+                now = time.time()
+                if self._pending_hover is None:
+                    self._pending_since = now
+                self._pending_hover = (mouse_struct.pt.x, mouse_struct.pt.y)
+                self._last_move_time = now
+                self._hover_stats['moves'] += 1
+            
+            elif nCode >= 0 and wParam == WM_LBUTTONDOWN:
                 # CTRL + Click izquierdo
                 if self._ctrl_pressed:
                     mouse_struct = ctypes.cast(lParam, ctypes.POINTER(MSLLHOOKSTRUCT)).contents
                     
+                    # Sesión: solo encolar, el worker captura (el hook debe volver rápido)
+                    if self._session:
+                        with self._capture_cond:
+                            self._pending_clicks.append((mouse_struct.pt.x, mouse_struct.pt.y))
+                            self._capture_cond.notify()
+                        return 1
+                    
                     # Capturar elemento
                     self._capture_element(mouse_struct.pt.x, mouse_struct.pt.y)
                     
@@ -1110,6 +1616,7 @@ class ElementPicker:
         """Limpia los datos del elemento capturado."""
         self._captured_element = None
         self._captured_selector = None
+        self._captured_alternatives = []
         self._captured_properties = None
         self._captured_screenshot = None
-
+        self._captured_image = None
@@ -5,13 +5,20 @@ Soporta lectura/escritura con pandas y automatización COM con pywin32
 
 import logging
 import os
+from collections import OrderedDict
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Optional, Tuple, Union
 import pandas as pd
 
+from .table import Table
+
 logger = logging.getLogger(__name__)
 
 
+# Archivos parseados retenidos para lookups (con sus índices por columna)
+MAX_CACHED_TABLES = 8
+
+
 class ExcelEngineError(Exception):
     """Excepción base para errores del motor Excel"""
     pass
@@ -45,6 +52,8 @@ class ExcelEngine:
         """
         self.use_com = use_com
         self.com_excel = None
+        # ruta -> (mtime, tamaño, Table, {columna: índice hash}); LRU
+        self._table_cache: 'OrderedDict[str, Tuple[float, int, Table, Dict[Any, Dict[str, int]]]]' = OrderedDict()
 
         if use_com:
             try:
@@ -87,9 +96,9 @@ class ExcelEngine:
         return path
 
     def read_file(self, file_path: str, sheet_name: Union[str, int] = 0,
-                  header: Optional[int] = 0) -> List[Dict[str, Any]]:
+                  header: Optional[int] = 0) -> Table:
         """
-        Lee archivo Excel o CSV y retorna lista de diccionarios
+        Lee archivo Excel o CSV y retorna una tabla por columnas
 
         Args:
             file_path: Ruta del archivo
@@ -97,7 +106,29 @@ class ExcelEngine:
             header: Fila que contiene los encabezados (0-indexed, None si no hay)
 
         Returns:
-            Lista de diccionarios donde cada dict es una fila
+            Table (se itera por filas como dicts; to_records() para JSON)
+
+        Raises:
+            FileNotFoundError: Si el archivo no existe
+            InvalidFileFormatError: Si el formato no es soportado
+        """
+        data = Table.from_frame(self.read_frame(file_path, sheet_name, header))
+
+        logger.info(f"Archivo leído: {file_path} ({len(data)} filas)")
+        return data
+
+    def read_frame(self, file_path: str, sheet_name: Union[str, int] = 0,
+                   header: Optional[int] = 0) -> pd.DataFrame:
+        """
+        Lee archivo Excel o CSV como DataFrame (para operaciones por columna)
+
+        Args:
+            file_path: Ruta del archivo
+            sheet_name: Nombre o índice de la hoja (solo Excel)
+            header: Fila que contiene los encabezados (0-indexed, None si no hay)
+
+        Returns:
+            DataFrame con los datos del archivo
 
         Raises:
             FileNotFoundError: Si el archivo no existe
@@ -108,18 +139,12 @@ class ExcelEngine:
 
             # Leer según el formato
             if path.suffix.lower() == '.csv':
-                df = pd.read_csv(path, header=header, encoding='utf-8-sig')
+                return pd.read_csv(path, header=header, encoding='utf-8-sig')
             elif path.suffix.lower() == '.tsv':
-                df = pd.read_csv(path, sep='\t', header=header, encoding='utf-8-sig')
+                return pd.read_csv(path, sep='\t', header=header, encoding='utf-8-sig')
             else:
                 # Excel (xlsx, xls, xlsm)
-                df = pd.read_excel(path, sheet_name=sheet_name, header=header)
-
-            # Convertir a lista de diccionarios
-            data = df.to_dict('records')
-
-            logger.info(f"Archivo leído: {file_path} ({len(data)} filas)")
-            return data
+                return pd.read_excel(path, sheet_name=sheet_name, header=header)
 
         except (FileNotFoundError, InvalidFileFormatError):
             raise
@@ -127,8 +152,51 @@ class ExcelEngine:
             logger.error(f"Error leyendo archivo: {e}")
             raise ExcelEngineError(f"Error leyendo archivo: {e}")
 
+    def lookup_index(self, file_path: str, key_column: str) -> Tuple[Table, Dict[str, int]]:
+        """
+        Tabla de un archivo y su índice hash por columna (ambos cacheados)
+
+        Args:
+            file_path: Archivo secundario (ej: bd_ocasionales.csv)
+            key_column: Columna clave (ej: modular)
+
+        Returns:
+            Tupla (Table, {clave normalizada: posición de fila}); ver table.lookup_key
+
+        Raises:
+            ExcelEngineError: Si la columna no existe en el archivo
+        """
+        _, _, table, indexes = self._cached_entry(file_path)
+        index = indexes.get(key_column)
+        if index is None:
+            if key_column not in table.columns:
+                raise ExcelEngineError(f"Columna '{key_column}' no existe en {file_path}")
+            index = indexes[key_column] = table.index_by(key_column)
+            logger.info(f"Índice de lookup: {file_path} por '{key_column}' ({len(index)} claves)")
+        return table, index
+
+    def _cached_entry(self, file_path: str) -> Tuple[float, int, Table, Dict[Any, Dict[str, int]]]:
+        """
+        Tabla e índices de un archivo, leídos una sola vez mientras no cambie en disco
+
+        Se cachea por ruta (LRU de MAX_CACHED_TABLES) y se invalida si
+        cambian la fecha de modificación o el tamaño del archivo.
+        """
+        path = self._validate_file_path(file_path)
+        cache_key = str(path.resolve())
+        stat = path.stat()
+        entry = self._table_cache.get(cache_key)
+        if entry is not None and entry[0] == stat.st_mtime and entry[1] == stat.st_size:
+            self._table_cache.move_to_end(cache_key)
+            return entry
+        entry = (stat.st_mtime, stat.st_size, self.read_file(file_path), {})
+        self._table_cache[cache_key] = entry
+        while len(self._table_cache) > MAX_CACHED_TABLES:
+            self._table_cache.popitem(last=False)
+        return entry
+
     def read_excel(self, file_path: str, sheet_name: Union[str, int] = 0,
-                   header: Optional[int] = 0) -> List[Dict[str, Any]]:
+                   header: Optional[int] = 0) -> Table:
         """
         Lee archivo Excel específicamente
         Alias de read_file para compatibilidad
@@ -136,7 +204,7 @@ class ExcelEngine:
         return self.read_file(file_path, sheet_name, header)
 
     def read_csv(self, file_path: str, header: Optional[int] = 0,
-                 delimiter: str = ',', encoding: str = 'utf-8-sig') -> List[Dict[str, Any]]:
+                 delimiter: str = ',', encoding: str = 'utf-8-sig') -> Table:
         """
         Lee archivo CSV con opciones avanzadas
 
@@ -147,12 +215,12 @@ class ExcelEngine:
             encoding: Codificación del archivo
 
         Returns:
-            Lista de diccionarios
+            Table con los datos del CSV
         """
         try:
             path = self._validate_file_path(file_path)
             df = pd.read_csv(path, header=header, delimiter=delimiter, encoding=encoding)
-            data = df.to_dict('records')
+            data = Table.from_frame(df)
 
             logger.info(f"CSV leído: {file_path} ({len(data)} filas)")
             return data
@@ -161,14 +229,14 @@ class ExcelEngine:
             logger.error(f"Error leyendo CSV: {e}")
             raise ExcelEngineError(f"Error leyendo CSV: {e}")
 
-    def write_file(self, file_path: str, data: List[Dict[str, Any]],
+    def write_file(self, file_path: str, data: Union[Table, List[Dict[str, Any]]],
                    sheet_name: str = 'Sheet1', index: bool = False) -> None:
         """
         Escribe datos a archivo Excel o CSV
 
         Args:
             file_path: Ruta del archivo de salida
-            data: Lista de diccionarios a escribir
+            data: Table o lista de diccionarios a escribir
             sheet_name: Nombre de la hoja (solo Excel)
             index: Si True, incluye índice en la salida
 
@@ -184,8 +252,8 @@ class ExcelEngine:
                     f"Formatos válidos: {', '.join(self.SUPPORTED_FORMATS)}"
                 )
 
-            # Convertir a DataFrame
-            df = pd.DataFrame(data)
+            # Convertir a DataFrame (una Table pasa sus columnas directamente)
+            df = data.to_frame() if isinstance(data, Table) else pd.DataFrame(data)
 
             # Crear directorio si no existe
             path.parent.mkdir(parents=True, exist_ok=True)
@@ -207,7 +275,7 @@ class ExcelEngine:
             logger.error(f"Error escribiendo archivo: {e}")
             raise ExcelEngineError(f"Error escribiendo archivo: {e}")
 
-    def write_excel(self, file_path: str, data: List[Dict[str, Any]],
+    def write_excel(self, file_path: str, data: Union[Table, List[Dict[str, Any]]],
                     sheet_name: str = 'Sheet1', index: bool = False) -> None:
         """
         Escribe datos a Excel específicamente
@@ -215,20 +283,20 @@ class ExcelEngine:
         """
         self.write_file(file_path, data, sheet_name, index)
 
-    def write_csv(self, file_path: str, data: List[Dict[str, Any]],
+    def write_csv(self, file_path: str, data: Union[Table, List[Dict[str, Any]]],
                   index: bool = False, encoding: str = 'utf-8-sig') -> None:
         """
         Escribe datos a CSV
 
         Args:
             file_path: Ruta del archivo CSV de salida
-            data: Lista de diccionarios
+            data: Table o lista de diccionarios
             index: Si True, incluye índice
             encoding: Codificación del archivo
         """
         try:
             path = Path(file_path)
-            df = pd.DataFrame(data)
+            df = data.to_frame() if isinstance(data, Table) else pd.DataFrame(data)
 
             path.parent.mkdir(parents=True, exist_ok=True)
             df.to_csv(path, index=index, encoding=encoding)
@@ -296,23 +364,21 @@ class ExcelEngine:
             logger.error(f"Error obteniendo columnas: {e}")
             raise ExcelEngineError(f"Error obteniendo columnas: {e}")
 
-    def filter_data(self, data: List[Dict[str, Any]],
-                    column: str, value: Any) -> List[Dict[str, Any]]:
+    def filter_data(self, data: Union[Table, List[Dict[str, Any]]],
+                    column: str, value: Any) -> Table:
         """
         Filtra datos por columna y valor
 
         Args:
-            data: Lista de diccionarios
+            data: Table (sin copia) o lista de diccionarios
             column: Nombre de columna a filtrar
             value: Valor a buscar
 
         Returns:
-            Lista filtrada
+            Vista filtrada de la tabla
         """
         try:
-            df = pd.DataFrame(data)
-            filtered_df = df[df[column] == value]
-            result = filtered_df.to_dict('records')
+            result = Table.coerce(data).filter(column, value)
 
             logger.info(f"Datos filtrados: {len(result)} de {len(data)} filas")
             return result
@@ -321,6 +387,45 @@ class ExcelEngine:
             logger.error(f"Error filtrando datos: {e}")
             raise ExcelEngineError(f"Error filtrando datos: {e}")
 
+    def query_frame(self, frame: pd.DataFrame, where: Optional[str] = None,
+                    order_by: Optional[List[tuple]] = None, limit: Optional[int] = None,
+                    offset: int = 0) -> pd.DataFrame:
+        """
+        Filtra, ordena y pagina un DataFrame con operaciones vectorizadas
+
+        Args:
+            frame: Datos leídos con read_frame
+            where: Expresión de DataFrame.query (columnas entre backticks)
+            order_by: Lista de (columna, ascendente)
+            limit: Filas máximas a retornar
+            offset: Filas a saltar (después de filtrar y ordenar)
+
+        Returns:
+            DataFrame resultante; el índice conserva la posición de cada fila en el archivo
+
+        Raises:
+            ExcelEngineError: Si la expresión o las columnas no son válidas
+        """
+        try:
+            total = len(frame)
+            if where:
+                # Motor python: sin dependencia de numexpr y con soporte de métodos (.astype, .str)
+                frame = frame.query(where, engine='python')
+            if order_by:
+                frame = frame.sort_values(by=[column for column, _ in order_by],
+                                          ascending=[ascending for _, ascending in order_by],
+                                          kind='mergesort')
+            if offset or limit is not None:
+                end = offset + limit if limit is not None else None
+                frame = frame.iloc[offset:end]
+
+            logger.info(f"Datos consultados: {len(frame)} de {total} filas")
+            return frame
+
+        except Exception as e:
+            logger.error(f"Error consultando datos: {e}")
+            raise ExcelEngineError(f"Error consultando datos: {e}")
+
     def close(self) -> None:
         """Cierra recursos (COM Excel si está abierto)"""
         if self.use_com and self.com_excel:
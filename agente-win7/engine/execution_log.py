@@ -0,0 +1,275 @@
+"""
+Log de ejecución estructurado y acotado
+Guarda eventos (nivel, nodo, fila, timestamp, mensaje) en un buffer de tamaño fijo
+y resume las iteraciones de loops: detalle completo solo para las primeras/últimas
+N filas y para las filas con error
+"""
+
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# Eventos retenidos en total por ejecución
+DEFAULT_MAX_EVENTS = 2000
+
+# Iteraciones con detalle completo al inicio y al final de cada loop
+DEFAULT_SAMPLE_HEAD = 5
+DEFAULT_SAMPLE_TAIL = 5
+
+# Eventos máximos retenidos dentro de una sola iteración
+DEFAULT_MAX_ITERATION_EVENTS = 200
+
+
+class LogEvent:
+    """
+    Evento del log de ejecución
+
+    El mensaje se guarda sin formatear (message + args) y solo se
+    formatea al serializar la respuesta.
+    """
+
+    __slots__ = ('level', 'message', 'args', 'node_id', 'row_index', 'timestamp')
+
+    def __init__(self, level: int, message: str, args: Tuple[Any, ...] = (),
+                 node_id: Optional[str] = None, row_index: Optional[int] = None,
+                 timestamp: Optional[float] = None):
+        self.level = level
+        self.message = message
+        self.args = args
+        self.node_id = node_id
+        self.row_index = row_index
+        self.timestamp = timestamp if timestamp is not None else time.time()
+
+    def format(self) -> str:
+        """Retorna el mensaje formateado"""
+        if not self.args:
+            return self.message
+        try:
+            return self.message % self.args
+        except Exception:
+            return f"{self.message} {self.args}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializa el evento para la respuesta JSON"""
+        return {
+            'level': logging.getLevelName(self.level),
+            'message': self.format(),
+            'node_id': self.node_id,
+            'row_index': self.row_index,
+            'timestamp': round(self.timestamp, 3)
+        }
+
+
+class _LoopFrame:
+    """Estado de muestreo de un loop en curso"""
+
+    __slots__ = ('total', 'iteration', 'current', 'current_dropped', 'tail',
+                 'omitted', 'omitted_events', 'omitted_first', 'failed')
+
+    def __init__(self, total: Optional[int], sample_tail: int):
+        self.total = total
+        self.iteration: Optional[int] = None
+        self.current: Optional[List[LogEvent]] = None
+        self.current_dropped = 0
+        # Iteraciones recientes pendientes de decidir: (índice, eventos)
+        self.tail: Deque[Tuple[int, List[LogEvent]]] = deque(maxlen=max(sample_tail, 0) or None)
+        self.omitted = 0
+        self.omitted_events = 0
+        self.omitted_first: Optional[int] = None
+        self.failed = 0
+
+
+class ExecutionLog:
+    """
+    Buffer acotado de eventos de ejecución con muestreo por iteración
+
+    Uso:
+        log = ExecutionLog()
+        log.add(logging.INFO, "Iniciando workflow: %s", (name,))
+        with log.loop(total=len(rows)):
+            for i, row in enumerate(rows, 1):
+                with log.iteration(i):
+                    log.add(logging.INFO, "Escribir: %s", (text,))
+    """
+
+    def __init__(self, max_events: int = DEFAULT_MAX_EVENTS,
+                 sample_head: int = DEFAULT_SAMPLE_HEAD,
+                 sample_tail: int = DEFAULT_SAMPLE_TAIL,
+                 max_iteration_events: int = DEFAULT_MAX_ITERATION_EVENTS):
+        """
+        Inicializa el log
+
+        Args:
+            max_events: Eventos retenidos en total (los más antiguos se descartan)
+            sample_head: Iteraciones iniciales con detalle completo por loop
+            sample_tail: Iteraciones finales con detalle completo por loop
+            max_iteration_events: Eventos máximos retenidos por iteración
+        """
+        self.max_events = max_events
+        self.sample_head = sample_head
+        self.sample_tail = sample_tail
+        self.max_iteration_events = max_iteration_events
+        self.clear()
+
+    def clear(self) -> None:
+        """Reinicia el log para una nueva ejecución"""
+        self._events: Deque[LogEvent] = deque(maxlen=self.max_events)
+        self._frames: List[_LoopFrame] = []
+        self.dropped = 0
+        self.omitted_iterations = 0
+
+    # ==================== REGISTRO ====================
+
+    def add(self, level: int, message: str, args: Tuple[Any, ...] = (),
+            node_id: Optional[str] = None) -> None:
+        """
+        Registra un evento
+
+        Args:
+            level: Nivel de logging (logging.INFO, logging.ERROR, ...)
+            message: Mensaje con placeholders estilo %
+            args: Argumentos del mensaje (se formatean al serializar)
+            node_id: ID del nodo que generó el evento
+        """
+        row_index = None
+        for frame in reversed(self._frames):
+            if frame.iteration is not None:
+                row_index = frame.iteration
+                break
+        self._sink(LogEvent(level, message, args, node_id, row_index))
+
+    def _sink(self, event: LogEvent, depth: Optional[int] = None) -> None:
+        """Envía un evento al buffer de la iteración abierta más interna o al buffer principal"""
+        frames = self._frames if depth is None else self._frames[:depth]
+        for frame in reversed(frames):
+            if frame.current is not None:
+                if len(frame.current) < self.max_iteration_events:
+                    frame.current.append(event)
+                else:
+                    frame.current_dropped += 1
+                return
+        if len(self._events) == self._events.maxlen:
+            self.dropped += 1
+        self._events.append(event)
+
+    def _flush(self, events: List[LogEvent], depth: int) -> None:
+        for event in events:
+            self._sink(event, depth)
+
+    # ==================== LOOPS ====================
+
+    @contextmanager
+    def loop(self, total: Optional[int] = None) -> Iterator[None]:
+        """Delimita un loop; al salir emite el resumen y las últimas iteraciones"""
+        self._frames.append(_LoopFrame(total, self.sample_tail))
+        depth = len(self._frames) - 1
+        try:
+            yield
+        finally:
+            frame = self._frames.pop()
+            self._flush_omitted(frame, depth)
+            for _, events in frame.tail:
+                self._flush(events, depth)
+            if frame.failed:
+                self._sink(LogEvent(
+                    logging.WARNING, "  %d iteraciones con error", (frame.failed,)
+                ), depth)
+
+    @contextmanager
+    def iteration(self, index: int) -> Iterator[None]:
+        """Delimita una iteración; si sale con excepción se conserva su detalle"""
+        frame = self._frames[-1]
+        frame.iteration = index
+        frame.current = []
+        frame.current_dropped = 0
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            self._end_iteration(frame, failed)
+
+    def _end_iteration(self, frame: _LoopFrame, failed: bool) -> None:
+        depth = len(self._frames) - 1
+        index = frame.iteration
+        events = frame.current or []
+        if frame.current_dropped:
+            events.append(LogEvent(
+                logging.INFO, "  ... %d eventos de la iteración %d omitidos",
+                (frame.current_dropped, index), row_index=index
+            ))
+        frame.current = None
+        frame.iteration = None
+
+        if failed:
+            # Detalle completo de la fila con error, en orden cronológico
+            frame.failed += 1
+            self._flush_omitted(frame, depth)
+            while frame.tail:
+                self._flush(frame.tail.popleft()[1], depth)
+            self._flush(events, depth)
+            return
+
+        if index is not None and index <= self.sample_head:
+            self._flush(events, depth)
+            return
+
+        if frame.tail.maxlen is None:
+            # sample_tail = 0: nada se retiene para el final
+            self._omit(frame, index, events)
+            return
+
+        if len(frame.tail) == frame.tail.maxlen:
+            old_index, old_events = frame.tail.popleft()
+            self._omit(frame, old_index, old_events)
+        frame.tail.append((index, events))
+
+    def _omit(self, frame: _LoopFrame, index: Optional[int], events: List[LogEvent]) -> None:
+        frame.omitted += 1
+        frame.omitted_events += len(events)
+        if frame.omitted_first is None:
+            frame.omitted_first = index
+        self.omitted_iterations += 1
+
+    def _flush_omitted(self, frame: _LoopFrame, depth: int) -> None:
+        """Emite un evento resumen por las iteraciones omitidas hasta ahora"""
+        if not frame.omitted:
+            return
+        self._sink(LogEvent(
+            logging.INFO,
+            "\n  ... %d iteraciones sin errores omitidas del detalle (desde fila %s, %d eventos)",
+            (frame.omitted, frame.omitted_first, frame.omitted_events)
+        ), depth)
+        frame.omitted = 0
+        frame.omitted_events = 0
+        frame.omitted_first = None
+
+    # ==================== CONSULTA ====================
+
+    def events(self) -> List[LogEvent]:
+        """Retorna los eventos retenidos en el buffer principal"""
+        return list(self._events)
+
+    def to_strings(self) -> List[str]:
+        """Retorna los eventos formateados como texto"""
+        lines = [event.format() for event in self._events]
+        if self.dropped:
+            lines.insert(0, f"... {self.dropped} eventos anteriores descartados")
+        return lines
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Retorna los eventos como diccionarios para JSON"""
+        return [event.to_dict() for event in self._events]
+
+    def get_stats(self) -> Dict[str, int]:
+        """Retorna métricas del log (retenidos, descartados, iteraciones omitidas)"""
+        return {
+            'events': len(self._events),
+            'dropped': self.dropped,
+            'omitted_iterations': self.omitted_iterations
+        }
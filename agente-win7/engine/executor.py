@@ -3,17 +3,63 @@ Ejecutor de workflows RPA
 Procesa nodos y ejecuta acciones en orden
 """
 
+import glob
+import json
 import logging
 import re
 import time
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterable, Iterator, List, Any, Mapping, Optional, Sequence, Set
 from .desktop import DesktopEngine, DesktopEngineError
 from .excel import ExcelEngine, ExcelEngineError
+from .execution_log import ExecutionLog
+from .result_writer import DEFAULT_FLUSH_INTERVAL, DEFAULT_FLUSH_ROWS, ResultWriter, ResultWriterError
+from .row_ledger import DEFAULT_LEDGER_FILE, RowLedger, RowLedgerError, render_keys
+from .row_pipeline import DEFAULT_PREFETCH_FILES, FilePrefetcher, RowPipeline
+from .row_templates import (RenderedRow, compile_row_condition, is_row_template, render_columns,
+                            render_row_template)
+from .row_validation import RowValidationError, validate_frame
+from .table import Table, lookup_key
+from .ui_path import PATH_PREFIX, decode_path
 
 logger = logging.getLogger(__name__)
 
 
+class _LoopState:
+    """Configuración y contadores de un loop Excel en curso"""
+
+    __slots__ = ('children', 'output_columns', 'output_templates', 'continue_on_error', 'writer',
+                 'rejects', 'ledger', 'ledger_key', 'joins', 'keys', 'total', 'offset', 'file_name',
+                 'errors', 'rejected', 'skipped', 'file_errors')
+
+    def __init__(self, children: List[Dict], output_columns: Dict[str, Optional[str]],
+                 continue_on_error: bool):
+        self.children = children
+        self.output_columns = output_columns
+        self.continue_on_error = continue_on_error
+        self.writer: Optional[ResultWriter] = None
+        self.rejects: Optional[ResultWriter] = None
+        self.ledger: Optional[RowLedger] = None
+        self.ledger_key: Optional[str] = None
+        # Del archivo en curso: plantillas de salida, joins, claves del registro, filas y nombre
+        self.output_templates: Dict[str, str] = {}
+        self.joins: List[tuple] = []
+        self.keys: Optional[List[Optional[str]]] = None
+        self.total = 0
+        self.file_name: Optional[str] = None
+        # Iteraciones de archivos anteriores (numeración global del log)
+        self.offset = 0
+        self.errors = 0
+        self.rejected = 0
+        self.skipped = 0
+        self.file_errors = 0
+
+
+def _is_glob(text: str) -> bool:
+    return any(char in text for char in '*?[')
+
+
 class WorkflowExecutorError(Exception):
     """Excepción base para errores del ejecutor"""
     pass
@@ -44,9 +90,13 @@ class WorkflowExecutor:
 
         # Contexto de ejecución
         self.variables: Dict[str, Any] = {}
-        self.current_row: Dict[str, Any] = {}
-        self.execution_logs: List[str] = []
+        self.current_row: Mapping[str, Any] = {}
+        self.execution_log = ExecutionLog()
         self.execution_status: str = 'idle'
+        self._current_node_id: Optional[str] = None
+        self._workflow_name: str = 'Sin nombre'
+        # Plantillas de la fila actual ya renderizadas (dict o RenderedRow, ver _loop_excel)
+        self._prerendered: Optional[Any] = None
 
         logger.info("WorkflowExecutor inicializado (Desktop + Excel)")
 
@@ -68,14 +118,18 @@ class WorkflowExecutor:
             {
                 "status": "success" | "error" | "stopped",
                 "executed_nodes": int,
-                "logs": [str],
+                "logs": [str],            # Acotado; loops resumidos por iteración
+                "log_events": [dict],     # Mismos eventos estructurados
+                "log_stats": dict,
                 "error": str (opcional),
                 "duration_seconds": float
             }
         """
         start_time = time.time()
-        self.execution_logs = []
+        self.execution_log.clear()
+        self._current_node_id = None
         self.execution_status = 'running'
+        self._workflow_name = workflow.get('name') or 'Sin nombre'
 
         try:
             # Validar workflow
@@ -90,14 +144,14 @@ class WorkflowExecutor:
             edges = workflow.get('edges', [])
             ordered_nodes = self._order_nodes(nodes, edges)
 
-            self._log(f"Iniciando workflow: {workflow.get('name', 'Sin nombre')}")
-            self._log(f"Total de nodos: {len(ordered_nodes)}")
+            self._log("Iniciando workflow: %s", workflow.get('name', 'Sin nombre'))
+            self._log("Total de nodos: %d", len(ordered_nodes))
 
             # Ejecutar cada nodo
             for i, node in enumerate(ordered_nodes, 1):
-                self._log(f"\n--- Ejecutando nodo {i}/{len(ordered_nodes)}: {node.get('type')} ---")
+                self._log("\n--- Ejecutando nodo %d/%d: %s ---", i, len(ordered_nodes), node.get('type'))
                 self._execute_node(node)
-                self._log(f"✅ Nodo {i} completado")
+                self._log("✅ Nodo %d completado", i)
 
             # Ejecución exitosa
             duration = time.time() - start_time
@@ -106,14 +160,16 @@ class WorkflowExecutor:
             return {
                 'status': 'success',
                 'executed_nodes': len(ordered_nodes),
-                'logs': self.execution_logs,
+                'logs': self.execution_log.to_strings(),
+                'log_events': self.execution_log.to_dicts(),
+                'log_stats': self.execution_log.get_stats(),
                 'duration_seconds': round(duration, 2)
             }
 
         except Exception as e:
             duration = time.time() - start_time
             error_msg = f"Error en ejecución: {str(e)}"
-            self._log(f"\n❌ {error_msg}")
+            self.execution_log.add(logging.ERROR, "\n❌ %s", (error_msg,), self._current_node_id)
             self.execution_status = 'error'
 
             logger.error(error_msg)
@@ -121,10 +177,101 @@ class WorkflowExecutor:
             return {
                 'status': 'error',
                 'error': str(e),
-                'logs': self.execution_logs,
+                'logs': self.execution_log.to_strings(),
+                'log_events': self.execution_log.to_dicts(),
+                'log_stats': self.execution_log.get_stats(),
                 'duration_seconds': round(duration, 2)
             }
 
+        finally:
+            # Historial de selectores aprendido en esta ejecución (solo DesktopEngine lo tiene)
+            stats = getattr(self.desktop, 'selector_stats', None)
+            if stats is not None:
+                stats.flush()
+
+    def preflight(self, workflow: Dict[str, Any],
+                  handle: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Valida todos los selectores del workflow sin ejecutarlo
+
+        Recorre las acciones (incluyendo childNodes, trueNodes y falseNodes)
+        y resuelve cada selector distinto contra un único snapshot del árbol
+        de la ventana actual.
+
+        Args:
+            workflow: Workflow con el mismo formato que execute()
+            handle: Handle de la ventana a validar (por defecto, la app conectada)
+
+        Returns:
+            {
+                "status": "ok" | "failed",
+                "summary": {"total": int, "ok": int, "ambiguous": int, ...},
+                "snapshot": {...},
+                "selectors": [{"node_id", "action", "selector", "strategy",
+                               "matches", "status", "latency_ms"}, ...],
+                "duration_seconds": float
+            }
+        """
+        start_time = time.time()
+        self._validate_workflow(workflow)
+
+        actions: List[Dict[str, Any]] = []
+        self._collect_actions(workflow.get('nodes', []), actions)
+
+        # Selectores distintos: cada uno se resuelve una sola vez
+        unique: Dict[str, Dict[str, Any]] = {}
+        entries = []
+        for node_id, action_type, raw in actions:
+            entry = {'node_id': node_id, 'action': action_type, 'selector': raw}
+            if isinstance(raw, str) and '{{' in raw:
+                # Depende de la fila/variables: solo se conoce al ejecutar
+                entry['status'] = 'dynamic'
+            else:
+                parsed = self._parse_selector(raw)
+                if not parsed:
+                    entry['status'] = 'invalid'
+                else:
+                    key = json.dumps(parsed, sort_keys=True, default=str)
+                    unique.setdefault(key, parsed)
+                    entry['_key'] = key
+            entries.append(entry)
+
+        report = self.desktop.preflight(list(unique.values()), handle=handle)
+        resolved = {key: result for key, result in zip(unique, report['results'])}
+
+        summary: Dict[str, int] = {'total': len(entries)}
+        for entry in entries:
+            key = entry.pop('_key', None)
+            if key is not None:
+                result = dict(resolved[key])
+                result.pop('selector', None)
+                entry.update(result)
+            summary[entry['status']] = summary.get(entry['status'], 0) + 1
+
+        failed = any(summary.get(status) for status in ('not_found', 'invalid', 'error'))
+        return {
+            'status': 'failed' if failed else 'ok',
+            'summary': summary,
+            'snapshot': report['snapshot'],
+            'selectors': entries,
+            'duration_seconds': round(time.time() - start_time, 3)
+        }
+
+    def _collect_actions(self, nodes: List[Dict[str, Any]], out: List[tuple]) -> None:
+        """Agrega (node_id, actionType, selector) de las acciones con selector, recursivamente"""
+        for node in nodes:
+            data = node.get('data', {})
+            node_type = node.get('type')
+            if node_type == 'action':
+                selector = data.get('params', {}).get('selector')
+                if selector:
+                    out.append((node.get('id'), data.get('actionType'), selector))
+            elif node_type == 'loop':
+                self._collect_actions(data.get('childNodes', []), out)
+            elif node_type == 'ifElse':
+                self._collect_actions(data.get('trueNodes', []), out)
+                self._collect_actions(data.get('falseNodes', []), out)
+
     def _validate_workflow(self, workflow: Dict[str, Any]) -> None:
         """
         Valida estructura del workflow
@@ -172,6 +319,8 @@ class WorkflowExecutor:
         """
         node_type = node.get('type')
         node_data = node.get('data', {})
+        parent_node_id = self._current_node_id
+        self._current_node_id = node.get('id', parent_node_id)
 
         try:
             if node_type == 'action':
@@ -189,6 +338,9 @@ class WorkflowExecutor:
         except Exception as e:
             raise WorkflowExecutorError(f"Error ejecutando nodo {node_type}: {e}")
 
+        finally:
+            self._current_node_id = parent_node_id
+
     def _execute_action_node(self, data: Dict[str, Any]) -> None:
         """Ejecuta un nodo de acción (click, type, wait, etc.)"""
         action_type = data.get('actionType')
@@ -209,6 +361,15 @@ class WorkflowExecutor:
         elif action_type == 'extract':
             self._action_extract(params)
 
+        elif action_type == 'lookup':
+            self._action_lookup(params)
+
+        elif action_type == 'extractTable':
+            self._action_extract_table(params)
+
+        elif action_type == 'pasteBlock':
+            self._action_paste_block(params)
+
         elif action_type == 'navigate':
             # Acción no soportada
             pass
@@ -222,17 +383,23 @@ class WorkflowExecutor:
         child_nodes = data.get('childNodes', [])
         child_edges = data.get('childEdges', [])
 
-        if loop_type == 'excel':
-            self._loop_excel(data, child_nodes, child_edges)
+        # Un loop anidado cambia la fila: las plantillas del loop externo no aplican
+        saved_prerendered = self._prerendered
+        self._prerendered = None
+        try:
+            if loop_type == 'excel':
+                self._loop_excel(data, child_nodes, child_edges)
 
-        elif loop_type == 'times':
-            self._loop_times(data, child_nodes, child_edges)
+            elif loop_type == 'times':
+                self._loop_times(data, child_nodes, child_edges)
 
-        elif loop_type in ['while', 'until']:
-            self._loop_conditional(data, child_nodes, child_edges)
+            elif loop_type in ['while', 'until']:
+                self._loop_conditional(data, child_nodes, child_edges)
 
-        else:
-            logger.warning(f"Tipo de loop desconocido: {loop_type}")
+            else:
+                logger.warning(f"Tipo de loop desconocido: {loop_type}")
+        finally:
+            self._prerendered = saved_prerendered
 
     def _execute_if_else_node(self, data: Dict[str, Any]) -> None:
         """Ejecuta un nodo condicional if/else"""
@@ -244,11 +411,11 @@ class WorkflowExecutor:
         condition_result = self._evaluate_condition(condition)
 
         if condition_result:
-            self._log(f"Condición TRUE: {condition}")
+            self._log("Condición TRUE: %s", condition)
             for node in true_nodes:
                 self._execute_node(node)
         else:
-            self._log(f"Condición FALSE: {condition}")
+            self._log("Condición FALSE: %s", condition)
             for node in false_nodes:
                 self._execute_node(node)
 
@@ -262,7 +429,12 @@ class WorkflowExecutor:
         - String: "auto_id:btnGuardar" -> {"auto_id": "btnGuardar"}
         - String: "name:Aceptar|control_type:Button|found_index:0" -> {"title": "Aceptar", "control_type": "Button", "found_index": 0}
         - String: "coordinates:350,240" -> {"coordinates": [350, 240]}
-        - Dict: Ya está en formato correcto -> se retorna tal cual
+        - String: "image:3f2a9c..." -> {"image": "3f2a9c..."}
+        - String: 'path:[{"ct":"Pane",...},...]' -> {"path": [...]}
+        - Lista: ["auto_id:txtRuc", "image:3f2a9c..."] -> {"strategies": [{...}, {...}]}
+        - Dict: Ya está en formato correcto -> se retorna tal cual, salvo un
+          'path' todavía en texto (el frontend guarda {"path": "[{...}]"}),
+          que se decodifica
         
         Args:
             selector: Selector en formato string o dict
@@ -272,12 +444,38 @@ class WorkflowExecutor:
         """
         # Si ya es un dict, retornarlo
         if isinstance(selector, dict):
+            if isinstance(selector.get('path'), str):
+                try:
+                    return dict(selector, path=decode_path(PATH_PREFIX + selector['path']))
+                except ValueError as e:
+                    logger.warning(f"Selector path inválido: {e}")
+                    return {}
             return selector
         
+        # Estrategias alternativas: DesktopEngine las prueba en orden aprendido
+        if isinstance(selector, list):
+            strategies = [parsed for parsed in (self._parse_selector(s) for s in selector) if parsed]
+            if len(strategies) == 1:
+                return strategies[0]
+            return {'strategies': strategies} if strategies else {}
+        
         # Si es string, parsearlo
         if isinstance(selector, str):
+            selector = selector.strip()
             selector_dict = {}
             
+            # Caso especial: ruta de ancestros (JSON, puede contener '|' y ':')
+            if selector.startswith(PATH_PREFIX):
+                try:
+                    return {'path': decode_path(selector)}
+                except ValueError as e:
+                    logger.warning(f"Selector path inválido: {e}")
+                    return {}
+
+            # Caso especial: imagen de referencia
+            if selector.startswith('image:'):
+                return {'image': selector[len('image:'):].strip()}
+
             # Caso especial: coordinates
             if selector.startswith('coordinates:'):
                 coords_str = selector.replace('coordinates:', '')
@@ -324,7 +522,7 @@ class WorkflowExecutor:
         """Acción: Click en elemento"""
         selector_raw = params.get('selector', {})
         selector = self._parse_selector(selector_raw)
-        self._log(f"Click en: {selector}")
+        self._log("Click en: %s", selector)
         self.desktop.click(selector)
 
     def _action_type(self, params: Dict[str, Any]) -> None:
@@ -336,7 +534,7 @@ class WorkflowExecutor:
         # Reemplazar variables
         text = self._replace_variables(text)
 
-        self._log(f"Escribir: '{text}' en {selector}")
+        self._log("Escribir: '%s' en %s", text, selector)
         self.desktop.type_text(selector, text)
 
     def _action_wait(self, params: Dict[str, Any]) -> None:
@@ -345,14 +543,14 @@ class WorkflowExecutor:
 
         if wait_type == 'time':
             seconds = params.get('seconds', 1)
-            self._log(f"Esperar {seconds} segundos")
+            self._log("Esperar %s segundos", seconds)
             time.sleep(seconds)
 
         elif wait_type == 'element':
             selector_raw = params.get('selector', {})
             selector = self._parse_selector(selector_raw)
             timeout = params.get('timeout', 30)
-            self._log(f"Esperar elemento: {selector}")
+            self._log("Esperar elemento: %s", selector)
             self.desktop.wait_for_element(selector, timeout=timeout)
 
     def _action_read_text(self, params: Dict[str, Any]) -> None:
@@ -363,77 +561,747 @@ class WorkflowExecutor:
 
         text = self.desktop.read_text(selector)
         self.variables[var_name] = text
-        self._log(f"Texto leído y guardado en '{var_name}': {text}")
+        self._log("Texto leído y guardado en '%s': %s", var_name, text)
 
     def _action_extract(self, params: Dict[str, Any]) -> None:
         """Acción: Extraer datos"""
         # Similar a read_text
         self._action_read_text(params)
 
-    # ==================== LOOPS ====================
+    def _action_lookup(self, params: Dict[str, Any]) -> None:
+        """
+        Acción: Buscar una fila de otro archivo por clave ({{lookup.col}})
 
-    def _loop_excel(self, data: Dict[str, Any],
-                    child_nodes: List[Dict], child_edges: List[Dict]) -> None:
-        """Loop sobre archivo Excel/CSV"""
-        source = data.get('source', '')
+        El archivo se lee e indexa por 'key' una sola vez (se cachea
+        mientras no cambie en disco); cada búsqueda es O(1).
+        """
+        source, key = params.get('source'), params.get('key')
+        if not source or not key:
+            raise WorkflowExecutorError("lookup requiere 'source' y 'key'")
+        var_name = params.get('variableName', 'lookup')
+        value = self._replace_variables(str(params.get('value', '')))
+
+        table, index = self.excel.lookup_index(str(self._resolve_data_path(source)), key)
+        position = index.get(lookup_key(value))
+        if position is None:
+            if params.get('required'):
+                raise WorkflowExecutorError(f"lookup: {key}={value!r} no existe en {source}")
+            self.variables[var_name] = {}
+            self._log("Lookup sin coincidencia: %s=%s en %s", key, value, source, level=logging.WARNING)
+            return
+
+        self.variables[var_name] = table.row_at(position)
+        self._log("Lookup %s=%s en %s -> '%s'", key, value, source, var_name)
+
+    def _action_extract_table(self, params: Dict[str, Any]) -> None:
+        """Acción: Extraer grilla/lista completa a una variable o archivo"""
+        selector_raw = params.get('selector', {})
+        selector = self._parse_selector(selector_raw)
+        var_name = params.get('variableName', 'tabla')
+        max_rows = params.get('maxRows')
+
+        table = self.desktop.extract_table(selector, max_rows=int(max_rows) if max_rows else None,
+                                           cell_values=bool(params.get('cellValues', False)))
+        rows = table['rows']
+        self.variables[var_name] = rows
+        self._log("Tabla extraída de %s: %d filas, columnas %s (guardada en '%s')",
+                  selector, len(rows), table['columns'], var_name)
+        if table['truncated']:
+            self._log("Tabla truncada a %d filas", len(rows), level=logging.WARNING)
+
+        output_file = params.get('outputFile')
+        if output_file:
+            file_path = self._resolve_data_path(self._replace_variables(output_file))
+            self.excel.write_file(str(file_path), rows, sheet_name=params.get('sheetName', 'Sheet1'))
+            self._log("Tabla escrita en: %s", file_path)
+
+    def _action_paste_block(self, params: Dict[str, Any]) -> None:
+        """
+        Acción: Pegar un rango de filas en una grilla como un solo bloque TSV
 
-        if not source:
-            raise WorkflowExecutorError("Loop Excel requiere 'source' (nombre del archivo)")
+        Las filas salen de un archivo ('source') o de una variable con filas
+        ('variable', ej: la de extractTable). 'columns' lista nombres de columna
+        o plantillas {{fila.col}} por celda (por defecto, todas las columnas).
+        """
+        selector = self._parse_selector(params.get('selector', {}))
+
+        if params.get('variable'):
+            rows = self.variables.get(params['variable'])
+            if not isinstance(rows, (list, Table)):
+                raise WorkflowExecutorError(f"La variable '{params['variable']}' no contiene filas")
+        elif params.get('source'):
+            rows = self.excel.read_file(str(self._resolve_data_path(self._replace_variables(params['source']))))
+        else:
+            raise WorkflowExecutorError("pasteBlock requiere 'source' (archivo) o 'variable'")
+
+        start_row = int(self._replace_variables(str(params.get('startRow', 1))))
+        row_count = params.get('rowCount')
+        first = max(start_row - 1, 0)
+        last = first + int(self._replace_variables(str(row_count))) if row_count else len(rows)
+        block = rows[first:last]
+
+        columns = params.get('columns') or (list(block[0].keys()) if block else [])
+        cells = self._render_block(block, columns)
+        header_rows = 0
+        if params.get('includeHeader'):
+            cells.insert(0, [str(column) for column in columns])
+            header_rows = 1
+
+        verify_selector = None
+        verify_rows: List[int] = []
+        if params.get('gridSelector') and cells:
+            verify_selector = self._parse_selector(params['gridSelector'])
+            sample = max(int(params.get('verifySample', 3)), 1)
+            # Primera, última y filas intermedias espaciadas uniformemente
+            step = max((len(cells) - 1) / max(sample - 1, 1), 1)
+            verify_rows = sorted({min(round(i * step), len(cells) - 1) for i in range(sample)})
+        offset = params.get('verifyOffset', {})
+
+        self._log("Pegar bloque: filas %d-%d (%d columnas) en %s",
+                  first + 1, first + len(block), len(columns), selector)
+        result = self.desktop.paste_block(selector, cells, verify_selector=verify_selector,
+                                          verify_rows=verify_rows,
+                                          offset=(int(offset.get('row', 0)), int(offset.get('column', 0))))
+
+        if verify_selector is not None:
+            mismatches = result['mismatches']
+            self._log("Verificación de bloque: %d celdas revisadas, %d diferencias",
+                      result['checked'], len(mismatches))
+            if mismatches:
+                first_error = mismatches[0]
+                raise WorkflowExecutorError(
+                    "El bloque pegado no coincide en {} celdas (fila {}, columna {}: "
+                    "esperado '{}', leído '{}')".format(len(mismatches), first + first_error['row'] - header_rows + 1,
+                                                       first_error['column'] + 1,
+                                                       first_error['expected'], first_error['actual']))
+
+    def _render_block(self, rows: Sequence[Mapping[str, Any]], columns: List[str]) -> List[List[str]]:
+        """
+        Textos de cada celda del bloque: columna directa o plantilla con la fila como 'fila'
 
-        self._log(f"Loop Excel sobre: {source}")
+        Las plantillas pre-renderizadas del loop son de la fila del loop, no
+        de las filas del bloque: se desactivan mientras se arma el bloque.
+        """
+        saved_row, saved_prerendered = self.current_row, self._prerendered
+        self._prerendered = None
+        cells = []
+        try:
+            for row in rows:
+                self.current_row = row
+                rendered = []
+                for column in columns:
+                    if '{{' in column:
+                        rendered.append(self._replace_variables(column))
+                    else:
+                        value = row.get(column)
+                        # None y NaN (celdas vacías de pandas) se pegan como celda vacía
+                        rendered.append('' if value is None or value != value else str(value))
+                cells.append(rendered)
+        finally:
+            self.current_row, self._prerendered = saved_row, saved_prerendered
+        return cells
+
+    def _resolve_data_path(self, source: str) -> Path:
+        """
+        Resuelve la ruta de un archivo de datos
 
-        # Resolver ruta del archivo
-        # Si es ruta relativa o solo nombre, buscar en excel_csv/
+        Una ruta relativa o solo nombre se busca en excel_csv/ del proyecto;
+        sin extensión, se prueba .csv, .xlsx y .xls.
+        """
         file_path = Path(source)
         if not file_path.is_absolute():
-            # Buscar en carpeta excel_csv/ relativa al proyecto
             # El proyecto está 2 niveles arriba del engine (agente-win7/engine/)
             base_dir = Path(__file__).parent.parent.parent
-            excel_dir = base_dir / 'excel_csv'
-            file_path = excel_dir / source
+            file_path = base_dir / 'excel_csv' / source
 
-        # Si no tiene extensión, buscar con extensiones comunes
         if not file_path.suffix:
             for ext in ['.csv', '.xlsx', '.xls']:
                 candidate = file_path.with_suffix(ext)
                 if candidate.exists():
-                    file_path = candidate
-                    break
+                    return candidate
+        return file_path
+
+    # ==================== LOOPS ====================
+
+    def _loop_excel(self, data: Dict[str, Any],
+                    child_nodes: List[Dict], child_edges: List[Dict]) -> None:
+        """
+        Loop sobre archivo Excel/CSV
+
+        'source' acepta un archivo, un patrón glob ("ventas_*.csv") o una
+        lista de ambos. Con varios archivos, un thread parsea los siguientes
+        (hasta 'prefetch', por defecto 2) mientras se procesa el actual;
+        where/orderBy/limit/offset y join se aplican por archivo y la salida
+        ('output') es una sola, con la columna 'file'.
+
+        'validate' declara reglas por columna que se verifican sobre todas
+        las filas antes de la primera acción (ver _validate_rows).
+
+        'ledger' registra la clave de cada fila exitosa; al repetir la
+        ejecución esas filas se omiten (ver _open_ledger).
+        """
+        source = data.get('source', '')
+
+        if not source:
+            raise WorkflowExecutorError("Loop Excel requiere 'source' (nombre del archivo)")
 
-        # Leer archivo
-        rows = self.excel.read_file(str(file_path))
+        self._log("Loop Excel sobre: %s", source)
+
+        paths = self._resolve_sources(source)
+        multi_file = isinstance(source, list) or _is_glob(str(source))
+        if multi_file:
+            if not paths:
+                raise WorkflowExecutorError(f"Loop Excel: ningún archivo coincide con {source}")
+            self._log("Archivos a procesar: %d", len(paths))
+
+        ordered_children = self._order_nodes(child_nodes, child_edges)
+        output = data.get('output')
+        output_columns = self._output_columns(output)
+        state = _LoopState(ordered_children, output_columns, bool(data.get('continueOnError')))
+        self._invalid_rows_mode(data)
+
+        output_header = (list(output_columns) + (['file'] if multi_file else [])
+                         + ['status', 'error'])
+        reject_file = data.get('rejectFile')
+
+        with self._open_output(output, output_header) as state.writer, \
+                self._open_output({'file': reject_file} if reject_file else None) as state.rejects, \
+                self._open_ledger(data.get('ledger'), state) as state.ledger:
+            if not multi_file:
+                frame = self.excel.read_frame(str(paths[0]))
+                self._loop_frame(data, frame, state, own_log_loop=True)
+            else:
+                depth = int(data.get('prefetch', DEFAULT_PREFETCH_FILES))
+                with FilePrefetcher(paths, self.excel.read_frame, depth) as files, \
+                        self.execution_log.loop(None):
+                    for number, (path, frame, error) in enumerate(files, 1):
+                        state.file_name = path.name
+                        if error is not None:
+                            self._file_error(path, error, state)
+                            continue
+                        self._log("Archivo %d/%d: %s", number, len(paths), path.name)
+                        self._loop_frame(data, frame, state, own_log_loop=False)
+                    logger.debug(f"Prefetch de archivos: {files.stalls} esperas")
+
+        if state.errors or state.rejected or state.file_errors:
+            self._log("Loop Excel completado: %d iteraciones, %d con error, %d filas rechazadas, "
+                      "%d archivos con error", state.offset, state.errors, state.rejected,
+                      state.file_errors, level=logging.WARNING)
+        else:
+            self._log("Loop Excel completado: %d iteraciones", state.offset)
+        if state.skipped:
+            self._log("Filas omitidas por el registro de procesadas: %d", state.skipped)
+
+    def _loop_frame(self, data: Dict[str, Any], frame: Any, state: '_LoopState',
+                    own_log_loop: bool) -> None:
+        """Itera las filas de un archivo ya parseado (filtro, join, plantillas, hijos)"""
+        frame = self._apply_row_query(data, frame)
+        frame, keys = self._skip_processed(frame, state)
+        frame = self._validate_rows(data, frame, state)
+        frame = self._page_rows(data, frame)
+        state.keys = keys.loc[frame.index].tolist() if keys is not None else None
+        rows = Table.from_frame(frame)
         total_rows = len(rows)
 
-        self._log(f"Total de filas: {total_rows}")
+        self._log("Total de filas: %d", total_rows)
+
+        state.total = total_rows
+        state.output_templates = self._output_templates(state.output_columns, frame.columns)
+        state.joins = self._prepare_joins(data, rows)
+
+        # Plantillas que dependen solo de la fila: se renderizan para todas las filas de una vez
+        templates: Set[str] = set()
+        self._collect_row_templates(state.children, templates)
+        templates.update(t for t in state.output_templates.values() if is_row_template(t))
+        rendered = None
+        if templates and data.get('vectorize', True):
+            try:
+                rendered = render_columns(frame, templates)
+            except Exception as e:
+                logger.warning(f"No se pudieron precalcular plantillas de fila: {e}")
+        if rendered is not None:
+            self._log("Plantillas de fila precalculadas: %d", len(rendered))
+            templates = set()
+        del frame
+
+        # Iterar sobre cada fila (el log conserva detalle solo de una muestra)
+        with self.execution_log.loop(total_rows) if own_log_loop else nullcontext():
+            if data.get('pipelined'):
+                self._run_pipelined(rows, state, templates, rendered)
+            else:
+                # Una sola vista de fila que avanza (el modo pipeline necesita una por fila)
+                self._prerendered = None
+                for i, row in enumerate(rows.cursor(), 1):
+                    if rendered is not None:
+                        self._prerendered = RenderedRow(rendered, i - 1)
+                    self._run_iteration(i, row, state)
+        state.offset += total_rows
+
+    def _file_error(self, path: Path, error: Exception, state: '_LoopState') -> None:
+        """Registra un archivo del loop que no se pudo leer; aborta sin continueOnError"""
+        state.file_errors += 1
+        self._log("Archivo %s no se pudo leer: %s", path.name, error, level=logging.ERROR)
+        if state.writer is not None:
+            state.writer.write({'file': path.name, 'status': 'error', 'error': f"Archivo ilegible: {error}"})
+        if not state.continue_on_error:
+            raise WorkflowExecutorError(f"Error leyendo {path.name}: {error}")
+
+    def _resolve_sources(self, source: Any) -> List[Path]:
+        """
+        Archivos de un loop: rutas y patrones glob (relativos a excel_csv/)
 
-        # Iterar sobre cada fila
-        for i, row in enumerate(rows, 1):
-            self._log(f"\n  --- Iteración {i}/{total_rows} ---")
-            self.current_row = row
+        Los patrones se expanden en orden alfabético; un archivo repetido
+        se procesa una sola vez.
+        """
+        entries = source if isinstance(source, list) else [source]
+        paths: List[Path] = []
+        for entry in entries:
+            entry = self._replace_variables(str(entry))
+            if _is_glob(entry):
+                pattern = self._resolve_data_path(entry)
+                matches = sorted(Path(match) for match in glob.glob(str(pattern)))
+                if not matches:
+                    self._log("Patrón sin archivos: %s", entry, level=logging.WARNING)
+                paths.extend(match for match in matches if match.is_file())
+            else:
+                paths.append(self._resolve_data_path(entry))
 
-            # Ejecutar nodos hijos
-            ordered_children = self._order_nodes(child_nodes, child_edges)
-            for node in ordered_children:
-                self._execute_node(node)
+        unique: Dict[str, Path] = {}
+        for path in paths:
+            unique.setdefault(str(path.resolve()), path)
+        return list(unique.values())
+
+    def _prepare_joins(self, data: Dict[str, Any], rows: Table) -> List[tuple]:
+        """
+        Resuelve los 'join' del loop antes de iterar
 
-        self._log(f"Loop Excel completado: {total_rows} iteraciones")
+        Cada join: {"source": "bd_ocasionales.csv", "key": "modular",
+        "on": "modular", "as": "lookup", "required": false}. El archivo
+        secundario se indexa una vez por su columna 'key' (índice cacheado
+        junto al archivo parseado) y se calcula la fila que corresponde a
+        cada fila del loop según su columna 'on'.
+
+        Returns:
+            Lista de (variable, tabla secundaria, posición o None por fila)
+        """
+        specs = data.get('join') or []
+        if isinstance(specs, dict):
+            specs = [specs]
+
+        joins = []
+        for spec in specs:
+            source, key = spec.get('source'), spec.get('key')
+            if not source or not key:
+                raise WorkflowExecutorError("join requiere 'source' y 'key'")
+            on = spec.get('on', key)
+            name = spec.get('as', 'lookup')
+            if on not in rows.columns:
+                raise WorkflowExecutorError(f"join: la columna '{on}' no existe en el archivo del loop")
+
+            table, index = self.excel.lookup_index(str(self._resolve_data_path(source)), key)
+            positions = [index.get(lookup_key(value)) for value in rows.column(on)]
+            missing = [i for i, position in enumerate(positions, 1) if position is None]
+            self._log("Join con %s por %s = %s: %d de %d filas con coincidencia (como '%s')",
+                      source, on, key, len(positions) - len(missing), len(positions), name)
+            if missing and spec.get('required'):
+                raise WorkflowExecutorError(
+                    f"join requerido con {source}: {len(missing)} filas sin coincidencia "
+                    f"(primera: fila {missing[0]}, {on}={rows[missing[0] - 1].get(on)!r})")
+            joins.append((name, table, positions))
+        return joins
+
+    @contextmanager
+    def _open_ledger(self, ledger: Any, state: '_LoopState') -> Iterator[Optional[RowLedger]]:
+        """
+        Abre el registro de filas procesadas del loop (None sin 'ledger')
+
+        'ledger' es la plantilla de clave o un objeto:
+            {"key": "{{fila.dni}}-{{fila.rdl}}",
+             "file": "procesados.sqlite",   # relativo a excel_csv/
+             "scope": "Afiliaciones"}       # por defecto, el nombre del workflow
+
+        Las variables de la clave se reemplazan una vez al inicio; las
+        columnas, por fila.
+        """
+        if not ledger:
+            yield None
+            return
+        if isinstance(ledger, str):
+            ledger = {'key': ledger}
+        if not ledger.get('key'):
+            raise WorkflowExecutorError("ledger del loop requiere 'key' (ej: {{fila.dni}})")
+
+        # Solo variables: con fila vacía los {{fila.columna}} quedan intactos
+        saved_row, self.current_row = self.current_row, {}
+        try:
+            state.ledger_key = self._replace_variables(str(ledger['key']))
+        finally:
+            self.current_row = saved_row
+
+        file_path = self._resolve_data_path(self._replace_variables(ledger.get('file', DEFAULT_LEDGER_FILE)))
+        scope = self._replace_variables(str(ledger.get('scope') or self._workflow_name))
+        try:
+            opened = RowLedger(str(file_path), scope)
+        except RowLedgerError as e:
+            raise WorkflowExecutorError(str(e))
+        self._log("Registro de filas procesadas: %s [%s], %d claves", file_path.name, scope, len(opened))
+        try:
+            yield opened
+        finally:
+            opened.close()
+            self._log("Registro de filas procesadas: %d claves nuevas", opened.recorded)
+
+    def _skip_processed(self, frame: Any, state: '_LoopState') -> tuple:
+        """
+        Quita del loop las filas cuya clave ya está en el registro
+
+        También las filas con una clave repetida en el mismo archivo (la
+        primera se procesa). Retorna (frame, claves por índice) o
+        (frame, None) sin registro.
+        """
+        if state.ledger is None:
+            return frame, None
+        try:
+            keys = render_keys(frame, state.ledger_key)
+        except RowLedgerError as e:
+            raise WorkflowExecutorError(f"ledger del loop: {e}")
+
+        done = keys.map(lambda key: key in state.ledger).to_numpy(dtype=bool)
+        repeated = (keys.notna() & keys.duplicated(keep='first')).to_numpy(dtype=bool)
+        missing = int(keys.isna().sum())
+        if missing:
+            self._log("Registro: %d filas sin clave completa (se procesan y no se registran)", missing,
+                      level=logging.WARNING)
+        skip = done | repeated
+        if not skip.any():
+            return frame, keys
+
+        state.skipped += int(skip.sum())
+        self._log("Registro: se omiten %d filas ya procesadas y %d con clave repetida; quedan %d",
+                  int(done.sum()), int((repeated & ~done).sum()), int((~skip).sum()))
+        return frame[~skip], keys[~skip]
+
+    def _invalid_rows_mode(self, data: Dict[str, Any]) -> str:
+        """'abort' o 'reject' según onInvalid (por defecto 'reject' si hay rejectFile)"""
+        mode = data.get('onInvalid') or ('reject' if data.get('rejectFile') else 'abort')
+        if mode not in ('abort', 'reject'):
+            raise WorkflowExecutorError(f"onInvalid debe ser 'abort' o 'reject': {mode!r}")
+        return mode
+
+    def _validate_rows(self, data: Dict[str, Any], frame: Any, state: '_LoopState') -> Any:
+        """
+        Verifica las reglas de 'validate' sobre todas las filas antes de iterar
+
+        Ej: "validate": {"dni": {"required": true, "regex": "\\\\d{8}"},
+                         "fecha_afil": {"dateFormat": "%d/%m/%Y"}}
+
+        Con filas inválidas, onInvalid 'abort' (por defecto) detiene el loop
+        sin ejecutar ninguna; 'reject' las quita del loop y, con
+        'rejectFile', las escribe ahí con su fila en el archivo y el motivo.
+
+        El encabezado de 'rejectFile' sale del primer archivo con rechazos
+        (se escribe en streaming): con varios archivos, las columnas que
+        solo existen en los siguientes no se guardan y se avisa en el log.
+        """
+        rules = data.get('validate')
+        if not rules:
+            return frame
+
+        try:
+            report = validate_frame(frame, rules)
+        except RowValidationError as e:
+            raise WorkflowExecutorError(f"validate del loop: {e}")
+
+        if report.ok:
+            self._log("Validación: %d filas válidas", report.total)
+            return frame
+
+        self._log("Validación: %s", report.summary(), level=logging.WARNING)
+        if self._invalid_rows_mode(data) == 'abort':
+            raise WorkflowExecutorError(f"Validación de filas fallida: {report.summary()}")
+
+        state.rejected += len(report.invalid)
+        if state.rejects is not None:
+            rejected = Table.from_frame(frame.iloc[[row.position for row in report.invalid]])
+            for row, values in zip(report.invalid, rejected.cursor()):
+                record = {'fila': row.row_number}
+                if state.file_name is not None:
+                    record['file'] = state.file_name
+                record.update(values.to_dict())
+                record['motivo'] = '; '.join(row.reasons)
+                state.rejects.write(record)
+            dropped = [column for column in rejected.columns if column not in state.rejects.columns]
+            if dropped:
+                self._log("Columnas no guardadas en rejectFile (no estaban en el primer archivo): %s",
+                          ', '.join(map(str, dropped)), level=logging.WARNING)
+        return frame[report.valid]
+
+    def _apply_row_query(self, data: Dict[str, Any], frame: Any) -> Any:
+        """
+        Aplica where / orderBy del loop sobre el DataFrame
+
+        Se evalúan en bloque al cargar, antes de crear las filas: solo las
+        filas que califican llegan a la iteración. limit / offset se aplican
+        aparte (_page_rows), después de omitir las filas ya procesadas.
+
+        - where: condición con la sintaxis de ifElse, ej: "{{fila.Monto}} > 100"
+        - orderBy: "Fecha desc, Monto" o lista ["Fecha desc", "Monto"]
+        """
+        where = data.get('where')
+        order_by = data.get('orderBy')
+        if not (where or order_by):
+            return frame
+
+        expression = None
+        if where:
+            # Las columnas se traducen antes de reemplazar variables (no usar la fila actual)
+            expression = self._replace_variables(compile_row_condition(where))
+
+        order = []
+        if order_by:
+            items = order_by if isinstance(order_by, list) else str(order_by).split(',')
+            for item in items:
+                parts = str(item).strip().rsplit(' ', 1)
+                if len(parts) == 2 and parts[1].lower() in ('asc', 'desc'):
+                    order.append((parts[0].strip(), parts[1].lower() == 'asc'))
+                elif parts[0]:
+                    order.append((str(item).strip(), True))
+
+        total = len(frame)
+        try:
+            frame = self.excel.query_frame(frame, where=expression, order_by=order)
+        except ExcelEngineError as e:
+            raise WorkflowExecutorError(f"Filtro de loop inválido ({expression or order_by}): {e}")
+
+        self._log("Filtro de loop: %d de %d filas (where=%s, orderBy=%s)",
+                  len(frame), total, where, order_by)
+        return frame
+
+    def _page_rows(self, data: Dict[str, Any], frame: Any) -> Any:
+        """
+        Aplica limit / offset del loop (enteros, admiten variables {{...}})
+
+        Va después de _skip_processed: con registro, repetir el loop con
+        limit N toma las N siguientes filas pendientes.
+        """
+        limit = data.get('limit')
+        offset = data.get('offset')
+        if not (limit not in (None, '') or offset):
+            return frame
+
+        try:
+            limit_value = int(self._replace_variables(str(limit))) if limit not in (None, '') else None
+            offset_value = int(self._replace_variables(str(offset))) if offset else 0
+        except ValueError:
+            raise WorkflowExecutorError(f"limit/offset del loop deben ser enteros: {limit!r}, {offset!r}")
+
+        total = len(frame)
+        try:
+            frame = self.excel.query_frame(frame, limit=limit_value, offset=offset_value)
+        except ExcelEngineError as e:
+            raise WorkflowExecutorError(f"limit/offset del loop inválidos: {e}")
+
+        self._log("Filas del loop: %d de %d (limit=%s, offset=%s)",
+                  len(frame), total, limit_value, offset_value)
+        return frame
+
+    def _run_iteration(self, index: int, row: Mapping[str, Any], state: '_LoopState') -> None:
+        """
+        Ejecuta los nodos hijos para una fila
+
+        Con salida configurada, registra una fila de resultado (columnas +
+        status/error) aunque la iteración falle; con continueOnError el
+        error se registra y el loop sigue con la fila siguiente.
+
+        La clave del ledger se registra después de escribir la fila de
+        resultado: si el registro falla, la fila ya quedó en la salida y el
+        loop se detiene (aun con continueOnError), porque las filas
+        siguientes tampoco quedarían marcadas como procesadas.
+        """
+        error: Optional[Exception] = None
+        try:
+            with self.execution_log.iteration(state.offset + index):
+                self._log("\n  --- Iteración %d/%d ---", index, state.total)
+                self.current_row = row
+
+                # Filas cruzadas de archivos secundarios ({{lookup.col}})
+                for name, table, positions in state.joins:
+                    position = positions[index - 1]
+                    self.variables[name] = table.row_at(position) if position is not None else {}
+
+                # Ejecutar nodos hijos
+                for node in state.children:
+                    self._execute_node(node)
+        except Exception as e:
+            error = e
+            state.errors += 1
+
+        if state.writer is not None:
+            record = {name: self._replace_variables(template)
+                      for name, template in state.output_templates.items()}
+            if state.file_name is not None:
+                record['file'] = state.file_name
+            record['status'] = 'error' if error else 'ok'
+            record['error'] = str(error) if error else ''
+            state.writer.write(record)
+
+        if error is None and state.keys is not None and state.keys[index - 1] is not None:
+            try:
+                state.ledger.record(state.keys[index - 1])
+            except RowLedgerError as e:
+                raise WorkflowExecutorError(f"Fila {index} ejecutada pero no registrada en el ledger: {e}")
+
+        if error is not None:
+            if not state.continue_on_error:
+                raise error
+            self._log("Fila %d con error, se continúa: %s", index, error, level=logging.WARNING)
+
+    def _output_columns(self, output: Optional[Dict[str, Any]]) -> Dict[str, Optional[str]]:
+        """
+        Columnas de la salida por fila como nombre -> plantilla
+
+        'columns' puede ser un dict {"ruc": "{{fila.RUC}}", "nombre": "{{texto}}"}
+        o una lista de nombres. Los nombres de la lista quedan sin plantilla
+        (None) y se resuelven con las columnas de cada archivo (_output_templates).
+        """
+        if not output:
+            return {}
+        if not output.get('file'):
+            raise WorkflowExecutorError("output del loop requiere 'file'")
+        columns = output.get('columns') or {}
+        if isinstance(columns, dict):
+            return {str(name): str(template) for name, template in columns.items()}
+        return {str(name): None for name in columns}
+
+    @staticmethod
+    def _output_templates(output_columns: Dict[str, Optional[str]],
+                          file_columns: Iterable[Any]) -> Dict[str, str]:
+        """
+        Plantillas de salida para un archivo del loop
+
+        Un nombre sin plantilla es {{fila.nombre}} si es columna del archivo
+        y si no la variable {{nombre}} (puede crearse dentro del loop, ej: el
+        resultado de un readText).
+        """
+        file_columns = set(file_columns)
+        return {name: template if template is not None else
+                ('{{fila.%s}}' % name if name in file_columns else '{{%s}}' % name)
+                for name, template in output_columns.items()}
+
+    @contextmanager
+    def _open_output(self, output: Optional[Dict[str, Any]],
+                     columns: Optional[List[str]] = None) -> Iterator[Optional[ResultWriter]]:
+        """
+        Abre un escritor de resultados del loop (None sin `output`) y lo finaliza al salir
+
+        Sin `columns`, el encabezado sale de las claves de la primera fila
+        escrita. Si el loop termina con una excepción, un fallo al finalizar
+        el archivo solo se registra: el error que se propaga es el del loop.
+        """
+        if not output:
+            yield None
+            return
+        file_path = self._resolve_data_path(self._replace_variables(output['file']))
+        try:
+            writer = ResultWriter(str(file_path), columns,
+                                  sheet_name=output.get('sheetName', 'Resultados'),
+                                  flush_rows=int(output.get('flushRows', DEFAULT_FLUSH_ROWS)),
+                                  flush_interval=float(output.get('flushSeconds', DEFAULT_FLUSH_INTERVAL)))
+        except ResultWriterError as e:
+            raise WorkflowExecutorError(str(e))
+        try:
+            yield writer
+        except BaseException:
+            # También al abortar: las filas procesadas quedan en el archivo final
+            try:
+                writer.close()
+                self._log("Archivo %s guardado: %d filas", file_path, writer.rows_written)
+            except ResultWriterError as e:
+                logger.error(str(e))
+            raise
+        try:
+            writer.close()
+        except ResultWriterError as e:
+            raise WorkflowExecutorError(str(e))
+        self._log("Archivo %s guardado: %d filas", file_path, writer.rows_written)
+
+    def _run_pipelined(self, rows: Sequence[Mapping[str, Any]], state: '_LoopState',
+                       templates: Set[str],
+                       rendered: Optional[Dict[str, List[str]]] = None) -> None:
+        """
+        Ejecuta el loop con las filas preparadas por un thread en segundo plano
+
+        Las plantillas de solo fila que no se precalcularon en bloque
+        (`templates`) se renderizan en el productor; el thread de UI solo
+        las busca ya resueltas. Las que usan variables se renderizan en el
+        momento, porque pueden depender de acciones de la misma iteración.
+        """
+        self._log("Loop en modo pipeline: %d plantillas renderizadas por fila", len(templates))
+
+        def prepare(row: Mapping[str, Any]) -> Dict[str, str]:
+            return {template: render_row_template(template, row) for template in templates}
+
+        saved = self._prerendered
+        try:
+            with RowPipeline(rows, prepare) as pipeline:
+                for prepared in pipeline:
+                    self._prerendered = (RenderedRow(rendered, prepared.index - 1)
+                                         if rendered is not None else prepared.rendered)
+                    self._run_iteration(prepared.index, prepared.row, state)
+            logger.debug(f"Pipeline de filas: {pipeline.stalls} esperas del thread de UI")
+        finally:
+            self._prerendered = saved
+
+    def _collect_row_templates(self, nodes: List[Dict[str, Any]], out: Set[str]) -> None:
+        """
+        Agrega las plantillas que dependen solo de la fila actual
+
+        Recorre parámetros de acciones y condiciones de ifElse; no entra en
+        loops anidados (cambian la fila actual) ni en las columnas de
+        pasteBlock (se renderizan con cada fila del bloque).
+        """
+        def visit(value: Any) -> None:
+            if isinstance(value, str):
+                if is_row_template(value):
+                    out.add(value)
+            elif isinstance(value, dict):
+                for item in value.values():
+                    visit(item)
+            elif isinstance(value, list):
+                for item in value:
+                    visit(item)
+
+        for node in nodes:
+            data = node.get('data', {})
+            node_type = node.get('type')
+            if node_type == 'action':
+                params = data.get('params', {})
+                if data.get('actionType') == 'pasteBlock':
+                    params = {key: value for key, value in params.items() if key != 'columns'}
+                visit(params)
+            elif node_type == 'ifElse':
+                visit(data.get('condition', ''))
+                self._collect_row_templates(data.get('trueNodes', []), out)
+                self._collect_row_templates(data.get('falseNodes', []), out)
 
     def _loop_times(self, data: Dict[str, Any],
                     child_nodes: List[Dict], child_edges: List[Dict]) -> None:
         """Loop N veces"""
         iterations = data.get('iterations', 1)
 
-        self._log(f"Loop {iterations} veces")
+        self._log("Loop %d veces", iterations)
 
-        for i in range(1, iterations + 1):
-            self._log(f"\n  --- Iteración {i}/{iterations} ---")
-            self.variables['iteration'] = i
+        ordered_children = self._order_nodes(child_nodes, child_edges)
+        with self.execution_log.loop(iterations):
+            for i in range(1, iterations + 1):
+                with self.execution_log.iteration(i):
+                    self._log("\n  --- Iteración %d/%d ---", i, iterations)
+                    self.variables['iteration'] = i
 
-            ordered_children = self._order_nodes(child_nodes, child_edges)
-            for node in ordered_children:
-                self._execute_node(node)
+                    for node in ordered_children:
+                        self._execute_node(node)
 
-        self._log(f"Loop completado: {iterations} iteraciones")
+        self._log("Loop completado: %d iteraciones", iterations)
 
     def _loop_conditional(self, data: Dict[str, Any],
                           child_nodes: List[Dict], child_edges: List[Dict]) -> None:
@@ -442,27 +1310,29 @@ class WorkflowExecutor:
         condition = data.get('condition', '')
         max_iterations = 100  # Límite de seguridad
 
-        self._log(f"Loop {loop_type}: {condition}")
+        self._log("Loop %s: %s", loop_type, condition)
 
+        ordered_children = self._order_nodes(child_nodes, child_edges)
         iteration = 0
-        while iteration < max_iterations:
-            iteration += 1
+        with self.execution_log.loop():
+            while iteration < max_iterations:
+                iteration += 1
 
-            condition_result = self._evaluate_condition(condition)
+                condition_result = self._evaluate_condition(condition)
 
-            # while: continuar si TRUE, until: continuar si FALSE
-            should_continue = condition_result if loop_type == 'while' else not condition_result
+                # while: continuar si TRUE, until: continuar si FALSE
+                should_continue = condition_result if loop_type == 'while' else not condition_result
 
-            if not should_continue:
-                break
+                if not should_continue:
+                    break
 
-            self._log(f"\n  --- Iteración {iteration} ---")
+                with self.execution_log.iteration(iteration):
+                    self._log("\n  --- Iteración %d ---", iteration)
 
-            ordered_children = self._order_nodes(child_nodes, child_edges)
-            for node in ordered_children:
-                self._execute_node(node)
+                    for node in ordered_children:
+                        self._execute_node(node)
 
-        self._log(f"Loop {loop_type} completado: {iteration} iteraciones")
+        self._log("Loop %s completado: %d iteraciones", loop_type, iteration)
 
     # ==================== UTILIDADES ====================
 
@@ -476,6 +1346,12 @@ class WorkflowExecutor:
         Returns:
             Texto con variables reemplazadas
         """
+        # Plantilla ya renderizada por el pipeline del loop
+        if self._prerendered is not None:
+            rendered = self._prerendered.get(text)
+            if rendered is not None:
+                return rendered
+
         # Patrón para {{variable}} o {{fila.columna}}
         pattern = r'\{\{([^}]+)\}\}'
 
@@ -526,14 +1402,19 @@ class WorkflowExecutor:
             logger.warning(f"Error evaluando condición '{condition}': {e}")
             return False
 
-    def _log(self, message: str) -> None:
-        """Agrega mensaje al log de ejecución"""
-        self.execution_logs.append(message)
-        logger.info(message)
+    def _log(self, message: str, *args: Any, level: int = logging.INFO) -> None:
+        """
+        Agrega un evento al log de ejecución
+
+        El mensaje usa placeholders estilo % y se formatea recién al
+        serializar la respuesta (o en el thread del pipeline de logging).
+        """
+        self.execution_log.add(level, message, args, self._current_node_id)
+        logger.log(level, message, *args)
 
     def get_logs(self) -> List[str]:
-        """Retorna logs de ejecución"""
-        return self.execution_logs.copy()
+        """Retorna logs de ejecución (acotados y resumidos por iteración)"""
+        return self.execution_log.to_strings()
 
     def get_status(self) -> str:
         """Retorna estado actual de ejecución"""
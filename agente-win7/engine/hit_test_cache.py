@@ -0,0 +1,197 @@
+"""
+Cache espacial de hit-testing para el Element Picker
+Responde "qué elemento hay bajo el cursor" con rectángulos ya resueltos,
+sin llamar a la API de accesibilidad mientras el cursor siga dentro del mismo control
+
+Compatible con Windows 7 (Python 3.8)
+"""
+
+import ctypes
+import ctypes.wintypes
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+GA_ROOT = 2
+
+# Entradas máximas (LRU)
+DEFAULT_MAX_ENTRIES = 64
+
+
+class HitEntry:
+    """Elemento resuelto con su rectángulo y el estado de su ventana raíz"""
+
+    __slots__ = ('rect', 'element', 'handle', 'root_hwnd', 'root_rect', 'is_leaf')
+
+    def __init__(self, rect: Tuple[int, int, int, int], element: Any, handle: int,
+                 root_hwnd: int, root_rect: Tuple[int, int, int, int], is_leaf: bool):
+        self.rect = rect
+        self.element = element
+        self.handle = handle
+        self.root_hwnd = root_hwnd
+        self.root_rect = root_rect
+        self.is_leaf = is_leaf
+
+    @property
+    def area(self) -> int:
+        return (self.rect[2] - self.rect[0]) * (self.rect[3] - self.rect[1])
+
+    def contains(self, x: int, y: int) -> bool:
+        return self.rect[0] <= x < self.rect[2] and self.rect[1] <= y < self.rect[3]
+
+
+class HitTestCache:
+    """
+    Cache de rectángulos de elementos resueltos recientemente
+
+    Un punto se responde desde cache solo si cae en el rectángulo más
+    pequeño que lo contiene, ese elemento no tiene hijos y, si tiene HWND
+    propio, WindowFromPoint devuelve ese HWND. Un contenedor (también uno
+    con ventana propia cuyos hijos UIA no la tienen, como las filas de un
+    ListView) nunca tapa a un hijo todavía no resuelto.
+
+    Se invalida cuando cambia la ventana en primer plano o cuando la
+    ventana raíz de una entrada se mueve o cambia de tamaño. Todas las
+    verificaciones usan user32 (barato), no la API de accesibilidad.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        # Clave (rect, handle): el mismo control resuelto dos veces ocupa una entrada
+        self._entries: 'OrderedDict[Tuple[Tuple[int, int, int, int], int], HitEntry]' = OrderedDict()
+        self._foreground: Optional[int] = None
+        self._user32 = ctypes.windll.user32
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    # ==================== USER32 ====================
+
+    def _window_rect(self, hwnd: int) -> Optional[Tuple[int, int, int, int]]:
+        rect = ctypes.wintypes.RECT()
+        if not self._user32.GetWindowRect(hwnd, ctypes.byref(rect)):
+            return None
+        return (rect.left, rect.top, rect.right, rect.bottom)
+
+    def _window_at(self, x: int, y: int) -> int:
+        return self._user32.WindowFromPoint(ctypes.wintypes.POINT(x, y)) or 0
+
+    # ==================== CONSULTA ====================
+
+    def lookup(self, x: int, y: int) -> Optional[HitEntry]:
+        """
+        Busca una entrada válida para el punto
+
+        Returns:
+            HitEntry si el punto se puede responder desde cache, None si no
+        """
+        try:
+            foreground = self._user32.GetForegroundWindow()
+            if foreground != self._foreground:
+                if self._entries:
+                    self.invalidate()
+                self._foreground = foreground
+
+            best: Optional[HitEntry] = None
+            best_key = None
+            for key, entry in self._entries.items():
+                if entry.contains(x, y) and (best is None or entry.area < best.area):
+                    best, best_key = entry, key
+
+            if best is None:
+                self.misses += 1
+                return None
+
+            # Ventana raíz movida o redimensionada: sus rectángulos ya no valen
+            if self._window_rect(best.root_hwnd) != best.root_rect:
+                self.invalidate(best.root_hwnd)
+                self.misses += 1
+                return None
+
+            valid = best.is_leaf
+            if valid and best.handle:
+                valid = self._window_at(x, y) == best.handle
+
+            if not valid:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            return best
+
+        except Exception as e:
+            logger.debug("Error consultando hit cache: %s", e)
+            self.misses += 1
+            return None
+
+    def store(self, x: int, y: int, element: Any,
+              rect: Tuple[int, int, int, int]) -> None:
+        """
+        Registra el elemento resuelto en (x, y)
+
+        Args:
+            x: Coordenada X donde se resolvió
+            y: Coordenada Y donde se resolvió
+            element: Wrapper pywinauto
+            rect: Rectángulo (left, top, right, bottom) ya validado
+        """
+        try:
+            handle = 0
+            try:
+                handle = int(element.handle or 0)
+            except Exception:
+                handle = 0
+
+            hwnd_at = handle or self._window_at(x, y)
+            root_hwnd = self._user32.GetAncestor(hwnd_at, GA_ROOT) or hwnd_at
+            root_rect = self._window_rect(root_hwnd) if root_hwnd else None
+            if not root_rect:
+                return
+
+            # Solo sirve si no puede tapar hijos (una llamada, al insertar)
+            try:
+                is_leaf = len(element.children()) == 0
+            except Exception:
+                is_leaf = False
+
+            entry = HitEntry(rect, element, handle, root_hwnd, root_rect, is_leaf)
+            key = (rect, handle)
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        except Exception as e:
+            logger.debug("Error guardando en hit cache: %s", e)
+
+    def invalidate(self, root_hwnd: Optional[int] = None) -> None:
+        """Descarta todas las entradas, o solo las de una ventana raíz"""
+        if root_hwnd is None:
+            self._entries.clear()
+        else:
+            for key in [k for k, e in self._entries.items() if e.root_hwnd == root_hwnd]:
+                del self._entries[key]
+        self.invalidations += 1
+
+    def reset(self) -> None:
+        """Vacía el cache y reinicia métricas"""
+        self._entries.clear()
+        self._foreground = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Métricas de uso del cache"""
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0
+        }
@@ -0,0 +1,178 @@
+"""
+Escritura incremental de resultados por fila
+Abre el archivo de salida al inicio del loop y agrega filas a medida que
+avanza: CSV con escrituras en bloque y xlsx en modo write-only de openpyxl.
+Los datos llegan a disco cada N filas o T segundos (sobreviven a un corte)
+y el archivo final aparece de forma atómica al cerrar (os.replace)
+
+Compatible con Windows 7 (Python 3.8)
+"""
+
+import csv
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Iterable, List, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# Flush a disco: cada N filas o cada T segundos, lo que ocurra primero
+DEFAULT_FLUSH_ROWS = 50
+DEFAULT_FLUSH_INTERVAL = 5.0  # segundos
+
+CSV_FORMATS = {'.csv': ',', '.tsv': '\t'}
+XLSX_FORMATS = {'.xlsx', '.xlsm'}
+
+# Sufijo del archivo parcial (CSV) o del diario de recuperación (xlsx)
+PARTIAL_SUFFIX = '.partial'
+
+
+class ResultWriterError(Exception):
+    """Error abriendo o escribiendo el archivo de resultados"""
+    pass
+
+
+class ResultWriter:
+    """
+    Escritor de resultados en modo agregado
+
+    CSV/TSV: las filas se escriben en '<archivo>.partial' y al cerrar se
+    renombra al nombre final. xlsx: las filas van a una hoja write-only
+    (openpyxl no reescribe nada al agregar) y, en paralelo, a un diario
+    CSV '<archivo>.partial' con los mismos flushes; al cerrar se guarda el
+    libro en un temporal, se renombra y se borra el diario. Tras un corte,
+    el .partial contiene todas las filas hasta el último flush.
+
+    Uso:
+        with ResultWriter('salida.csv', ['ruc', 'status']) as writer:
+            writer.write({'ruc': '20123', 'status': 'ok'})
+    """
+
+    def __init__(self, file_path: str, columns: Optional[List[str]] = None,
+                 sheet_name: str = 'Resultados',
+                 flush_rows: int = DEFAULT_FLUSH_ROWS,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL):
+        """
+        Args:
+            file_path: Archivo final (.csv, .tsv, .xlsx, .xlsm)
+            columns: Columnas en orden (por defecto, las claves de la primera fila)
+            sheet_name: Nombre de la hoja (solo xlsx)
+            flush_rows: Filas en buffer antes de escribir a disco
+            flush_interval: Segundos máximos entre escrituras a disco
+
+        Raises:
+            ResultWriterError: Si el formato no es soportado o no se puede crear
+        """
+        self.path = Path(file_path)
+        suffix = self.path.suffix.lower()
+        if suffix not in CSV_FORMATS and suffix not in XLSX_FORMATS:
+            raise ResultWriterError(
+                f"Formato de salida no soportado: {self.path.suffix} "
+                f"(válidos: {', '.join(sorted(set(CSV_FORMATS) | XLSX_FORMATS))})"
+            )
+        self.columns = list(columns) if columns else None
+        self.sheet_name = sheet_name
+        self.flush_rows = max(flush_rows, 1)
+        self.flush_interval = flush_interval
+        self.rows_written = 0
+        self.partial_path = self.path.with_name(self.path.name + PARTIAL_SUFFIX)
+
+        self._buffer: List[List[Any]] = []
+        self._last_flush = time.time()
+        self._closed = False
+        self._workbook = None
+        self._sheet = None
+
+        try:
+            if suffix in XLSX_FORMATS:
+                from openpyxl import Workbook
+                self._workbook = Workbook(write_only=True)
+                self._sheet = self._workbook.create_sheet(title=sheet_name)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.partial_path, 'w', newline='', encoding='utf-8-sig')
+            self._csv = csv.writer(self._file, delimiter=CSV_FORMATS.get(suffix, ','))
+        except Exception as e:
+            raise ResultWriterError(f"No se pudo abrir {self.path}: {e}")
+
+        self._header_written = False
+        if self.columns:
+            self._write_header()
+        logger.info(f"Salida de resultados abierta: {self.path}")
+
+    def __enter__(self) -> 'ResultWriter':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    # ==================== ESCRITURA ====================
+
+    def _write_header(self) -> None:
+        self._buffer.append(list(self.columns))
+        self._header_written = True
+
+    def write(self, record: Mapping[str, Any]) -> None:
+        """Agrega una fila (las claves fuera de `columns` se ignoran)"""
+        if self._closed:
+            raise ResultWriterError("El escritor de resultados ya está cerrado")
+        if self.columns is None:
+            self.columns = list(record.keys())
+        if not self._header_written:
+            self._write_header()
+        self._buffer.append([_cell(record.get(column)) for column in self.columns])
+        self.rows_written += 1
+        if (len(self._buffer) >= self.flush_rows
+                or time.time() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def write_many(self, records: Iterable[Mapping[str, Any]]) -> None:
+        for record in records:
+            self.write(record)
+
+    def flush(self) -> None:
+        """Escribe el buffer y lo fuerza a disco"""
+        if not self._buffer:
+            return
+        try:
+            self._csv.writerows(self._buffer)
+            if self._sheet is not None:
+                for row in self._buffer:
+                    self._sheet.append(row)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except Exception as e:
+            raise ResultWriterError(f"Error escribiendo resultados en {self.path}: {e}")
+        self._buffer.clear()
+        self._last_flush = time.time()
+
+    # ==================== CIERRE ====================
+
+    def close(self) -> None:
+        """Escribe lo pendiente y publica el archivo final de forma atómica"""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            if not self._header_written and self.columns:
+                self._write_header()
+            self.flush()
+            self._file.close()
+            if self._workbook is not None:
+                tmp_path = self.path.with_name(self.path.stem + '.tmp' + self.path.suffix)
+                self._workbook.save(str(tmp_path))
+                os.replace(str(tmp_path), str(self.path))
+                self.partial_path.unlink()
+            else:
+                os.replace(str(self.partial_path), str(self.path))
+        except Exception as e:
+            raise ResultWriterError(f"No se pudo finalizar {self.path} (datos en {self.partial_path}): {e}")
+        logger.info(f"Resultados escritos: {self.path} ({self.rows_written} filas)")
+
+
+def _cell(value: Any) -> Any:
+    """None y NaN como celda vacía; el resto tal cual"""
+    if value is None or value != value:
+        return ''
+    return value
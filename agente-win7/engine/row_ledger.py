@@ -0,0 +1,154 @@
+"""
+Registro persistente de filas ya procesadas por los loops
+Cada fila exitosa deja su clave (ej: "{{fila.dni}}-{{fila.rdl}}") en una
+base SQLite local; al repetir la ejecución, las filas con clave registrada
+se omiten antes de iterar y solo se procesa el trabajo nuevo
+
+Compatible con Windows 7 (Python 3.8)
+"""
+
+import logging
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Optional, Set
+
+import pandas as pd
+
+from .row_templates import TEMPLATE_PATTERN, key_text
+
+logger = logging.getLogger(__name__)
+
+
+# Archivo por defecto (relativo a excel_csv/)
+DEFAULT_LEDGER_FILE = 'procesados.sqlite'
+
+# Espera máxima si otra ejecución tiene la base bloqueada
+LOCK_TIMEOUT = 10.0  # segundos
+
+
+class RowLedgerError(Exception):
+    """Error abriendo o escribiendo el registro de filas procesadas"""
+    pass
+
+
+def render_keys(frame: pd.DataFrame, template: str) -> pd.Series:
+    """
+    Clave de cada fila a partir de una plantilla {{fila.columna}}
+
+    Cada columna se normaliza con key_text (un 1203.0 leído de una columna
+    con vacíos da la misma clave que 1203 en una corrida posterior). Una
+    fila con alguna columna de la clave vacía queda sin clave (None).
+
+    Args:
+        frame: Datos del loop
+        template: Plantilla de clave con variables ya reemplazadas
+
+    Returns:
+        Serie de claves con el mismo índice que `frame`
+
+    Raises:
+        RowLedgerError: Si la plantilla usa columnas inexistentes o no usa ninguna
+    """
+    parts = TEMPLATE_PATTERN.split(template)
+    if len(parts) < 2:
+        raise RowLedgerError(f"La clave debe incluir columnas de la fila ({{{{fila.columna}}}}): {template}")
+
+    keys = pd.Series('', index=frame.index, dtype=object)
+    complete = pd.Series(True, index=frame.index)
+    for position, part in enumerate(parts):
+        if position % 2 == 0:
+            if part:
+                keys = keys + part
+            continue
+        name = part.strip()
+        if not name.startswith('fila.'):
+            raise RowLedgerError(f"Variable sin valor en la clave: {{{{{name}}}}}")
+        column = name.split('.', 1)[1]
+        if column not in frame.columns:
+            raise RowLedgerError(f"La columna '{column}' de la clave no existe en el archivo del loop")
+        text = key_text(frame[column])
+        complete &= text.ne('')
+        keys = keys + text
+    keys = keys.astype(object)
+    keys[~complete] = None
+    return keys
+
+
+class RowLedger:
+    """
+    Claves procesadas de un ámbito (ej: el workflow) en una base SQLite
+
+    La tabla tiene clave primaria (scope, key): registrar es un INSERT
+    indexado y al abrir se cargan las claves del ámbito en un set, así
+    que cada consulta es O(1). Cada registro se confirma de inmediato: un
+    corte a mitad de loop no pierde las filas ya hechas.
+
+    Uso:
+        with RowLedger('procesados.sqlite', 'Afiliaciones') as ledger:
+            if key not in ledger:
+                ...
+                ledger.record(key)
+    """
+
+    def __init__(self, db_path: str, scope: str):
+        """
+        Args:
+            db_path: Archivo SQLite (se crea si no existe)
+            scope: Ámbito de las claves (dos workflows no se pisan)
+
+        Raises:
+            RowLedgerError: Si la base no se puede abrir
+        """
+        self.path = Path(db_path)
+        self.scope = scope
+        self.recorded = 0
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection: Optional[sqlite3.Connection] = sqlite3.connect(
+                str(self.path), timeout=LOCK_TIMEOUT)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS processed ("
+                " scope TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " processed_at TEXT NOT NULL,"
+                " PRIMARY KEY (scope, key)"
+                ") WITHOUT ROWID"
+            )
+            self._connection.commit()
+            rows = self._connection.execute("SELECT key FROM processed WHERE scope = ?", (scope,))
+            self._keys: Set[str] = {key for key, in rows}
+        except sqlite3.Error as e:
+            raise RowLedgerError(f"No se pudo abrir el registro {self.path}: {e}")
+        logger.info(f"Registro de filas procesadas: {self.path} [{scope}] ({len(self._keys)} claves)")
+
+    def __enter__(self) -> 'RowLedger':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def record(self, key: str) -> None:
+        """Registra una clave procesada (idempotente)"""
+        if key in self._keys:
+            return
+        try:
+            with self._connection:
+                self._connection.execute(
+                    "INSERT OR IGNORE INTO processed (scope, key, processed_at) VALUES (?, ?, ?)",
+                    (self.scope, key, time.strftime('%Y-%m-%d %H:%M:%S')))
+        except sqlite3.Error as e:
+            raise RowLedgerError(f"No se pudo registrar la clave {key!r} en {self.path}: {e}")
+        self._keys.add(key)
+        self.recorded += 1
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
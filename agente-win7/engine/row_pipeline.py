@@ -0,0 +1,186 @@
+"""
+Pipeline de preparación de filas y archivos para loops
+Un thread en segundo plano prepara lo siguiente (filas con plantillas
+renderizadas, o el próximo archivo ya parseado) en una cola acotada
+mientras el thread principal ejecuta las acciones de UI de lo actual
+
+Compatible con Windows 7 (Python 3.8)
+"""
+
+import abc
+import logging
+import queue
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# Filas preparadas por adelantado como máximo (acota memoria y trabajo descartado)
+DEFAULT_DEPTH = 32
+
+# Archivos parseados por adelantado como máximo (cada uno puede ser grande)
+DEFAULT_PREFETCH_FILES = 2
+
+# Intervalo con que el productor revisa si el consumidor abandonó el loop
+PUT_POLL_INTERVAL = 0.2  # segundos
+
+_END = object()
+
+
+class PreparedRow:
+    """Fila lista para ejecutar: datos originales + valores precalculados"""
+
+    __slots__ = ('index', 'row', 'rendered')
+
+    def __init__(self, index: int, row: Dict[str, Any], rendered: Dict[str, str]):
+        self.index = index
+        self.row = row
+        self.rendered = rendered
+
+
+class _Failure:
+    __slots__ = ('index', 'error')
+
+    def __init__(self, index: int, error: BaseException):
+        self.index = index
+        self.error = error
+
+
+class _BackgroundProducer(abc.ABC):
+    """Thread productor + cola acotada; salir del bloque `with` lo detiene"""
+
+    def __init__(self, depth: int, name: str):
+        self._queue: 'queue.Queue[Any]' = queue.Queue(maxsize=max(depth, 1))
+        self._stop = threading.Event()
+        self._name = name
+        self._thread: Optional[threading.Thread] = None
+        # Veces que el consumidor encontró la cola vacía (el productor no dio abasto)
+        self.stalls = 0
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._produce, name=self._name, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Detiene al productor y descarta lo preparado"""
+        self._stop.set()
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        if self._thread is not None:
+            self._thread.join(timeout=PUT_POLL_INTERVAL * 5)
+
+    def _put(self, item: Any) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=PUT_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self) -> Any:
+        try:
+            return self._queue.get_nowait()
+        except queue.Empty:
+            self.stalls += 1
+            return self._queue.get()
+
+    @abc.abstractmethod
+    def _produce(self) -> None:
+        """Cuerpo del thread productor: encola con _put y termina con _END"""
+
+
+class RowPipeline(_BackgroundProducer):
+    """
+    Prepara filas en un thread productor y las entrega en orden
+
+    Uso:
+        with RowPipeline(rows, prepare) as pipeline:
+            for prepared in pipeline:
+                ...
+
+    Un error al preparar una fila se relanza en el consumidor al llegar
+    a esa fila (las anteriores se ejecutan normalmente). Salir del bloque
+    `with` antes de terminar detiene al productor.
+    """
+
+    def __init__(self, rows: Sequence[Dict[str, Any]],
+                 prepare: Callable[[Dict[str, Any]], Dict[str, str]],
+                 depth: int = DEFAULT_DEPTH):
+        """
+        Args:
+            rows: Filas del loop
+            prepare: Función pura fila -> {plantilla: texto renderizado};
+                     se ejecuta en el thread productor
+            depth: Filas preparadas por adelantado como máximo
+        """
+        super().__init__(depth, 'row-pipeline')
+        self.rows = rows
+        self.prepare = prepare
+
+    def _produce(self) -> None:
+        for index, row in enumerate(self.rows, 1):
+            try:
+                item: Any = PreparedRow(index, row, self.prepare(row))
+            except Exception as e:
+                item = _Failure(index, e)
+            if not self._put(item) or isinstance(item, _Failure):
+                return
+        self._put(_END)
+
+    def __iter__(self) -> Iterator[PreparedRow]:
+        while True:
+            item = self._get()
+            if item is _END:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+
+
+class FilePrefetcher(_BackgroundProducer):
+    """
+    Parsea los próximos archivos de un loop mientras se procesa el actual
+
+    Entrega (ruta, resultado, error) en el orden de `paths`; un archivo
+    que no se pudo leer llega con resultado None y su excepción, y el
+    productor sigue con el siguiente.
+    """
+
+    def __init__(self, paths: Sequence[Path], load: Callable[[str], Any],
+                 depth: int = DEFAULT_PREFETCH_FILES):
+        """
+        Args:
+            paths: Archivos en orden de proceso
+            load: Función ruta -> datos parseados (se ejecuta en el productor)
+            depth: Archivos parseados por adelantado como máximo
+        """
+        super().__init__(depth, 'file-prefetch')
+        self.paths = paths
+        self.load = load
+
+    def _produce(self) -> None:
+        for path in self.paths:
+            try:
+                item: Tuple[Path, Any, Optional[Exception]] = (path, self.load(str(path)), None)
+            except Exception as e:
+                item = (path, None, e)
+            if not self._put(item):
+                return
+        self._put(_END)
+
+    def __iter__(self) -> Iterator[Tuple[Path, Any, Optional[Exception]]]:
+        while True:
+            item = self._get()
+            if item is _END:
+                return
+            yield item
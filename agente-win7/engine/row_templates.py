@@ -0,0 +1,153 @@
+"""
+Plantillas de fila ({{fila.columna}}) precalculadas para loops
+Detecta las plantillas que dependen solo de la fila y las renderiza para
+todas las filas de una vez con operaciones vectorizadas de pandas, con el
+mismo resultado que el render fila por fila del ejecutor. También traduce
+condiciones de fila a expresiones de DataFrame.query (filtros de loop)
+
+Compatible con Windows 7 (Python 3.8)
+"""
+
+import logging
+import re
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+# Placeholders {{variable}} / {{fila.columna}}
+TEMPLATE_PATTERN = re.compile(r'\{\{([^}]+)\}\}')
+
+# {{fila.columna}} en una condición, opcionalmente entre comillas (mismo tipo a ambos lados)
+ROW_CONDITION_PATTERN = re.compile(r"""(['"]?)\{\{(\s*fila\.[^}]+)\}\}\1""")
+
+
+def is_row_template(text: str) -> bool:
+    """True si el texto tiene placeholders y todos son {{fila.columna}}"""
+    names = TEMPLATE_PATTERN.findall(text)
+    return bool(names) and all(name.strip().split('.')[0] == 'fila' and '.' in name
+                               for name in names)
+
+
+def render_row_template(text: str, row: Dict[str, Any]) -> str:
+    """Renderiza una plantilla de solo fila (mismo resultado que _replace_variables)"""
+    def replacer(match):
+        column = match.group(1).strip().split('.')[1]
+        return str(row.get(column, match.group(0)))
+    return TEMPLATE_PATTERN.sub(replacer, text)
+
+
+def compile_row_condition(condition: str) -> str:
+    """
+    Traduce una condición de fila a expresión de DataFrame.query
+
+    {{fila.col}} pasa a `col` (columna completa). Entre comillas
+    ('{{fila.col}}'), como se escribe en ifElse para comparar texto,
+    pasa a `col`.astype('str'): la comparación sigue siendo de texto.
+    Los demás placeholders no se tocan (se reemplazan como variables).
+
+    Ej: "'{{fila.Estado}}' == 'Pendiente' and {{fila.Monto}} > 100"
+        -> "`Estado`.astype('str') == 'Pendiente' and `Monto` > 100"
+    """
+    def replacer(match):
+        column = match.group(2).strip().split('.')[1].replace('`', '')
+        if match.group(1):
+            return f"`{column}`.astype('str')"
+        return f"`{column}`"
+    return ROW_CONDITION_PATTERN.sub(replacer, condition)
+
+
+def column_text(values: pd.Series) -> pd.Series:
+    """
+    Texto de cada celda igual a str() sobre el valor de to_dict('records')
+
+    Numéricos y booleanos se convierten con numpy en bloque; el resto
+    (texto, fechas, mixtos) con str() por celda, una sola vez por columna.
+    """
+    if values.dtype.kind in 'iub' or values.dtype == np.float64:
+        return pd.Series(values.to_numpy().astype(str).astype(object), index=values.index)
+    return pd.Series([str(value) for value in values.tolist()], index=values.index, dtype=object)
+
+
+def key_text(values: pd.Series) -> pd.Series:
+    """
+    Texto normalizado de cada celda para claves y validación
+
+    Como column_text, pero sin espacios a los lados, vacíos/NaN como '' y
+    enteros leídos como float por tener celdas vacías sin decimales
+    (12345678.0 -> '12345678'), igual que lookup_key.
+    """
+    text = None
+    if values.dtype.kind == 'f':
+        present = values.dropna()
+        if len(present) and (present % 1 == 0).all():
+            text = values.astype('Int64').astype(str)
+    if text is None:
+        text = column_text(values)
+    return text.where(values.notna(), '').str.strip()
+
+
+def render_columns(frame: pd.DataFrame, templates: Iterable[str]) -> Optional[Dict[str, List[str]]]:
+    """
+    Renderiza plantillas de solo fila para todas las filas del DataFrame
+
+    Cada columna referenciada se convierte a texto una vez y las partes
+    de cada plantilla se concatenan como Series.
+
+    Args:
+        frame: Datos del loop (mismas filas que recorre el ejecutor)
+        templates: Plantillas que cumplen is_row_template
+
+    Returns:
+        Dict plantilla -> lista de textos (uno por fila), o None si el
+        DataFrame tiene columnas repetidas (el render por fila decide cuál usar)
+    """
+    if not frame.columns.is_unique:
+        return None
+
+    start = time.perf_counter()
+    texts: Dict[Any, pd.Series] = {}
+    rendered: Dict[str, List[str]] = {}
+    total = len(frame)
+
+    for template in templates:
+        parts = TEMPLATE_PATTERN.split(template)
+        result: Any = ''
+        for position, part in enumerate(parts):
+            if position % 2 == 0:
+                piece: Any = part
+            else:
+                column = part.strip().split('.')[1]
+                if column not in frame.columns:
+                    # Igual que el render por fila: el placeholder queda sin reemplazar
+                    piece = '{{' + part + '}}'
+                else:
+                    if column not in texts:
+                        texts[column] = column_text(frame[column])
+                    piece = texts[column]
+            if isinstance(piece, str) and not piece:
+                continue
+            result = piece if isinstance(result, str) and not result else result + piece
+        rendered[template] = result.tolist() if isinstance(result, pd.Series) else [result] * total
+
+    logger.debug(f"Plantillas de fila precalculadas: {len(rendered)} x {total} filas "
+                 f"en {round((time.perf_counter() - start) * 1000, 2)} ms")
+    return rendered
+
+
+class RenderedRow:
+    """Vista de una fila sobre las plantillas precalculadas (interfaz de dict.get)"""
+
+    __slots__ = ('columns', 'position')
+
+    def __init__(self, columns: Dict[str, List[str]], position: int):
+        self.columns = columns
+        self.position = position
+
+    def get(self, template: str) -> Optional[str]:
+        values = self.columns.get(template)
+        return values[self.position] if values is not None else None
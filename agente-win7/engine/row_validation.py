@@ -0,0 +1,195 @@
+"""
+Validación de filas de un loop antes de ejecutar acciones de UI
+Las reglas declaradas por columna (obligatoria, regex, formato de fecha,
+rango numérico, unicidad) se evalúan sobre la columna completa con
+operaciones vectorizadas; el resultado indica qué filas son inválidas y
+por qué, sin haber consumido tiempo de UI
+
+Compatible con Windows 7 (Python 3.8)
+"""
+
+import logging
+import re
+import time
+from datetime import date
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .row_templates import column_text
+
+logger = logging.getLogger(__name__)
+
+
+# Reglas admitidas por columna
+RULES = ('required', 'regex', 'dateFormat', 'min', 'max', 'unique')
+
+# Filas inválidas citadas en el resumen (el detalle completo va al archivo de rechazos)
+MAX_SUMMARY_ROWS = 5
+
+
+class RowValidationError(Exception):
+    """Reglas de validación mal declaradas (columna inexistente, regla desconocida)"""
+    pass
+
+
+class InvalidRow:
+    """Fila que no cumple las reglas: posición en el DataFrame, fila del archivo y motivos"""
+
+    __slots__ = ('position', 'row_number', 'reasons')
+
+    def __init__(self, position: int, row_number: int, reasons: List[str]):
+        self.position = position
+        self.row_number = row_number
+        self.reasons = reasons
+
+
+class ValidationReport:
+    """
+    Resultado de validate_frame
+
+    Attributes:
+        total: Filas validadas
+        valid: Máscara numpy de filas válidas (en orden del DataFrame)
+        invalid: Filas inválidas, en orden
+        counts: Motivo -> cantidad de filas
+    """
+
+    __slots__ = ('total', 'valid', 'invalid', 'counts')
+
+    def __init__(self, total: int, valid: np.ndarray, invalid: List[InvalidRow],
+                 counts: Dict[str, int]):
+        self.total = total
+        self.valid = valid
+        self.invalid = invalid
+        self.counts = counts
+
+    @property
+    def ok(self) -> bool:
+        return not self.invalid
+
+    def summary(self) -> str:
+        """Resumen para el log: motivos con su cantidad y las primeras filas"""
+        reasons = ', '.join(f"{reason} ({count})" for reason, count in self.counts.items() if count)
+        first = '; '.join(f"fila {row.row_number}: {', '.join(row.reasons)}"
+                          for row in self.invalid[:MAX_SUMMARY_ROWS])
+        more = '; ...' if len(self.invalid) > MAX_SUMMARY_ROWS else ''
+        return (f"{len(self.invalid)} de {self.total} filas inválidas [{reasons}] "
+                f"- {first}{more}")
+
+
+def validate_frame(frame: pd.DataFrame, rules: Dict[str, Dict[str, Any]],
+                   first_row: int = 2) -> ValidationReport:
+    """
+    Valida todas las filas del DataFrame contra las reglas por columna
+
+    Las reglas se evalúan sobre el texto que escribe {{fila.columna}}
+    (column_text): una columna de enteros con celdas vacías se lee como
+    float y escribe '12345678.0', así que una regex de solo dígitos la
+    marca inválida. Un valor vacío (NaN o solo espacios) solo falla por
+    'required'; las demás reglas se aplican a los valores presentes.
+
+    Ej: {"dni": {"required": true, "regex": "\\\\d{8}", "unique": true},
+         "fecha_afil": {"dateFormat": "%d/%m/%Y"},
+         "cuenta": {"required": true, "min": 1}}
+
+    Args:
+        frame: Datos del loop (el índice es la posición en el archivo)
+        rules: Columna -> {required, regex, dateFormat, min, max, unique}
+        first_row: Fila del archivo que corresponde al índice 0 (encabezado en la fila 1)
+
+    Returns:
+        ValidationReport con las filas inválidas y sus motivos
+
+    Raises:
+        RowValidationError: Si una columna no existe o una regla no es válida
+    """
+    if not isinstance(rules, dict):
+        raise RowValidationError("validate debe ser un objeto columna -> reglas")
+    if not frame.columns.is_unique:
+        raise RowValidationError("El archivo tiene columnas repetidas")
+
+    start = time.perf_counter()
+    total = len(frame)
+    checks: List[Tuple[str, np.ndarray]] = []
+
+    for column, spec in rules.items():
+        if column not in frame.columns:
+            raise RowValidationError(f"La columna '{column}' no existe en el archivo del loop")
+        if not isinstance(spec, dict):
+            raise RowValidationError(f"Las reglas de '{column}' deben ser un objeto")
+        unknown = set(spec) - set(RULES)
+        if unknown:
+            raise RowValidationError(f"Reglas desconocidas para '{column}': {sorted(unknown)} "
+                                     f"(válidas: {', '.join(RULES)})")
+        checks.extend(_column_checks(column, frame[column], spec))
+
+    invalid_mask = np.zeros(total, dtype=bool)
+    counts: Dict[str, int] = {}
+    reasons: Dict[int, List[str]] = {}
+    for reason, mask in checks:
+        invalid_mask |= mask
+        positions = np.flatnonzero(mask)
+        counts[reason] = len(positions)
+        for position in positions.tolist():
+            reasons.setdefault(position, []).append(reason)
+
+    labels = frame.index
+    invalid = [InvalidRow(position, int(labels[position]) + first_row, reasons[position])
+               for position in np.flatnonzero(invalid_mask).tolist()]
+
+    logger.debug(f"Validación de {total} filas x {len(rules)} columnas "
+                 f"en {round((time.perf_counter() - start) * 1000, 2)} ms")
+    return ValidationReport(total, ~invalid_mask, invalid, counts)
+
+
+def _column_checks(column: str, values: pd.Series,
+                   spec: Dict[str, Any]) -> List[Tuple[str, np.ndarray]]:
+    """(motivo, máscara de filas que fallan) por cada regla de la columna"""
+    checks: List[Tuple[str, np.ndarray]] = []
+    text = column_text(values)
+    present = (values.notna() & text.str.strip().ne('')).to_numpy(dtype=bool)
+
+    if spec.get('required'):
+        checks.append((f"{column}: vacío", ~present))
+
+    pattern = spec.get('regex')
+    if pattern:
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            raise RowValidationError(f"regex inválida para '{column}': {e}")
+        matches = text.str.fullmatch(pattern).fillna(False).to_numpy(dtype=bool)
+        checks.append((f"{column}: no coincide con {pattern}", present & ~matches))
+
+    date_format = spec.get('dateFormat')
+    if date_format and values.dtype.kind != 'M':
+        parsed = pd.to_datetime(text.where(present), format=date_format, errors='coerce')
+        valid = parsed.notna().to_numpy(dtype=bool)
+        if values.dtype == object:
+            # Celdas de Excel ya leídas como fecha: válidas sin importar el formato de texto
+            valid |= values.map(lambda value: isinstance(value, date)).to_numpy(dtype=bool)
+        checks.append((f"{column}: fecha inválida (formato {date_format})", present & ~valid))
+
+    low, high = spec.get('min'), spec.get('max')
+    if low is not None or high is not None:
+        try:
+            low = float(low) if low is not None else None
+            high = float(high) if high is not None else None
+        except (TypeError, ValueError):
+            raise RowValidationError(f"min/max de '{column}' deben ser números: {spec.get('min')!r}, "
+                                     f"{spec.get('max')!r}")
+        numbers = pd.to_numeric(values, errors='coerce')
+        checks.append((f"{column}: no numérico", present & numbers.isna().to_numpy(dtype=bool)))
+        if low is not None:
+            checks.append((f"{column}: menor que {spec['min']}", (numbers < low).to_numpy(dtype=bool)))
+        if high is not None:
+            checks.append((f"{column}: mayor que {spec['max']}", (numbers > high).to_numpy(dtype=bool)))
+
+    if spec.get('unique'):
+        # La primera aparición es válida; las siguientes con el mismo valor, no
+        repeated = text.duplicated(keep='first').to_numpy(dtype=bool)
+        checks.append((f"{column}: duplicado", present & repeated))
+
+    return checks
@@ -0,0 +1,297 @@
+"""
+Historial de resolución de selectores por aplicación
+Registra éxito y latencia de cada estrategia (auto_id, path, name+control_type,
+imagen...) por aplicación destino, persiste en JSON, ordena las alternativas
+de un selector según lo aprendido y deriva timeouts por selector
+
+Compatible con Windows 7 (Python 3.8)
+"""
+
+import json
+import logging
+import math
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+# Archivo persistente (agente-win7/selector_stats.json)
+DEFAULT_STORE_PATH = Path(__file__).parent.parent / 'selector_stats.json'
+
+# Latencias retenidas por selector (para percentiles)
+MAX_SAMPLES = 50
+
+# Intentos mínimos antes de confiar en el historial de un selector
+MIN_ATTEMPTS = 3
+
+# Costo asumido de una estrategia sin historial y de un fallo (ms)
+UNKNOWN_COST_MS = 1000.0
+FAILURE_COST_MS = 5000.0
+
+# Intervalo mínimo entre escrituras a disco
+SAVE_INTERVAL = 5.0  # segundos
+
+# Timeouts adaptativos: percentil de latencia × factor, con piso fijo
+# (el techo lo pone quien consulta: el timeout global del motor)
+MIN_TIMEOUT_SAMPLES = 10
+TIMEOUT_PERCENTILE = 0.99
+TIMEOUT_FACTOR = 3.0
+MIN_ADAPTIVE_TIMEOUT = 2.0  # segundos
+
+# Fases registradas: búsqueda del elemento y espera a que esté habilitado
+PHASE_EXISTS = 'exists'
+PHASE_ENABLED = 'enabled'
+
+
+def selector_kind(selector: Dict[str, Any]) -> str:
+    """
+    Nombre de la estrategia de un selector parseado
+
+    Mismo formato que TreeSnapshot.find: 'path', 'image', 'coordinates'
+    o los criterios unidos con '+' (ej: 'title+control_type').
+    """
+    for kind in ('path', 'image', 'coordinates'):
+        if selector.get(kind):
+            return kind
+    keys = [key for key in ('auto_id', 'title', 'control_type', 'class_name') if selector.get(key)]
+    return '+'.join(keys) or 'empty'
+
+
+def selector_key(selector: Dict[str, Any]) -> str:
+    """Clave estable de un selector parseado"""
+    return json.dumps(selector, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+
+
+class _Entry:
+    """Historial de un selector (o de una estrategia agregada por app)"""
+
+    __slots__ = ('attempts', 'successes', 'samples', 'last_used', 'failures_in_row')
+
+    def __init__(self, attempts: int = 0, successes: int = 0,
+                 samples: Optional[List[float]] = None, last_used: float = 0.0,
+                 failures_in_row: int = 0):
+        self.attempts = attempts
+        self.successes = successes
+        self.samples = samples or []  # Latencias (ms) de resoluciones exitosas
+        self.last_used = last_used
+        self.failures_in_row = failures_in_row
+
+    def record(self, latency_ms: float, success: bool) -> None:
+        self.attempts += 1
+        self.last_used = time.time()
+        if success:
+            self.successes += 1
+            self.failures_in_row = 0
+            self.samples.append(round(latency_ms, 1))
+            if len(self.samples) > MAX_SAMPLES:
+                del self.samples[:-MAX_SAMPLES]
+        else:
+            self.failures_in_row += 1
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Percentil (nearest-rank) de las latencias en ms"""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        rank = max(1, math.ceil(fraction * len(ordered)))
+        return ordered[min(rank, len(ordered)) - 1]
+
+    def cost(self) -> Optional[float]:
+        """Costo esperado en ms (None si no hay historial suficiente)"""
+        if self.attempts < MIN_ATTEMPTS:
+            return None
+        success_rate = self.successes / self.attempts
+        mean_ms = sum(self.samples) / len(self.samples) if self.samples else FAILURE_COST_MS
+        return success_rate * mean_ms + (1 - success_rate) * FAILURE_COST_MS
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'attempts': self.attempts,
+            'successes': self.successes,
+            'samples': self.samples,
+            'last_used': round(self.last_used, 3),
+            'failures_in_row': self.failures_in_row
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> '_Entry':
+        return cls(data.get('attempts', 0), data.get('successes', 0),
+                   list(data.get('samples', [])), data.get('last_used', 0.0),
+                   data.get('failures_in_row', 0))
+
+
+class SelectorStats:
+    """
+    Historial persistente de selectores por aplicación
+
+    Estructura: app -> {'selectors': {clave: entry}, 'strategies': {tipo: entry},
+    'enabled': {clave: entry}}. El agregado por tipo sirve para ordenar
+    selectores nuevos de una app conocida; el historial propio del selector
+    tiene prioridad cuando existe. 'enabled' guarda la espera posterior a
+    encontrar el elemento (click/escritura) y solo se usa para su timeout.
+    """
+
+    def __init__(self, store_path: Optional[Path] = None):
+        self.store_path = Path(store_path) if store_path else DEFAULT_STORE_PATH
+        self._apps: Dict[str, Dict[str, Dict[str, _Entry]]] = {}
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._last_save = 0.0
+        self._load()
+
+    # ==================== PERSISTENCIA ====================
+
+    def _load(self) -> None:
+        try:
+            if self.store_path.exists():
+                raw = json.loads(self.store_path.read_text(encoding='utf-8'))
+                for app, sections in raw.items():
+                    self._apps[app] = {
+                        section: {key: _Entry.from_dict(value) for key, value in entries.items()}
+                        for section, entries in sections.items()
+                    }
+                logger.info(f"Historial de selectores cargado: {len(self._apps)} aplicaciones")
+        except Exception as e:
+            logger.warning(f"No se pudo leer historial de selectores: {e}")
+            self._apps = {}
+
+    def flush(self) -> None:
+        """Escribe el historial a disco si hay cambios"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                app: {section: {key: entry.to_dict() for key, entry in entries.items()}
+                      for section, entries in sections.items()}
+                for app, sections in self._apps.items()
+            }
+            self._dirty = False
+            self._last_save = time.time()
+        try:
+            tmp_path = self.store_path.with_suffix('.tmp')
+            tmp_path.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+            tmp_path.replace(self.store_path)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar historial de selectores: {e}")
+
+    # ==================== REGISTRO ====================
+
+    def _entry(self, app: str, section: str, key: str) -> _Entry:
+        sections = self._apps.setdefault(app, {'selectors': {}, 'strategies': {}})
+        entries = sections.setdefault(section, {})
+        entry = entries.get(key)
+        if entry is None:
+            entry = entries[key] = _Entry()
+        return entry
+
+    def record(self, app: str, selector: Dict[str, Any], latency_ms: float, success: bool,
+               phase: str = PHASE_EXISTS) -> None:
+        """
+        Registra una resolución
+
+        Args:
+            app: Clave de la aplicación destino
+            selector: Selector parseado (una sola estrategia en la fase 'exists')
+            latency_ms: Tiempo de resolución
+            success: Si el elemento se encontró (o se habilitó)
+            phase: PHASE_EXISTS o PHASE_ENABLED
+        """
+        with self._lock:
+            if phase == PHASE_ENABLED:
+                self._entry(app, 'enabled', selector_key(selector)).record(latency_ms, success)
+            else:
+                self._entry(app, 'selectors', selector_key(selector)).record(latency_ms, success)
+                self._entry(app, 'strategies', selector_kind(selector)).record(latency_ms, success)
+            self._dirty = True
+            due = time.time() - self._last_save >= SAVE_INTERVAL
+        if due:
+            self.flush()
+
+    # ==================== CONSULTA ====================
+
+    def rank(self, app: str, alternatives: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Ordena las alternativas de un selector por costo esperado
+
+        Usa el historial del selector si tiene intentos suficientes, si no
+        el de su tipo de estrategia en la app, y si no un costo fijo; los
+        empates respetan el orden declarado (el del picker).
+        """
+        with self._lock:
+            sections = self._apps.get(app, {})
+            selectors = sections.get('selectors', {})
+            strategies = sections.get('strategies', {})
+
+            def cost(item):
+                position, selector = item
+                for entry in (selectors.get(selector_key(selector)),
+                              strategies.get(selector_kind(selector))):
+                    value = entry.cost() if entry else None
+                    if value is not None:
+                        return (value, position)
+                return (UNKNOWN_COST_MS, position)
+
+            ordered = sorted(enumerate(alternatives), key=cost)
+        return [selector for _, selector in ordered]
+
+    def timeout_for(self, app: str, selector: Dict[str, Any], maximum: float,
+                    phase: str = PHASE_EXISTS) -> Optional[float]:
+        """
+        Timeout aprendido para un selector (segundos)
+
+        p99 de las latencias exitosas × TIMEOUT_FACTOR, entre
+        MIN_ADAPTIVE_TIMEOUT y `maximum`. Retorna None (usar el timeout
+        completo) si hay pocas muestras o si el último intento falló: tras
+        un fallo rápido, el siguiente intento vuelve a esperar lo máximo y
+        así una app que se volvió más lenta reaprende su latencia.
+        """
+        section = 'enabled' if phase == PHASE_ENABLED else 'selectors'
+        with self._lock:
+            entry = self._apps.get(app, {}).get(section, {}).get(selector_key(selector))
+            if entry is None or entry.failures_in_row or len(entry.samples) < MIN_TIMEOUT_SAMPLES:
+                return None
+            p99_ms = entry.percentile(TIMEOUT_PERCENTILE)
+        learned = p99_ms * TIMEOUT_FACTOR / 1000.0
+        return round(min(maximum, max(MIN_ADAPTIVE_TIMEOUT, learned)), 2)
+
+    def samples(self, app: str, selector: Dict[str, Any]) -> List[float]:
+        """Latencias exitosas recientes (ms) de un selector"""
+        with self._lock:
+            entry = self._apps.get(app, {}).get('selectors', {}).get(selector_key(selector))
+            return list(entry.samples) if entry else []
+
+    def get_entries(self, app: Optional[str] = None) -> Dict[str, Any]:
+        """Historial por tipo de estrategia (para diagnóstico)"""
+        with self._lock:
+            apps = [app] if app else list(self._apps)
+            return {
+                name: {kind: entry.to_dict()
+                       for kind, entry in self._apps.get(name, {}).get('strategies', {}).items()}
+                for name in apps if name in self._apps
+            }
+
+    def forget(self, app: Optional[str] = None) -> None:
+        """Descarta el historial (de una app o todo)"""
+        with self._lock:
+            if app is None:
+                self._apps.clear()
+            else:
+                self._apps.pop(app, None)
+            self._dirty = True
+        self.flush()
+
+
+_stats: Optional[SelectorStats] = None
+_stats_lock = threading.Lock()
+
+
+def get_selector_stats() -> SelectorStats:
+    """Retorna el historial compartido del proceso"""
+    global _stats
+    with _stats_lock:
+        if _stats is None:
+            _stats = SelectorStats()
+        return _stats
@@ -0,0 +1,285 @@
+"""
+Tabla en memoria con almacenamiento por columnas
+Resultado de ExcelEngine: cada columna es una lista de valores y las filas
+son vistas (sin copiar datos) sobre esas listas. Los nombres de columna se
+internan una vez en un índice compartido por todas las filas. Los cortes,
+filtros y proyecciones comparten las columnas y solo guardan qué
+filas/columnas ven. La lista de diccionarios se genera solo cuando se pide
+(respuestas JSON)
+
+Compatible con Windows 7 (Python 3.8)
+"""
+
+import logging
+import re
+import sys
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+# Texto de un entero con decimales en cero (ej: '1203.0', el str() de un float)
+INTEGER_TEXT_PATTERN = re.compile(r'(-?\d+)\.0+')
+
+
+def lookup_key(value: Any) -> Optional[str]:
+    """
+    Clave normalizada para cruzar archivos
+
+    Texto sin espacios a los lados; números enteros sin decimales (un
+    código leído como 1203.0 en un archivo y '1203' en otro coincide,
+    también si llega como texto '1203.0' desde una plantilla).
+    Vacíos y NaN no tienen clave.
+    """
+    if value is None or value != value:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    key = str(value).strip()
+    integer = INTEGER_TEXT_PATTERN.fullmatch(key)
+    if integer:
+        key = integer.group(1)
+    return key or None
+
+
+class ColumnIndex:
+    """
+    Nombres de columna visibles -> posición de su lista en la tabla
+
+    Se crea una vez por tabla (o por proyección) y lo comparten todas
+    sus filas; los nombres de texto se internan con sys.intern.
+    """
+
+    __slots__ = ('names', 'slots')
+
+    def __init__(self, names: Sequence[Any], slots: Optional[Sequence[int]] = None):
+        self.names = tuple(sys.intern(name) if isinstance(name, str) else name for name in names)
+        if slots is None:
+            slots = range(len(self.names))
+        self.slots: Dict[Any, int] = dict(zip(self.names, slots))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.slots
+
+    def project(self, names: Sequence[Any]) -> 'ColumnIndex':
+        """Índice con un subconjunto de columnas (mismas listas de valores)"""
+        return ColumnIndex(names, [self.slots[name] for name in names])
+
+
+class RowView(Mapping):
+    """
+    Fila de una Table: lectura por nombre de columna sin copiar valores
+
+    Se comporta como un dict de solo lectura (get, keys, items, in, ==);
+    guarda solo la tabla y la posición de la fila.
+    """
+
+    __slots__ = ('_table', '_position')
+
+    def __init__(self, table: 'Table', position: int):
+        self._table = table
+        self._position = position  # Posición en las listas de columnas
+
+    def __getitem__(self, name: Any) -> Any:
+        return self._table._data[self._table._index.slots[name]][self._position]
+
+    def get(self, name: Any, default: Any = None) -> Any:
+        slot = self._table._index.slots.get(name)
+        if slot is None:
+            return default
+        return self._table._data[slot][self._position]
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._table._index.names)
+
+    def __len__(self) -> int:
+        return len(self._table._index)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._table._index
+
+    def to_dict(self) -> Dict[Any, Any]:
+        """Copia de la fila como dict"""
+        data, position = self._table._data, self._position
+        return {name: data[slot][position] for name, slot in self._table._index.slots.items()}
+
+    def __repr__(self) -> str:
+        return f"RowView({self.to_dict()!r})"
+
+
+class Table:
+    """
+    Tabla por columnas con vistas de fila
+
+    Args:
+        data: Listas de valores, una por columna (todas del mismo largo)
+        index: Columnas visibles y su lista en `data`
+        rows: Posiciones de fila visibles, en orden (por defecto, todas)
+
+    Uso:
+        table = Table.from_frame(df)
+        for row in table:           # RowView
+            row['RUC'], row.get('Nombre')
+        table[10:20], table.filter('Estado', 'Pendiente'), table.select(['RUC'])
+        table.to_records()          # lista de dicts (JSON)
+    """
+
+    __slots__ = ('_data', '_index', '_rows', '_length')
+
+    def __init__(self, data: List[List[Any]], index: ColumnIndex,
+                 rows: Optional[List[int]] = None):
+        self._data = data
+        self._index = index
+        self._rows = rows
+        if rows is not None:
+            self._length = len(rows)
+        else:
+            self._length = len(data[0]) if data else 0
+
+    # ==================== CONSTRUCCIÓN ====================
+
+    @classmethod
+    def from_columns(cls, columns: Dict[Any, List[Any]]) -> 'Table':
+        """Crea la tabla desde un dict nombre -> lista de valores"""
+        return cls(list(columns.values()), ColumnIndex(list(columns)))
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> 'Table':
+        """
+        Crea la tabla desde un DataFrame (una lista por columna)
+
+        Los valores quedan como tipos nativos de Python, igual que
+        to_dict('records'); con columnas repetidas gana la última.
+        """
+        columns: Dict[Any, List[Any]] = {}
+        for position, name in enumerate(frame.columns):
+            columns[name] = frame.iloc[:, position].tolist()
+        return cls.from_columns(columns)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> 'Table':
+        """Crea la tabla desde una lista de dicts (claves faltantes quedan en None)"""
+        records = list(records)
+        names: Dict[Any, None] = {}
+        for record in records:
+            for name in record:
+                names.setdefault(name, None)
+        return cls.from_columns({name: [record.get(name) for record in records] for name in names})
+
+    @classmethod
+    def coerce(cls, data: Union['Table', Iterable[Dict[str, Any]]]) -> 'Table':
+        """Retorna `data` como Table (sin copiar si ya lo es)"""
+        return data if isinstance(data, Table) else cls.from_records(data)
+
+    # ==================== ACCESO ====================
+
+    @property
+    def columns(self) -> List[Any]:
+        """Nombres de columna visibles"""
+        return list(self._index.names)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _positions(self) -> Sequence[int]:
+        return self._rows if self._rows is not None else range(self._length)
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[RowView, 'Table']:
+        if isinstance(key, slice):
+            return Table(self._data, self._index, list(self._positions()[key]))
+        if key < 0:
+            key += self._length
+        if not 0 <= key < self._length:
+            raise IndexError("Índice de fila fuera de rango")
+        return RowView(self, self._rows[key] if self._rows is not None else key)
+
+    def __iter__(self) -> Iterator[RowView]:
+        for position in self._positions():
+            yield RowView(self, position)
+
+    def cursor(self) -> Iterator[RowView]:
+        """
+        Recorre las filas con una sola vista que se mueve de fila en fila
+
+        Sin asignaciones por fila: la vista entregada cambia en cada paso,
+        así que no debe guardarse (usar to_dict() para conservar una fila).
+        """
+        view = RowView(self, 0)
+        for position in self._positions():
+            view._position = position
+            yield view
+
+    def column(self, name: Any) -> List[Any]:
+        """Valores de una columna para las filas visibles"""
+        values = self._data[self._index.slots[name]]
+        if self._rows is None:
+            return values
+        return [values[position] for position in self._rows]
+
+    # ==================== VISTAS ====================
+
+    def select(self, names: Sequence[Any]) -> 'Table':
+        """Proyección: solo las columnas indicadas (en ese orden)"""
+        missing = [name for name in names if name not in self._index]
+        if missing:
+            raise KeyError(f"Columnas inexistentes: {missing}")
+        return Table(self._data, self._index.project(names), self._rows)
+
+    def where(self, mask: Sequence[bool]) -> 'Table':
+        """Filas cuya posición en `mask` es verdadera"""
+        return Table(self._data, self._index,
+                     [position for position, keep in zip(self._positions(), mask) if keep])
+
+    def filter(self, column: Any, value: Any = None,
+               predicate: Optional[Callable[[Any], bool]] = None) -> 'Table':
+        """
+        Filas donde la columna es igual a `value` (o cumple `predicate`)
+
+        Raises:
+            KeyError: Si la columna no existe
+        """
+        values = self.column(column)
+        if predicate is None:
+            return self.where([item == value for item in values])
+        return self.where([predicate(item) for item in values])
+
+    def index_by(self, column: Any) -> Dict[str, int]:
+        """
+        Índice hash clave normalizada -> posición de fila (primera aparición)
+
+        Las posiciones sirven para RowView(table, posición).
+
+        Raises:
+            KeyError: Si la columna no existe
+        """
+        values = self._data[self._index.slots[column]]
+        index: Dict[str, int] = {}
+        for position in self._positions():
+            key = lookup_key(values[position])
+            if key is not None and key not in index:
+                index[key] = position
+        return index
+
+    def row_at(self, position: int) -> RowView:
+        """Vista de la fila en una posición de las listas de columnas (ver index_by)"""
+        return RowView(self, position)
+
+    # ==================== EXPORTACIÓN ====================
+
+    def to_records(self) -> List[Dict[Any, Any]]:
+        """Lista de dicts (para JSON o código que espera registros)"""
+        return [row.to_dict() for row in self.cursor()]
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame con las filas y columnas visibles"""
+        names = self._index.names
+        return pd.DataFrame({name: self.column(name) for name in names}, columns=list(names))
+
+    def __repr__(self) -> str:
+        return f"Table({self._length} filas x {len(self._index)} columnas)"
@@ -0,0 +1,192 @@
+"""
+Selectores por ruta de ancestros
+Un selector "path:[...]" es la cadena de segmentos (control_type, class_name,
+name/auto_id, índice entre hermanos del mismo tipo) desde la ventana top-level
+hasta el elemento. Se resuelve recorriendo una sola lista de hijos por nivel.
+"""
+
+import json
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+PATH_PREFIX = 'path:'
+
+# Claves compactas de cada segmento
+KEY_CONTROL_TYPE = 'ct'
+KEY_CLASS_NAME = 'cls'
+KEY_NAME = 'name'
+KEY_AUTO_ID = 'aid'
+KEY_INDEX = 'idx'
+
+# Profundidad máxima al subir por los ancestros (protección contra ciclos)
+MAX_PATH_DEPTH = 64
+
+
+def element_signature(element: Any) -> Dict[str, Any]:
+    """
+    Lee las propiedades de identidad de un elemento desde element_info
+
+    Funciona con wrappers uia y win32 (los campos que un backend no
+    expone quedan vacíos).
+    """
+    info = element.element_info
+    signature = {}
+    for key, attr in ((KEY_CONTROL_TYPE, 'control_type'), (KEY_CLASS_NAME, 'class_name'),
+                      (KEY_NAME, 'name'), (KEY_AUTO_ID, 'automation_id')):
+        try:
+            value = getattr(info, attr, None)
+        except Exception:
+            value = None
+        if value:
+            signature[key] = value
+    return signature
+
+
+def same_kind(signature: Dict[str, Any], segment: Dict[str, Any]) -> bool:
+    """True si el elemento tiene el mismo control_type y class_name que el segmento"""
+    return (signature.get(KEY_CONTROL_TYPE) == segment.get(KEY_CONTROL_TYPE) and
+            signature.get(KEY_CLASS_NAME) == segment.get(KEY_CLASS_NAME))
+
+
+def _same_element(a: Any, b: Any) -> bool:
+    """Compara dos wrappers por handle (si tienen) o por rectángulo"""
+    try:
+        if a.handle and b.handle:
+            return a.handle == b.handle
+    except Exception:
+        pass
+    try:
+        return a.rectangle() == b.rectangle()
+    except Exception:
+        return False
+
+
+def build_path(element: Any) -> Optional[List[Dict[str, Any]]]:
+    """
+    Construye la ruta desde la ventana top-level hasta el elemento
+
+    Args:
+        element: Wrapper pywinauto capturado
+
+    Returns:
+        Lista de segmentos (sin incluir la ventana top-level), o None si
+        no se pudo recorrer la jerarquía
+    """
+    segments: List[Dict[str, Any]] = []
+    current = element
+    try:
+        top = element.top_level_parent()
+        for _ in range(MAX_PATH_DEPTH):
+            if _same_element(current, top):
+                break
+            parent = current.parent()
+            if parent is None:
+                break
+
+            signature = element_signature(current)
+            index = 0
+            for sibling in parent.children():
+                sibling_signature = element_signature(sibling)
+                if not same_kind(sibling_signature, signature):
+                    continue
+                if _same_element(sibling, current):
+                    break
+                index += 1
+
+            segment = dict(signature)
+            segment[KEY_INDEX] = index
+            segments.append(segment)
+            current = parent
+        else:
+            return None
+    except Exception as e:
+        logger.debug(f"No se pudo construir ruta del elemento: {e}")
+        return None
+
+    segments.reverse()
+    return segments or None
+
+
+def encode_path(segments: Sequence[Dict[str, Any]]) -> str:
+    """Serializa la ruta como selector 'path:[...]'"""
+    return PATH_PREFIX + json.dumps(list(segments), ensure_ascii=False, separators=(',', ':'))
+
+
+def decode_path(selector: str) -> List[Dict[str, Any]]:
+    """
+    Parsea un selector 'path:[...]'
+
+    Raises:
+        ValueError: Si el JSON es inválido o algún segmento no es un objeto
+    """
+    segments = json.loads(selector[len(PATH_PREFIX):])
+    if not isinstance(segments, list):
+        raise ValueError("El selector path debe ser una lista de segmentos")
+    for position, segment in enumerate(segments):
+        if not isinstance(segment, dict):
+            raise ValueError(f"Segmento {position} del selector path no es un objeto: {segment!r}")
+    return segments
+
+
+def match_segment(candidates: Sequence[Tuple[Any, Dict[str, Any]]],
+                  segment: Dict[str, Any]) -> Tuple[Optional[Any], bool]:
+    """
+    Elige entre los hijos de un nivel el que corresponde al segmento
+
+    Solo se consideran hijos del mismo control_type/class_name. Se puntúa:
+    auto_id igual (4), nombre igual (2), mismo índice entre hermanos (1).
+    Los empates se resuelven por cercanía al índice original. El nombre
+    no es obligatorio porque en controles de edición es el texto actual.
+    Un hijo sin ningún punto (ni auto_id, ni nombre, ni índice) no se
+    acepta: el llamador trata el nivel como cambiado y usa su búsqueda
+    alternativa en vez de actuar sobre un hermano cualquiera.
+
+    Args:
+        candidates: Pares (elemento, firma) de los hijos, en orden
+        segment: Segmento de la ruta
+
+    Returns:
+        Tupla (elemento o None, True si coincidió exactamente)
+    """
+    expected_index = segment.get(KEY_INDEX, 0)
+    best = None
+    best_key = None
+    exact = False
+    position = 0
+
+    for element, signature in candidates:
+        if not same_kind(signature, segment):
+            continue
+
+        aid_match = bool(segment.get(KEY_AUTO_ID)) and signature.get(KEY_AUTO_ID) == segment.get(KEY_AUTO_ID)
+        name_match = bool(segment.get(KEY_NAME)) and signature.get(KEY_NAME) == segment.get(KEY_NAME)
+        index_match = position == expected_index
+        score = 4 * aid_match + 2 * name_match + index_match
+        key = (score, -abs(position - expected_index))
+
+        if best_key is None or key > best_key:
+            best, best_key = element, key
+            exact = (index_match and
+                     (not segment.get(KEY_AUTO_ID) or aid_match) and
+                     (not segment.get(KEY_NAME) or name_match))
+        position += 1
+
+    if best_key is not None and best_key[0] == 0:
+        logger.warning(f"Ningún hijo coincide con el segmento de ruta (solo mismo tipo): {segment}")
+        return None, False
+
+    return best, exact
+
+
+def signature_matches(signature: Dict[str, Any], segment: Dict[str, Any]) -> bool:
+    """True si la firma coincide con tipo, clase y auto_id/nombre del segmento"""
+    if not same_kind(signature, segment):
+        return False
+    if segment.get(KEY_AUTO_ID):
+        return signature.get(KEY_AUTO_ID) == segment.get(KEY_AUTO_ID)
+    if segment.get(KEY_NAME):
+        return signature.get(KEY_NAME) == segment.get(KEY_NAME)
+    return True
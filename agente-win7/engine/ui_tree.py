@@ -0,0 +1,501 @@
+"""
+Snapshot del árbol de elementos de una ventana
+Recorre la ventana una sola vez (una llamada a children() por nodo) y
+guarda firma, rectángulo y posición entre hermanos de cada elemento, para
+calcular found_index y rutas de varios elementos sin volver a la app.
+Incluye serialización compacta, cache por handle con TTL y diff entre snapshots
+"""
+
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from .ui_path import (KEY_AUTO_ID, KEY_CLASS_NAME, KEY_CONTROL_TYPE, KEY_INDEX, KEY_NAME,
+                      element_signature, match_segment, signature_matches)
+
+logger = logging.getLogger(__name__)
+
+
+# Límites del recorrido (ventanas con miles de celdas no deben bloquear al agente)
+DEFAULT_MAX_DEPTH = 40
+DEFAULT_MAX_NODES = 5000
+
+# Cache: vigencia de un snapshot y snapshots retenidos por ventana (para diff)
+DEFAULT_TTL = 5.0  # segundos
+DEFAULT_HISTORY = 4
+MAX_CACHED_WINDOWS = 16
+
+# Columnas de cada nodo en el formato compacto
+COMPACT_FIELDS = ('parent', 'depth', KEY_CONTROL_TYPE, KEY_CLASS_NAME, KEY_NAME,
+                  KEY_AUTO_ID, KEY_INDEX, 'rect', 'handle')
+
+# Campos comparados por el diff (la identidad del nodo es su ruta estructural)
+DIFF_FIELDS = (KEY_NAME, KEY_AUTO_ID, 'rect')
+
+_snapshot_ids = itertools.count(1)
+
+
+class TreeNode:
+    """Elemento dentro de un snapshot"""
+
+    __slots__ = ('index', 'parent', 'depth', 'element', 'signature', 'rect',
+                 'handle', 'children', 'type_index', 'kind_index')
+
+    def __init__(self, index: int, parent: Optional[int], depth: int, element: Any,
+                 signature: Dict[str, Any], rect: Optional[Tuple[int, int, int, int]],
+                 handle: int, type_index: int, kind_index: int):
+        self.index = index
+        self.parent = parent
+        self.depth = depth
+        self.element = element
+        self.signature = signature
+        self.rect = rect
+        self.handle = handle
+        self.children: List[int] = []
+        # Posición entre hermanos del mismo control_type (found_index del picker)
+        self.type_index = type_index
+        # Posición entre hermanos del mismo control_type + class_name (segmento de ruta)
+        self.kind_index = kind_index
+
+
+def _element_rect(element: Any) -> Optional[Tuple[int, int, int, int]]:
+    try:
+        rect = element.element_info.rectangle
+        return (int(rect.left), int(rect.top), int(rect.right), int(rect.bottom))
+    except Exception:
+        return None
+
+
+def _element_handle(element: Any) -> int:
+    try:
+        return int(element.element_info.handle or 0)
+    except Exception:
+        return 0
+
+
+class TreeSnapshot:
+    """
+    Árbol de una ventana top-level capturado en un solo recorrido
+
+    Los nodos se guardan en orden de recorrido (anchura primero); el
+    nodo 0 es la ventana. Los wrappers se conservan para poder devolver
+    el elemento real, pero found_index y rutas salen solo del snapshot.
+
+    Las propiedades de cada nodo se leen juntas desde element_info en el
+    mismo paso del recorrido (sin métodos del wrapper, que repiten consultas).
+    """
+
+    def __init__(self, root: Any, max_depth: int = DEFAULT_MAX_DEPTH,
+                 max_nodes: int = DEFAULT_MAX_NODES):
+        """
+        Recorre la ventana
+
+        Args:
+            root: Wrapper de la ventana top-level
+            max_depth: Profundidad máxima a recorrer
+            max_nodes: Nodos máximos (el resto se marca como truncado)
+        """
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.nodes: List[TreeNode] = []
+        self.truncated = False
+        self._by_handle: Dict[int, int] = {}
+        self._keys: Optional[List[str]] = None
+
+        start = time.perf_counter()
+        self._build(root)
+        self.id = next(_snapshot_ids)
+        self.hwnd = self.nodes[0].handle
+        self.created_at = time.time()
+        self.build_ms = round((time.perf_counter() - start) * 1000, 2)
+        logger.debug(f"Snapshot de árbol: {len(self.nodes)} nodos en {self.build_ms} ms")
+
+    # ==================== RECORRIDO ====================
+
+    def _add(self, element: Any, parent: Optional[int], depth: int,
+             type_index: int, kind_index: int) -> TreeNode:
+        node = TreeNode(len(self.nodes), parent, depth, element, element_signature(element),
+                        _element_rect(element), _element_handle(element),
+                        type_index, kind_index)
+        self.nodes.append(node)
+        if node.handle and node.handle not in self._by_handle:
+            self._by_handle[node.handle] = node.index
+        if parent is not None:
+            self.nodes[parent].children.append(node.index)
+        return node
+
+    def _build(self, root: Any) -> None:
+        queue = deque([self._add(root, None, 0, 0, 0)])
+        while queue:
+            node = queue.popleft()
+            if node.depth >= self.max_depth:
+                continue
+            try:
+                children = node.element.children()
+            except Exception as e:
+                logger.debug(f"No se pudieron leer hijos del nodo {node.index}: {e}")
+                continue
+
+            type_counts: Dict[Any, int] = {}
+            kind_counts: Dict[Tuple[Any, Any], int] = {}
+            for child in children:
+                if len(self.nodes) >= self.max_nodes:
+                    self.truncated = True
+                    return
+                child_node = self._add(child, node.index, node.depth + 1, 0, 0)
+                control_type = child_node.signature.get(KEY_CONTROL_TYPE)
+                kind = (control_type, child_node.signature.get(KEY_CLASS_NAME))
+                child_node.type_index = type_counts.get(control_type, 0)
+                child_node.kind_index = kind_counts.get(kind, 0)
+                type_counts[control_type] = child_node.type_index + 1
+                kind_counts[kind] = child_node.kind_index + 1
+                queue.append(child_node)
+
+    def limited(self, max_depth: int, max_nodes: int) -> 'TreeSnapshot':
+        """
+        El snapshot recortado a límites menores, igual que si se hubiera recorrido con ellos
+
+        Los nodos están en orden de anchura: los de profundidad <= max_depth
+        forman un prefijo, y el recorte es un prefijo de ese prefijo. La
+        vista conserva el id del snapshot de origen (el que está en cache).
+        """
+        if max_depth >= self.max_depth and max_nodes >= self.max_nodes:
+            return self
+
+        within = sum(1 for node in self.nodes if node.depth <= max_depth)
+        count = min(within, max_nodes)
+        view = TreeSnapshot.__new__(TreeSnapshot)
+        view.max_depth = max_depth
+        view.max_nodes = max_nodes
+        view.nodes = []
+        view._by_handle = {}
+        view._keys = None
+        for node in self.nodes[:count]:
+            copy = TreeNode(node.index, node.parent, node.depth, node.element, node.signature,
+                            node.rect, node.handle, node.type_index, node.kind_index)
+            copy.children = [child for child in node.children if child < count]
+            view.nodes.append(copy)
+            if copy.handle and copy.handle not in view._by_handle:
+                view._by_handle[copy.handle] = copy.index
+        # Recortado por nodos, o el origen se cortó antes de pasar de max_depth
+        view.truncated = count < within or (self.truncated and within == len(self.nodes))
+        view.id = self.id
+        view.hwnd = self.hwnd
+        view.created_at = self.created_at
+        view.build_ms = self.build_ms
+        return view
+
+    def release_elements(self) -> None:
+        """
+        Suelta los wrappers de los nodos (objetos COM del thread que recorrió)
+
+        Para snapshots que se retienen: consultas, rutas, diffs y
+        serialización solo usan firma, rectángulo y handle.
+        """
+        for node in self.nodes:
+            node.element = None
+
+    # ==================== CONSULTA ====================
+
+    def locate(self, element: Any) -> Optional[TreeNode]:
+        """
+        Busca el nodo de un elemento capturado fuera del snapshot
+
+        Compara por handle (controles con HWND propio) y si no, por
+        rectángulo + firma, eligiendo el nodo más profundo.
+        """
+        signature = element_signature(element)
+        handle = _element_handle(element)
+        if handle and handle in self._by_handle:
+            node = self.nodes[self._by_handle[handle]]
+            if node.signature == signature:
+                return node
+
+        rect = _element_rect(element)
+        if rect is None:
+            return None
+        best = None
+        for node in self.nodes:
+            if node.rect == rect and node.signature == signature:
+                if best is None or node.depth > best.depth:
+                    best = node
+        return best
+
+    def found_index(self, node: TreeNode) -> int:
+        """Índice entre hermanos del mismo control_type (0 si no tiene tipo)"""
+        if not node.signature.get(KEY_CONTROL_TYPE):
+            return 0
+        return node.type_index
+
+    def path(self, node: TreeNode) -> Optional[List[Dict[str, Any]]]:
+        """Ruta de segmentos desde la ventana hasta el nodo (formato de ui_path)"""
+        segments = []
+        current = node
+        while current.parent is not None:
+            segment = dict(current.signature)
+            segment[KEY_INDEX] = current.kind_index
+            segments.append(segment)
+            current = self.nodes[current.parent]
+        segments.reverse()
+        return segments or None
+
+    # ==================== RESOLUCIÓN DE SELECTORES ====================
+
+    def _preorder(self, start: int) -> List[TreeNode]:
+        """Descendientes de un nodo en profundidad (mismo orden que descendants())"""
+        result = []
+        stack = list(reversed(self.nodes[start].children))
+        while stack:
+            node = self.nodes[stack.pop()]
+            result.append(node)
+            stack.extend(reversed(node.children))
+        return result
+
+    def find(self, selector: Dict[str, Any]) -> Tuple[List[TreeNode], str]:
+        """
+        Resuelve un selector de DesktopEngine contra el snapshot
+
+        Replica el orden de find_element: primero hijos directos de la
+        ventana y después el resto de descendientes.
+
+        Args:
+            selector: Dict ya parseado (auto_id, title, control_type,
+                      class_name, found_index o path)
+
+        Returns:
+            Tupla (nodos que coinciden con los criterios, estrategia usada).
+            Para 'path' la lista tiene a lo sumo el nodo resuelto.
+        """
+        if selector.get('path'):
+            return self._find_path(selector['path'])
+
+        criteria = [(key, selector[key]) for key in ('auto_id', 'title', 'control_type', 'class_name')
+                    if selector.get(key)]
+        if not criteria:
+            return [], 'empty'
+        strategy = '+'.join(key for key, _ in criteria)
+
+        def matches(node: TreeNode) -> bool:
+            signature = node.signature
+            for key, value in criteria:
+                if key == 'auto_id' and signature.get(KEY_AUTO_ID) != value:
+                    return False
+                if key == 'title' and value not in (signature.get(KEY_NAME) or ''):
+                    return False
+                if key == 'control_type' and signature.get(KEY_CONTROL_TYPE) != value:
+                    return False
+                if key == 'class_name' and signature.get(KEY_CLASS_NAME) != value:
+                    return False
+            return True
+
+        direct = [self.nodes[i] for i in self.nodes[0].children if matches(self.nodes[i])]
+        seen = {node.index for node in direct}
+        deep = [node for node in self._preorder(0) if node.index not in seen and matches(node)]
+        return direct + deep, strategy
+
+    def _find_path(self, segments: List[Dict[str, Any]]) -> Tuple[List[TreeNode], str]:
+        """Resuelve un selector de ruta con la misma lógica que DesktopEngine._resolve_path"""
+        current = self.nodes[0]
+        strategy = 'path'
+        for segment in segments:
+            candidates = [(self.nodes[i], self.nodes[i].signature) for i in current.children]
+            child, exact = match_segment(candidates, segment)
+            if child is None:
+                target = segments[-1]
+                found = [node for node in self._preorder(current.index)
+                         if signature_matches(node.signature, target)]
+                if not found:
+                    return [], 'path_fallback'
+                return [found[min(target.get(KEY_INDEX, 0), len(found) - 1)]], 'path_fallback'
+            if not exact:
+                strategy = 'path_fuzzy'
+            current = child
+        return [current], strategy
+
+    # ==================== SERIALIZACIÓN ====================
+
+    def node_key(self, node: TreeNode) -> str:
+        """
+        Identidad estructural del nodo: tipo, clase e índice de cada nivel
+
+        No incluye el nombre (en controles de edición es el texto actual),
+        así un cambio de texto aparece como modificación y no como alta/baja.
+        """
+        if self._keys is None:
+            keys: List[str] = []
+            for current in self.nodes:
+                part = "{}.{}[{}]".format(current.signature.get(KEY_CONTROL_TYPE) or '',
+                                          current.signature.get(KEY_CLASS_NAME) or '',
+                                          current.kind_index)
+                keys.append(part if current.parent is None else keys[current.parent] + '/' + part)
+            self._keys = keys
+        return self._keys[node.index]
+
+    def node_row(self, node: TreeNode) -> List[Any]:
+        """Fila del nodo en el orden de COMPACT_FIELDS"""
+        signature = node.signature
+        return [node.parent, node.depth, signature.get(KEY_CONTROL_TYPE),
+                signature.get(KEY_CLASS_NAME), signature.get(KEY_NAME),
+                signature.get(KEY_AUTO_ID), node.kind_index,
+                list(node.rect) if node.rect else None, node.handle or None]
+
+    def to_compact(self) -> Dict[str, Any]:
+        """
+        Serializa el snapshot en formato compacto: nombres de columna una
+        sola vez en 'fields' y una fila (lista) por nodo en 'nodes'
+        """
+        return {
+            'id': self.id,
+            'hwnd': self.hwnd,
+            'created_at': round(self.created_at, 3),
+            'build_ms': self.build_ms,
+            'truncated': self.truncated,
+            'max_depth': self.max_depth,
+            'max_nodes': self.max_nodes,
+            'count': len(self.nodes),
+            'fields': list(COMPACT_FIELDS),
+            'nodes': [self.node_row(node) for node in self.nodes]
+        }
+
+
+def diff_snapshots(base: TreeSnapshot, target: TreeSnapshot) -> Dict[str, Any]:
+    """
+    Compara dos snapshots de la misma ventana
+
+    Los nodos se emparejan por su ruta estructural (node_key).
+
+    Returns:
+        Dict con 'added' y 'removed' (clave + fila compacta) y 'changed'
+        (clave + {campo: [antes, después]})
+    """
+    def index(snapshot: TreeSnapshot) -> Dict[str, TreeNode]:
+        return {snapshot.node_key(node): node for node in snapshot.nodes}
+
+    def fields(snapshot: TreeSnapshot, node: TreeNode) -> Dict[str, Any]:
+        row = dict(zip(COMPACT_FIELDS, snapshot.node_row(node)))
+        return {field: row[field] for field in DIFF_FIELDS}
+
+    old_nodes = index(base)
+    new_nodes = index(target)
+
+    added = [{'key': key, 'node': target.node_row(node)}
+             for key, node in new_nodes.items() if key not in old_nodes]
+    removed = [{'key': key, 'node': base.node_row(node)}
+               for key, node in old_nodes.items() if key not in new_nodes]
+
+    changed = []
+    for key, old_node in old_nodes.items():
+        new_node = new_nodes.get(key)
+        if new_node is None:
+            continue
+        before = fields(base, old_node)
+        after = fields(target, new_node)
+        changes = {field: [before[field], after[field]]
+                   for field in DIFF_FIELDS if before[field] != after[field]}
+        if changes:
+            changed.append({'key': key, 'changes': changes})
+
+    return {
+        'base': base.id,
+        'target': target.id,
+        'fields': list(COMPACT_FIELDS),
+        'added': added,
+        'removed': removed,
+        'changed': changed,
+        'truncated': base.truncated or target.truncated
+    }
+
+
+# ==================== CACHE ====================
+
+class TreeCache:
+    """
+    Snapshots recientes por handle de ventana
+
+    Un snapshot se reutiliza mientras tenga menos de `ttl` segundos y
+    sus límites cubran los pedidos (se entrega recortado a los límites
+    pedidos). Se conservan los últimos `history` snapshots de cada
+    ventana para poder compararlos, sin sus wrappers COM: los pedidos
+    llegan desde threads de Flask distintos al que recorrió.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL, history: int = DEFAULT_HISTORY,
+                 max_windows: int = MAX_CACHED_WINDOWS):
+        self.ttl = ttl
+        self.history = history
+        self.max_windows = max_windows
+        self._windows: 'OrderedDict[int, Deque[TreeSnapshot]]' = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, hwnd: int, root_factory: Callable[[], Any],
+            max_depth: int = DEFAULT_MAX_DEPTH, max_nodes: int = DEFAULT_MAX_NODES,
+            max_age: Optional[float] = None, refresh: bool = False) -> TreeSnapshot:
+        """
+        Retorna un snapshot vigente de la ventana o recorre una nueva
+
+        Args:
+            hwnd: Handle de la ventana top-level
+            root_factory: Función que retorna el wrapper de la ventana (solo si hay que recorrer)
+            max_depth: Profundidad requerida
+            max_nodes: Nodos requeridos
+            max_age: Antigüedad aceptada en segundos (por defecto self.ttl)
+            refresh: Ignorar el cache y recorrer de nuevo
+        """
+        max_age = self.ttl if max_age is None else max_age
+        with self._lock:
+            history = self._windows.get(hwnd)
+            if history and not refresh:
+                latest = history[-1]
+                covers = (latest.max_depth >= max_depth and
+                          (latest.max_nodes >= max_nodes or not latest.truncated))
+                if covers and time.time() - latest.created_at <= max_age:
+                    self._windows.move_to_end(hwnd)
+                    self.hits += 1
+                    return latest.limited(max_depth, max_nodes)
+            self.misses += 1
+
+        snapshot = TreeSnapshot(root_factory(), max_depth=max_depth, max_nodes=max_nodes)
+        snapshot.release_elements()
+
+        with self._lock:
+            history = self._windows.get(hwnd)
+            if history is None:
+                history = deque(maxlen=self.history)
+                self._windows[hwnd] = history
+            history.append(snapshot)
+            self._windows.move_to_end(hwnd)
+            while len(self._windows) > self.max_windows:
+                self._windows.popitem(last=False)
+        return snapshot
+
+    def find(self, snapshot_id: int) -> Optional[TreeSnapshot]:
+        """Busca un snapshot retenido por su id"""
+        with self._lock:
+            for history in self._windows.values():
+                for snapshot in history:
+                    if snapshot.id == snapshot_id:
+                        return snapshot
+        return None
+
+    def clear(self, hwnd: Optional[int] = None) -> None:
+        """Descarta los snapshots (de una ventana o todos)"""
+        with self._lock:
+            if hwnd is None:
+                self._windows.clear()
+            else:
+                self._windows.pop(hwnd, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Métricas del cache"""
+        with self._lock:
+            return {
+                'windows': len(self._windows),
+                'snapshots': sum(len(h) for h in self._windows.values()),
+                'hits': self.hits,
+                'misses': self.misses
+            }
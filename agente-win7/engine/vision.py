@@ -0,0 +1,401 @@
+"""
+Selectores por imagen - Template matching multi-escala
+Resuelve selectores "image:<ref_id>" buscando una imagen de referencia
+(recortada al capturar el elemento) dentro de una captura de la ventana
+
+Solo depende de numpy y Pillow: se puede medir en Linux con capturas grabadas
+(ver tools/vision_benchmark.py)
+"""
+
+import hashlib
+import io
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+# Carpeta por defecto de imágenes de referencia (agente-win7/selector_images/)
+DEFAULT_REFERENCE_DIR = Path(__file__).parent.parent / 'selector_images'
+
+# Medio lado del recorte alrededor del punto de click (px)
+REFERENCE_HALF_SIZE = 40
+
+# Escalas probadas (cambios de DPI / tamaño de fuente entre capturas)
+DEFAULT_SCALES = (1.0, 0.9, 1.1, 0.8, 1.25)
+
+# Score NCC mínimo para aceptar una coincidencia
+DEFAULT_THRESHOLD = 0.85
+
+# Margen alrededor de la última posición conocida para la búsqueda inicial (px)
+DEFAULT_SEARCH_MARGIN = 80
+
+# Tamaño mínimo del template en el nivel más grueso de la pirámide (px)
+MIN_PYRAMID_TEMPLATE = 12
+
+
+class VisionSelectorError(Exception):
+    """Excepción base para errores de selectores por imagen"""
+    pass
+
+
+class VisionMatch:
+    """Resultado de una búsqueda: punto de click en coordenadas de la captura"""
+
+    __slots__ = ('x', 'y', 'score', 'scale', 'left', 'top', 'width', 'height')
+
+    def __init__(self, x: int, y: int, score: float, scale: float,
+                 left: int, top: int, width: int, height: int):
+        self.x = x
+        self.y = y
+        self.score = score
+        self.scale = scale
+        self.left = left
+        self.top = top
+        self.width = width
+        self.height = height
+
+    def to_dict(self) -> Dict[str, Union[int, float]]:
+        return {
+            'x': self.x, 'y': self.y, 'score': round(self.score, 4), 'scale': self.scale,
+            'left': self.left, 'top': self.top, 'width': self.width, 'height': self.height
+        }
+
+
+# ==================== UTILIDADES DE IMAGEN ====================
+
+def to_gray_array(image: Image.Image) -> np.ndarray:
+    """Convierte una imagen PIL a escala de grises float32"""
+    return np.asarray(image.convert('L'), dtype=np.float32)
+
+
+def _downsample(array: np.ndarray) -> np.ndarray:
+    """Reduce a la mitad promediando bloques de 2x2"""
+    h, w = array.shape[0] // 2 * 2, array.shape[1] // 2 * 2
+    a = array[:h, :w]
+    return (a[0::2, 0::2] + a[1::2, 0::2] + a[0::2, 1::2] + a[1::2, 1::2]) * 0.25
+
+
+def _build_pyramid(array: np.ndarray, levels: int) -> List[np.ndarray]:
+    pyramid = [array]
+    for _ in range(levels):
+        pyramid.append(_downsample(pyramid[-1]))
+    return pyramid
+
+
+def _window_sums(array: np.ndarray, h: int, w: int) -> np.ndarray:
+    """Suma de cada ventana h x w (solo posiciones válidas) con imagen integral"""
+    integral = np.zeros((array.shape[0] + 1, array.shape[1] + 1), dtype=np.float64)
+    integral[1:, 1:] = array.cumsum(axis=0).cumsum(axis=1)
+    return integral[h:, w:] - integral[:-h, w:] - integral[h:, :-w] + integral[:-h, :-w]
+
+
+def match_ncc(image: np.ndarray, template: np.ndarray) -> np.ndarray:
+    """
+    Correlación cruzada normalizada (NCC) de `template` sobre `image`
+
+    El numerador se calcula con FFT y el denominador con imágenes integrales,
+    así el costo es O(N log N) en el tamaño de la imagen.
+
+    Returns:
+        Mapa de scores en [-1, 1] de tamaño (H - h + 1, W - w + 1)
+    """
+    H, W = image.shape
+    h, w = template.shape
+    if h > H or w > W:
+        return np.full((0, 0), -1.0, dtype=np.float32)
+
+    t = template.astype(np.float64) - float(template.mean())
+    t_norm = float(np.sqrt((t * t).sum()))
+    if t_norm == 0.0:
+        # Template uniforme: no hay información para correlacionar
+        return np.zeros((H - h + 1, W - w + 1), dtype=np.float32)
+
+    img = image.astype(np.float64)
+    spectrum = np.fft.rfft2(img) * np.conj(np.fft.rfft2(t, s=(H, W)))
+    numerator = np.fft.irfft2(spectrum, s=(H, W))[:H - h + 1, :W - w + 1]
+
+    n = float(h * w)
+    sums = _window_sums(img, h, w)
+    sums_sq = _window_sums(img * img, h, w)
+    variance = np.maximum(sums_sq - sums * sums / n, 0.0)
+    denominator = np.sqrt(variance) * t_norm
+
+    scores = np.zeros_like(numerator)
+    valid = denominator > 1e-6
+    scores[valid] = numerator[valid] / denominator[valid]
+    return scores.astype(np.float32)
+
+
+def _best(scores: np.ndarray) -> Tuple[int, int, float]:
+    if scores.size == 0:
+        return 0, 0, -1.0
+    idx = int(np.argmax(scores))
+    y, x = divmod(idx, scores.shape[1])
+    return x, y, float(scores[y, x])
+
+
+# ==================== REFERENCIAS ====================
+
+class ReferenceStore:
+    """
+    Almacén de imágenes de referencia en disco
+
+    Cada referencia es <ref_id>.png + <ref_id>.json con el offset del
+    punto de click dentro del recorte y datos de la ventana de origen.
+    """
+
+    def __init__(self, directory: Optional[Union[str, Path]] = None):
+        self.directory = Path(directory) if directory else DEFAULT_REFERENCE_DIR
+
+    def save(self, image: Image.Image, click_offset: Tuple[int, int],
+             meta: Optional[Dict] = None) -> str:
+        """
+        Guarda una imagen de referencia
+
+        Args:
+            image: Recorte alrededor del elemento
+            click_offset: (dx, dy) del punto de click dentro del recorte
+            meta: Datos adicionales (window_title, process_name, ...)
+
+        Returns:
+            ID de la referencia (hash del contenido)
+        """
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+        data = buffer.getvalue()
+        ref_id = hashlib.sha1(data).hexdigest()[:16]
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / f"{ref_id}.png").write_bytes(data)
+        info = dict(meta or {})
+        info['offset'] = [int(click_offset[0]), int(click_offset[1])]
+        info['size'] = [image.width, image.height]
+        (self.directory / f"{ref_id}.json").write_text(json.dumps(info), encoding='utf-8')
+
+        logger.info(f"Referencia de imagen guardada: {ref_id}")
+        return ref_id
+
+    def load(self, ref_id: str) -> Tuple[Image.Image, Dict]:
+        """
+        Carga una referencia
+
+        Raises:
+            VisionSelectorError: Si la referencia no existe
+        """
+        png_path = self.directory / f"{ref_id}.png"
+        if not png_path.exists():
+            raise VisionSelectorError(f"Imagen de referencia no encontrada: {ref_id}")
+
+        meta_path = self.directory / f"{ref_id}.json"
+        meta = {}
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text(encoding='utf-8'))
+
+        with Image.open(png_path) as image:
+            image.load()
+            return image.copy(), meta
+
+
+class _TemplatePyramid:
+    """Template precomputado: por escala, la pirámide de niveles y el offset de click"""
+
+    def __init__(self, image: Image.Image, offset: Tuple[int, int],
+                 scales: Tuple[float, ...], levels: int):
+        self.offset = offset
+        self.by_scale: Dict[float, List[np.ndarray]] = {}
+        for scale in scales:
+            width = max(1, int(round(image.width * scale)))
+            height = max(1, int(round(image.height * scale)))
+            scaled = image if scale == 1.0 else image.resize((width, height), Image.Resampling.BILINEAR)
+            base = to_gray_array(scaled)
+            # No bajar de MIN_PYRAMID_TEMPLATE px en el nivel más grueso
+            usable = 0
+            while (usable < levels and
+                   min(base.shape) // (2 ** (usable + 1)) >= MIN_PYRAMID_TEMPLATE):
+                usable += 1
+            self.by_scale[scale] = _build_pyramid(base, usable)
+
+
+class TemplateMatcher:
+    """
+    Resuelve referencias de imagen dentro de capturas de ventana
+
+    - Pirámides del template precomputadas y cacheadas por referencia
+    - Búsqueda gruesa en el nivel más bajo de la pirámide y refinamiento local
+    - Primer intento en una ventana alrededor de la última posición conocida
+    """
+
+    def __init__(self, store: Optional[ReferenceStore] = None,
+                 threshold: float = DEFAULT_THRESHOLD,
+                 scales: Tuple[float, ...] = DEFAULT_SCALES,
+                 pyramid_levels: int = 2,
+                 search_margin: int = DEFAULT_SEARCH_MARGIN):
+        """
+        Inicializa el matcher
+
+        Args:
+            store: Almacén de referencias (usa la carpeta por defecto si es None)
+            threshold: Score NCC mínimo para aceptar
+            scales: Escalas del template a probar
+            pyramid_levels: Niveles de reducción x2 para la búsqueda gruesa
+            search_margin: Margen (px) alrededor de la última posición conocida
+        """
+        self.store = store or ReferenceStore()
+        self.threshold = threshold
+        self.scales = scales
+        self.pyramid_levels = pyramid_levels
+        self.search_margin = search_margin
+        self._pyramids: Dict[str, _TemplatePyramid] = {}
+        self._last_positions: Dict[str, Tuple[int, int, float]] = {}
+
+    def _get_pyramid(self, ref_id: str) -> _TemplatePyramid:
+        pyramid = self._pyramids.get(ref_id)
+        if pyramid is None:
+            image, meta = self.store.load(ref_id)
+            offset = tuple(meta.get('offset', (image.width // 2, image.height // 2)))
+            pyramid = _TemplatePyramid(image, offset, self.scales, self.pyramid_levels)
+            self._pyramids[ref_id] = pyramid
+        return pyramid
+
+    def add_reference(self, ref_id: str, image: Image.Image,
+                      offset: Tuple[int, int]) -> None:
+        """Registra una referencia en memoria (sin disco), útil para benchmarks"""
+        self._pyramids[ref_id] = _TemplatePyramid(image, offset, self.scales, self.pyramid_levels)
+
+    def locate(self, ref_id: str, haystack: Union[Image.Image, np.ndarray]) -> Optional[VisionMatch]:
+        """
+        Busca la referencia en una captura
+
+        Args:
+            ref_id: ID de la referencia
+            haystack: Captura de la ventana (PIL o array en grises)
+
+        Returns:
+            VisionMatch con el punto de click en coordenadas de la captura,
+            o None si ningún candidato supera el umbral
+        """
+        pyramid = self._get_pyramid(ref_id)
+        if isinstance(haystack, np.ndarray):
+            # uint8 se desborda al promediar niveles de la pirámide
+            image = haystack.astype(np.float32, copy=False)
+        else:
+            image = to_gray_array(haystack)
+
+        # 1. Ventana alrededor de la última posición conocida
+        last = self._last_positions.get(ref_id)
+        if last is not None:
+            match = self._search_near(pyramid, image, last)
+            if match is not None and match.score >= self.threshold:
+                self._remember(ref_id, match)
+                return match
+
+        # 2. Búsqueda completa multi-escala
+        match = self._search_full(pyramid, image)
+        if match is not None and match.score >= self.threshold:
+            self._remember(ref_id, match)
+            return match
+
+        return None
+
+    def _remember(self, ref_id: str, match: VisionMatch) -> None:
+        self._last_positions[ref_id] = (match.left, match.top, match.scale)
+
+    def _search_near(self, pyramid: _TemplatePyramid, image: np.ndarray,
+                     last: Tuple[int, int, float]) -> Optional[VisionMatch]:
+        left, top, scale = last
+        levels = pyramid.by_scale.get(scale)
+        if levels is None:
+            return None
+        template = levels[0]
+        h, w = template.shape
+        x0 = max(0, left - self.search_margin)
+        y0 = max(0, top - self.search_margin)
+        x1 = min(image.shape[1], left + w + self.search_margin)
+        y1 = min(image.shape[0], top + h + self.search_margin)
+        region = image[y0:y1, x0:x1]
+        x, y, score = _best(match_ncc(region, template))
+        if score < -0.5:
+            return None
+        return self._make_match(pyramid, scale, x0 + x, y0 + y, score, w, h)
+
+    def _search_full(self, pyramid: _TemplatePyramid,
+                     image: np.ndarray) -> Optional[VisionMatch]:
+        image_pyramid = _build_pyramid(image, self.pyramid_levels)
+        best: Optional[VisionMatch] = None
+
+        for scale in self.scales:
+            levels = pyramid.by_scale[scale]
+            level = len(levels) - 1
+            template = levels[0]
+            h, w = template.shape
+            if h > image.shape[0] or w > image.shape[1]:
+                continue
+
+            # Búsqueda gruesa en el nivel más reducido
+            cx, cy, coarse_score = _best(match_ncc(image_pyramid[level], levels[level]))
+            if coarse_score < self.threshold * 0.6:
+                continue
+
+            # Refinamiento a resolución completa alrededor del candidato
+            factor = 2 ** level
+            pad = 2 * factor
+            x0 = max(0, cx * factor - pad)
+            y0 = max(0, cy * factor - pad)
+            x1 = min(image.shape[1], cx * factor + w + pad)
+            y1 = min(image.shape[0], cy * factor + h + pad)
+            x, y, score = _best(match_ncc(image[y0:y1, x0:x1], template))
+
+            if best is None or score > best.score:
+                best = self._make_match(pyramid, scale, x0 + x, y0 + y, score, w, h)
+                if score >= 0.98:
+                    break
+
+        return best
+
+    @staticmethod
+    def _make_match(pyramid: _TemplatePyramid, scale: float, left: int, top: int,
+                    score: float, w: int, h: int) -> VisionMatch:
+        dx, dy = pyramid.offset
+        return VisionMatch(
+            x=int(left + round(dx * scale)), y=int(top + round(dy * scale)),
+            score=score, scale=scale, left=int(left), top=int(top), width=w, height=h
+        )
+
+    def clear_cache(self) -> None:
+        """Descarta pirámides y posiciones recordadas"""
+        self._pyramids.clear()
+        self._last_positions.clear()
+
+
+def crop_reference(image: Image.Image, bbox: Tuple[int, int, int, int],
+                   x: int, y: int,
+                   half_size: int = REFERENCE_HALF_SIZE) -> Tuple[Image.Image, Tuple[int, int]]:
+    """
+    Recorta la referencia alrededor del punto de click
+
+    Args:
+        image: Captura del elemento (coordenadas de pantalla en `bbox`)
+        bbox: (left, top, right, bottom) de la captura en pantalla
+        x: Coordenada X del click en pantalla
+        y: Coordenada Y del click en pantalla
+        half_size: Medio lado del recorte
+
+    Returns:
+        Tupla (recorte, offset del click dentro del recorte)
+    """
+    left = max(bbox[0], x - half_size)
+    top = max(bbox[1], y - half_size)
+    right = min(bbox[0] + image.width, x + half_size)
+    bottom = min(bbox[1] + image.height, y + half_size)
+    if right <= left or bottom <= top:
+        raise VisionSelectorError("El punto de click está fuera de la captura")
+
+    crop = image.crop((left - bbox[0], top - bbox[1], right - bbox[0], bottom - bbox[1]))
+    return crop, (x - left, y - top)
+
@@ -0,0 +1,455 @@
+"""
+Pipeline de logging asíncrono para el agente
+Los handlers reales (consola, archivos) corren en un thread de escritura;
+los threads de ejecución y del picker solo encolan registros.
+
+Compatible con Windows 7 (Python 3.8)
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import re
+import sys
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+# ==================== CONFIGURACIÓN POR DEFECTO ====================
+
+# Tamaño máximo de cada archivo de log antes de rotar (bytes)
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 3
+
+# Registros pendientes en cola antes de descartar (protege memoria)
+DEFAULT_QUEUE_SIZE = 10000
+
+# Rate limit por punto de llamada: ráfaga y mensajes/segundo sostenidos
+DEFAULT_RATE_BURST = 20
+DEFAULT_RATE_PER_SECOND = 5.0
+
+# Ventana en la que un mensaje idéntico del mismo punto se considera duplicado
+DEFAULT_DUPLICATE_WINDOW = 10.0
+
+
+class _CallSiteState:
+    """Estado del rate limit y de duplicados para un punto de llamada"""
+
+    __slots__ = ('tokens', 'last_refill', 'last_message', 'last_emit',
+                 'suppressed')
+
+    def __init__(self, burst: float, now: float):
+        self.tokens = burst
+        self.last_refill = now
+        self.last_message: Optional[str] = None
+        self.last_emit = 0.0
+        self.suppressed = 0
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Filtro que suprime duplicados y limita la tasa por punto de llamada
+
+    Un punto de llamada es (archivo, línea). Un mensaje idéntico al último
+    emitido desde el mismo punto dentro de `duplicate_window` se descarta
+    (salvo desde `duplicate_level`, ERROR por defecto: los errores
+    repetidos siempre se registran). Además cada punto tiene un token
+    bucket (`burst`, `per_second`). Cuando vuelve a pasar un registro, se
+    anota cuántos se suprimieron.
+
+    El rate limit solo aplica a registros por debajo de `rate_limit_level`
+    (INFO por defecto, es decir, solo DEBUG): el log de ejecución a nivel
+    INFO sale de un único punto (`WorkflowExecutor._log`) y no debe
+    recortarse; solo se deduplica.
+    """
+
+    def __init__(self, burst: int = DEFAULT_RATE_BURST,
+                 per_second: float = DEFAULT_RATE_PER_SECOND,
+                 duplicate_window: float = DEFAULT_DUPLICATE_WINDOW,
+                 rate_limit_level: int = logging.INFO,
+                 duplicate_level: int = logging.ERROR):
+        super().__init__()
+        self.rate_limit_level = rate_limit_level
+        self.duplicate_level = duplicate_level
+        self.burst = float(burst)
+        self.per_second = float(per_second)
+        self.duplicate_window = duplicate_window
+        self._sites: Dict[Tuple[str, int], _CallSiteState] = {}
+        self._lock = threading.Lock()
+        self.total_suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        now = record.created
+        site = (record.pathname, record.lineno)
+
+        with self._lock:
+            state = self._sites.get(site)
+            if state is None:
+                state = _CallSiteState(self.burst, now)
+                self._sites[site] = state
+
+            # Token bucket (solo por debajo de rate_limit_level), antes de
+            # formatear: un registro recortado no paga msg % args
+            if record.levelno < self.rate_limit_level:
+                elapsed = now - state.last_refill
+                state.tokens = min(self.burst, state.tokens + elapsed * self.per_second)
+                state.last_refill = now
+                if state.tokens < 1.0:
+                    state.suppressed += 1
+                    self.total_suppressed += 1
+                    return False
+                state.tokens -= 1.0
+
+        try:
+            message = record.getMessage()
+        except Exception:
+            return True
+
+        with self._lock:
+            # Duplicado reciente del mismo punto (los errores no se deduplican)
+            if (record.levelno < self.duplicate_level and
+                    message == state.last_message and
+                    now - state.last_emit < self.duplicate_window):
+                state.suppressed += 1
+                self.total_suppressed += 1
+                return False
+
+            suppressed = state.suppressed
+            state.suppressed = 0
+            state.last_message = message
+            state.last_emit = now
+
+        # El mensaje ya resuelto se reutiliza en prepare() del handler
+        record.msg = message
+        record.args = None
+        if suppressed:
+            record.msg = "%s [%d mensajes suprimidos desde este punto]" % (message, suppressed)
+
+        return True
+
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler que no formatea en el thread que loguea
+
+    El QueueHandler estándar llama a format() en prepare(); aquí solo se
+    resuelve el mensaje (msg % args) para que el registro sea seguro de
+    pasar entre threads. El formato de fecha/nivel lo hace el listener.
+    Si la cola está llena, el registro se descarta y se cuenta.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args:
+            try:
+                record.msg = record.getMessage()
+                record.args = None
+            except Exception:
+                pass
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """
+    Pipeline de logging: handler de cola en el root logger + listener en background
+
+    Uso:
+        pipeline = LogPipeline.setup(output_file='agente_win7_output.txt',
+                                     technical_file='agente_win7.log')
+        ...
+        pipeline.stop()  # También se registra en atexit
+    """
+
+    def __init__(self, handlers: List[logging.Handler],
+                 queue_size: int = DEFAULT_QUEUE_SIZE,
+                 rate_filter: Optional[RateLimitFilter] = None):
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.handler = AsyncQueueHandler(self.queue)
+        self.rate_filter = rate_filter or RateLimitFilter()
+        self.handler.addFilter(self.rate_filter)
+        self.listener = logging.handlers.QueueListener(
+            self.queue, *handlers, respect_handler_level=True
+        )
+        self._started = False
+
+    @classmethod
+    def setup(cls, output_file: str, technical_file: str,
+              level: int = logging.DEBUG,
+              console_level: int = logging.INFO,
+              max_bytes: int = DEFAULT_MAX_BYTES,
+              backup_count: int = DEFAULT_BACKUP_COUNT,
+              header: Optional[str] = None) -> 'LogPipeline':
+        """
+        Configura el root logger con el pipeline asíncrono
+
+        Args:
+            output_file: Log legible (se reinicia en cada ejecución)
+            technical_file: Log técnico con nombre del logger (persistente, rota por tamaño)
+            level: Nivel del root logger
+            console_level: Nivel mínimo para consola
+            max_bytes: Tamaño máximo por archivo antes de rotar
+            backup_count: Cantidad de archivos rotados a conservar
+            header: Texto a escribir al inicio del log legible
+
+        Returns:
+            LogPipeline iniciado
+        """
+        # Log legible: se sobrescribe en cada ejecución
+        with open(output_file, 'w', encoding='utf-8') as f:
+            if header:
+                f.write(header)
+
+        file_handler = logging.handlers.RotatingFileHandler(
+            output_file, mode='a', maxBytes=max_bytes,
+            backupCount=backup_count, encoding='utf-8'
+        )
+        file_handler.setLevel(logging.DEBUG)
+        file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+
+        technical_handler = logging.handlers.RotatingFileHandler(
+            technical_file, mode='a', maxBytes=max_bytes,
+            backupCount=backup_count, encoding='utf-8'
+        )
+        technical_handler.setLevel(logging.DEBUG)
+        technical_handler.setFormatter(
+            logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        )
+
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setLevel(console_level)
+        console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+
+        pipeline = cls([console_handler, file_handler, technical_handler])
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(pipeline.handler)
+        root.setLevel(level)
+
+        pipeline.start()
+        atexit.register(pipeline.stop)
+        return pipeline
+
+    def start(self) -> None:
+        """Inicia el thread de escritura"""
+        if not self._started:
+            self.listener.start()
+            self._started = True
+
+    def stop(self) -> None:
+        """Vacía la cola y detiene el thread de escritura"""
+        if self._started:
+            self._started = False
+            try:
+                self.listener.stop()
+            except Exception:
+                pass
+            for handler in self.listener.handlers:
+                try:
+                    handler.flush()
+                    handler.close()
+                except Exception:
+                    pass
+
+    def get_stats(self) -> Dict[str, int]:
+        """Retorna métricas del pipeline (pendientes, descartados, suprimidos)"""
+        return {
+            'pending': self.queue.qsize(),
+            'dropped': self.handler.dropped,
+            'suppressed': self.rate_filter.total_suppressed
+        }
+
+
+# ==================== LECTURA DE LOGS (TAIL) ====================
+
+# Encabezado del formato técnico: "fecha hora,ms - logger - NIVEL - mensaje"
+_RECORD_HEADER = re.compile(
+    r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3} - (?P<name>.+?) - (?P<level>[A-Z]+) - '
+)
+
+TAIL_BLOCK_SIZE = 8192
+
+
+class _RecordFilter:
+    """Filtro de registros por nivel mínimo y prefijo de logger"""
+
+    def __init__(self, level: Optional[str] = None, logger_name: Optional[str] = None):
+        self.min_level = None
+        if level:
+            self.min_level = logging.getLevelName(level.upper())
+            if not isinstance(self.min_level, int):
+                raise ValueError(f"Nivel de log inválido: {level}")
+        self.logger_name = logger_name or None
+
+    @property
+    def active(self) -> bool:
+        return self.min_level is not None or self.logger_name is not None
+
+    def matches(self, header: str) -> bool:
+        match = _RECORD_HEADER.match(header)
+        if not match:
+            return False
+        if self.min_level is not None:
+            record_level = logging.getLevelName(match.group('level'))
+            if not isinstance(record_level, int) or record_level < self.min_level:
+                return False
+        if self.logger_name is not None:
+            name = match.group('name')
+            if name != self.logger_name and not name.startswith(self.logger_name + '.'):
+                return False
+        return True
+
+
+def _iter_lines_reverse(f, end: int, block_size: int = TAIL_BLOCK_SIZE) -> Iterator[bytes]:
+    """
+    Itera las líneas de un archivo binario desde `end` hacia atrás
+
+    Lee bloques de `block_size` bytes desde el final. El primer segmento
+    retornado es lo que sigue al último salto de línea (vacío o incompleto).
+    Se trabaja en bytes para no partir caracteres UTF-8 entre bloques.
+    """
+    position = end
+    remainder = b''
+    while position > 0:
+        read_size = min(block_size, position)
+        position -= read_size
+        f.seek(position)
+        chunk = f.read(read_size) + remainder
+        parts = chunk.split(b'\n')
+        # El primer segmento puede estar incompleto: se completa con el próximo bloque
+        remainder = parts[0]
+        for raw in reversed(parts[1:]):
+            yield raw
+    yield remainder
+
+
+def _decode_line(raw: bytes) -> str:
+    return raw.decode('utf-8', errors='replace').rstrip('\r')
+
+
+def tail_log(path: str, lines: int = 50, level: Optional[str] = None,
+             logger_name: Optional[str] = None) -> Tuple[List[str], int]:
+    """
+    Retorna las últimas `lines` líneas de un log leyendo desde el final
+
+    El costo depende de las líneas pedidas, no del tamaño del archivo.
+    Con filtros, las líneas de continuación (tracebacks) se agrupan con el
+    registro que las precede.
+
+    Args:
+        path: Ruta del archivo de log
+        lines: Cantidad máxima de líneas a retornar
+        level: Nivel mínimo (DEBUG, INFO, WARNING, ERROR, CRITICAL)
+        logger_name: Prefijo del nombre del logger (ej: 'engine.executor')
+
+    Returns:
+        Tupla (líneas en orden cronológico, cursor en bytes para `read_log_since`)
+    """
+    record_filter = _RecordFilter(level, logger_name)
+    collected: List[str] = []
+
+    with open(path, 'rb') as f:
+        f.seek(0, 2)
+        end = f.tell()
+        segments = _iter_lines_reverse(f, end)
+
+        # Lo posterior al último '\n' es una línea que todavía se está escribiendo
+        partial = next(segments)
+        cursor = end - len(partial)
+        if lines <= 0:
+            return [], cursor
+
+        pending: List[str] = []
+        for raw in segments:
+            line = _decode_line(raw)
+
+            if not record_filter.active:
+                collected.append(line)
+                if len(collected) >= lines:
+                    break
+                continue
+
+            if _RECORD_HEADER.match(line) is None:
+                pending.append(line)
+                continue
+
+            if record_filter.matches(line):
+                collected.extend(pending)
+                collected.append(line)
+                if len(collected) >= lines:
+                    break
+            pending = []
+
+    collected.reverse()
+    return collected[-lines:], cursor
+
+
+def read_log_since(path: str, since: int, lines: int = 500,
+                   level: Optional[str] = None,
+                   logger_name: Optional[str] = None) -> Tuple[List[str], int]:
+    """
+    Lee líneas escritas después del cursor `since` (offset en bytes)
+
+    Si el cursor es mayor que el archivo (el log rotó), se lee desde el inicio.
+    Solo se consumen líneas completas; el cursor retornado apunta justo
+    después de la última línea leída.
+
+    Args:
+        path: Ruta del archivo de log
+        since: Offset en bytes retornado por una llamada anterior
+        lines: Cantidad máxima de líneas a retornar
+        level: Nivel mínimo de los registros
+        logger_name: Prefijo del nombre del logger
+
+    Returns:
+        Tupla (líneas en orden cronológico, nuevo cursor)
+    """
+    record_filter = _RecordFilter(level, logger_name)
+    collected: List[str] = []
+
+    with open(path, 'rb') as f:
+        f.seek(0, 2)
+        end = f.tell()
+        if since < 0 or since > end:
+            since = 0
+        f.seek(since)
+        cursor = since
+        keep_record = not record_filter.active
+
+        while len(collected) < lines:
+            raw = f.readline()
+            if not raw or not raw.endswith(b'\n'):
+                break
+            cursor += len(raw)
+            line = _decode_line(raw[:-1])
+
+            if record_filter.active and _RECORD_HEADER.match(line) is not None:
+                keep_record = record_filter.matches(line)
+            if keep_record:
+                collected.append(line)
+
+    return collected, cursor
+
+
+def stream_log_response(log_lines: List[str], cursor: int) -> Iterator[str]:
+    """
+    Genera la respuesta JSON {"logs": [...], "next_since": N} por partes
+
+    Permite a Flask enviar la respuesta sin construir un único string grande.
+    """
+    yield '{"logs": ['
+    for i, line in enumerate(log_lines):
+        yield (',' if i else '') + json.dumps(line, ensure_ascii=False)
+    yield '], "next_since": %d}' % cursor
@@ -0,0 +1,53 @@
+"""
+Configuración común de pytest para el agente Windows 7
+Se ejecuta desde agente-win7/ con: python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+
+# El paquete engine está en agente-win7/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+class FakeDesktop:
+    """Motor desktop sin UI: registra lo escrito/pegado y responde read_text"""
+
+    def __init__(self):
+        self.typed: List[str] = []
+        self.pasted: List[List[List[str]]] = []
+        self.texts: Dict[str, str] = {}
+
+    def type_text(self, selector: Dict[str, Any], text: str) -> None:
+        self.typed.append(text)
+
+    def read_text(self, selector: Dict[str, Any]) -> str:
+        return self.texts.get(selector.get('auto_id'), '')
+
+    def paste_block(self, selector: Dict[str, Any], cells: List[List[str]], **kwargs: Any) -> Dict[str, Any]:
+        self.pasted.append(cells)
+        return {'checked': 0, 'mismatches': []}
+
+
+@pytest.fixture
+def desktop() -> FakeDesktop:
+    return FakeDesktop()
+
+
+@pytest.fixture
+def executor(desktop):
+    from engine.executor import WorkflowExecutor
+    return WorkflowExecutor(desktop_engine=desktop)
+
+
+@pytest.fixture
+def write_csv(tmp_path):
+    """Crea un CSV en tmp_path a partir de líneas de texto y retorna su ruta"""
+    def write(name: str, *lines: str) -> Path:
+        path = tmp_path / name
+        path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+        return path
+    return write
@@ -0,0 +1,102 @@
+import threading
+
+import pytest
+
+from engine import backend_probe
+from engine.backend_probe import BackendRegistry
+
+
+class FakeRegistry(BackendRegistry):
+    """Registro con probes simulados: latencias por backend y un evento para bloquear el probe"""
+
+    def __init__(self, store_path, results):
+        super().__init__(store_path=store_path)
+        self.results = results
+        self.release = threading.Event()
+        self.release.set()
+        self.started = threading.Event()
+        self.probed = []
+
+    def app_key(self, hwnd):
+        return f"app{hwnd}.exe|Ventana"
+
+    def _probe_backend(self, backend, hwnd):
+        self.started.set()
+        self.release.wait(5)
+        self.probed.append(backend)
+        return dict(self.results[backend])
+
+
+WIN32_OK = {'ok': True, 'latency_ms': 30.0, 'children': 4}
+UIA_FAST = {'ok': True, 'latency_ms': 10.0, 'children': 4}
+
+
+@pytest.fixture
+def make_registry(tmp_path):
+    def make(results):
+        return FakeRegistry(tmp_path / 'backend_cache.json', results)
+    return make
+
+
+def test_probe_picks_the_fastest_backend_and_persists(make_registry, monkeypatch, tmp_path):
+    monkeypatch.setattr(backend_probe, 'IS_WINDOWS_7', False)
+    registry = make_registry({'win32': WIN32_OK, 'uia': UIA_FAST})
+
+    assert registry.get_backend(1) == 'uia'
+    assert registry.get_backend(1) == 'uia'
+    assert registry.probed == ['win32', 'uia']
+    assert BackendRegistry(store_path=tmp_path / 'backend_cache.json').get_entries()[
+        'app1.exe|Ventana']['backend'] == 'uia'
+
+
+def test_windows_7_skips_uia_when_win32_sees_the_window(make_registry, monkeypatch):
+    monkeypatch.setattr(backend_probe, 'IS_WINDOWS_7', True)
+    registry = make_registry({'win32': WIN32_OK, 'uia': UIA_FAST})
+    assert registry.get_backend(1) == 'win32'
+    assert registry.probed == ['win32']
+
+    registry = make_registry({'win32': dict(WIN32_OK, children=0), 'uia': UIA_FAST})
+    assert registry.get_backend(2) == 'uia'
+
+
+def test_hover_does_not_wait_for_the_probe(make_registry, monkeypatch):
+    monkeypatch.setattr(backend_probe, 'IS_WINDOWS_7', False)
+    registry = make_registry({'win32': WIN32_OK, 'uia': UIA_FAST})
+    registry.release.clear()
+
+    assert registry.get_backend(1, wait=False) == registry.default_backend
+    assert registry.started.wait(5)
+    # El probe no retiene el lock del registro
+    assert registry._lock.acquire(timeout=1)
+    registry._lock.release()
+    assert registry.get_backend(1, wait=False) == registry.default_backend
+
+    registry.release.set()
+    assert registry.get_backend(1) == 'uia'
+    assert registry.probed == ['win32', 'uia']
+
+
+def test_concurrent_callers_share_one_probe(make_registry, monkeypatch):
+    monkeypatch.setattr(backend_probe, 'IS_WINDOWS_7', False)
+    registry = make_registry({'win32': WIN32_OK, 'uia': UIA_FAST})
+    registry.release.clear()
+    backends = []
+    threads = [threading.Thread(target=lambda: backends.append(registry.get_backend(1))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    registry.started.wait(5)
+    registry.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert backends == ['uia'] * 3
+    assert registry.probed == ['win32', 'uia']
+
+
+def test_failed_probe_falls_back_to_default(make_registry, monkeypatch):
+    monkeypatch.setattr(backend_probe, 'IS_WINDOWS_7', False)
+    failed = {'ok': False, 'latency_ms': 1.0, 'error': 'acceso denegado'}
+    registry = make_registry({'win32': failed, 'uia': failed})
+
+    assert registry.get_backend(1) == registry.default_backend
+    assert registry.get_backend(None) == registry.default_backend
@@ -0,0 +1,87 @@
+import logging
+
+from engine.execution_log import ExecutionLog
+
+
+def run_loop(log, rows, failing=()):
+    with log.loop(total=rows):
+        for index in range(1, rows + 1):
+            try:
+                with log.iteration(index):
+                    log.add(logging.INFO, "fila %d", (index,))
+                    if index in failing:
+                        raise ValueError(index)
+            except ValueError:
+                pass
+
+
+def rows_in(log):
+    return [event.row_index for event in log.events() if event.row_index is not None]
+
+
+def test_loop_keeps_head_tail_and_failed_iterations():
+    log = ExecutionLog(sample_head=2, sample_tail=2)
+    run_loop(log, 10, failing={5})
+
+    # La fila con error trae consigo las iteraciones pendientes previas (3 y 4)
+    assert rows_in(log) == [1, 2, 3, 4, 5, 9, 10]
+    messages = log.to_strings()
+    assert any('3 iteraciones sin errores omitidas del detalle (desde fila 6, 3 eventos)' in m for m in messages)
+    assert any('1 iteraciones con error' in m for m in messages)
+    assert log.get_stats()['omitted_iterations'] == 3
+
+
+def test_failed_iteration_flushes_pending_tail_in_order():
+    log = ExecutionLog(sample_head=0, sample_tail=3)
+    run_loop(log, 4, failing={4})
+
+    assert rows_in(log) == [1, 2, 3, 4]
+
+
+def test_no_tail_sampling_omits_everything_after_head():
+    log = ExecutionLog(sample_head=1, sample_tail=0)
+    run_loop(log, 5)
+
+    assert rows_in(log) == [1]
+    assert log.omitted_iterations == 4
+
+
+def test_buffer_is_bounded_and_counts_dropped_events():
+    log = ExecutionLog(max_events=3)
+    for index in range(5):
+        log.add(logging.INFO, "evento %d", (index,))
+
+    assert [event.format() for event in log.events()] == ['evento 2', 'evento 3', 'evento 4']
+    assert log.to_strings()[0] == '... 2 eventos anteriores descartados'
+
+
+def test_iteration_events_are_capped():
+    log = ExecutionLog(max_iteration_events=2)
+    with log.loop(total=1):
+        with log.iteration(1):
+            for index in range(5):
+                log.add(logging.INFO, "paso %d", (index,))
+
+    assert [event.format() for event in log.events()] == [
+        'paso 0', 'paso 1', '  ... 3 eventos de la iteración 1 omitidos']
+
+
+def test_events_are_formatted_lazily():
+    log = ExecutionLog()
+    log.add(logging.WARNING, "%s de %d", ('uno',), node_id='n1')
+
+    event = log.to_dicts()[0]
+    assert event['level'] == 'WARNING' and event['node_id'] == 'n1'
+    assert event['message'] == "%s de %d ('uno',)"
+
+
+def test_nested_loop_events_stay_inside_the_outer_iteration():
+    log = ExecutionLog(sample_head=0, sample_tail=0)
+    with log.loop(total=2):
+        for outer in (1, 2):
+            with log.iteration(outer):
+                run_loop(log, 2)
+
+    # Sin muestras, las dos iteraciones externas (con sus loops internos) se omiten
+    assert rows_in(log) == []
+    assert log.omitted_iterations == 2 + 2 * 2
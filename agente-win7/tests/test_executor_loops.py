@@ -0,0 +1,202 @@
+import csv
+
+import pytest
+
+from engine.executor import WorkflowExecutorError
+from engine.result_writer import ResultWriter, ResultWriterError
+from engine.row_ledger import RowLedger, RowLedgerError
+
+
+def action(node_id, action_type, **params):
+    return {'id': node_id, 'type': 'action', 'data': {'actionType': action_type, 'params': params}}
+
+
+def run_loop(executor, source, children, **options):
+    data = {'loopType': 'excel', 'source': str(source), 'childNodes': children, 'childEdges': []}
+    data.update(options)
+    executor._execute_loop_node(data)
+
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8-sig') as handle:
+        return list(csv.reader(handle))
+
+
+def test_paste_block_cells_use_block_rows_not_loop_row(executor, desktop, write_csv):
+    source = write_csv('datos.csv', 'nombre', 'Ana', 'Luis')
+    block = write_csv('bloque.csv', 'nombre', 'x', 'y')
+    children = [action('t', 'type', selector='auto_id:txtNombre', text='{{fila.nombre}}'),
+                action('p', 'pasteBlock', selector='auto_id:grid', source=str(block),
+                       columns=['{{fila.nombre}}'])]
+
+    for pipelined in (False, True):
+        desktop.typed.clear()
+        desktop.pasted.clear()
+        run_loop(executor, source, children, pipelined=pipelined)
+
+        assert desktop.typed == ['Ana', 'Luis']
+        assert desktop.pasted == [[['x'], ['y']], [['x'], ['y']]]
+
+
+def test_row_templates_skip_paste_block_columns(executor):
+    templates = set()
+    executor._collect_row_templates(
+        [action('p', 'pasteBlock', columns=['{{fila.nombre}}'], startRow='{{fila.desde}}')], templates)
+
+    assert templates == {'{{fila.desde}}'}
+
+
+def test_where_order_by_and_paging_run_on_the_frame(executor, desktop, write_csv):
+    source = write_csv('datos.csv', 'nombre,estado,monto',
+                       'Ana,Pendiente,50', 'Luis,Pagado,500', 'Eva,Pendiente,300',
+                       'Juan,Pendiente,120', 'Rosa,Pendiente,90')
+    children = [action('t', 'type', selector='auto_id:txtNombre', text='{{fila.nombre}}')]
+    executor.variables['minimo'] = 80
+
+    run_loop(executor, source, children,
+             where="'{{fila.estado}}' == 'Pendiente' and {{fila.monto}} > {{minimo}}",
+             orderBy='monto desc', offset=1, limit=2)
+
+    assert desktop.typed == ['Juan', 'Rosa']
+
+
+def test_invalid_where_fails_before_any_row(executor, desktop, write_csv):
+    source = write_csv('datos.csv', 'nombre', 'Ana')
+    children = [action('t', 'type', selector='auto_id:txtNombre', text='{{fila.nombre}}')]
+
+    with pytest.raises(WorkflowExecutorError):
+        run_loop(executor, source, children, where='{{fila.falta}} >')
+
+    assert desktop.typed == []
+
+
+def test_lookup_matches_float_loop_keys(executor, desktop, write_csv, tmp_path):
+    # Un vacío en 'codigo' hace que pandas lo lea como float: {{fila.codigo}} = '1203.0'
+    source = write_csv('datos.csv', 'codigo,fila', '1203,1', ',2', '7,3')
+    clients = write_csv('clientes.csv', 'codigo,nombre', '1203,Ana', '7,Luis')
+    children = [action('l', 'lookup', source=str(clients), key='codigo', value='{{fila.codigo}}'),
+                action('t', 'type', selector='auto_id:txtNombre', text='{{lookup.nombre}}')]
+
+    run_loop(executor, source, children)
+
+    assert desktop.typed == ['Ana', '{{lookup.nombre}}', 'Luis']
+
+
+def test_list_output_columns_resolve_against_file_columns(executor, desktop, write_csv, tmp_path):
+    source = write_csv('datos.csv', 'dni,nombre', '1,Ana', '2,Luis')
+    output = tmp_path / 'salida.csv'
+    desktop.texts['estado'] = 'registrado'
+
+    # 'texto' no existe antes del loop: lo crea el readText de cada fila
+    run_loop(executor, source, [action('r', 'readText', selector='auto_id:estado', variableName='texto')],
+             output={'file': str(output), 'columns': ['dni', 'texto']})
+
+    assert read_csv(output) == [['dni', 'texto', 'status', 'error'],
+                                ['1', 'registrado', 'ok', ''],
+                                ['2', 'registrado', 'ok', '']]
+
+
+def test_output_close_failure_does_not_hide_the_loop_error(executor, desktop, write_csv, tmp_path,
+                                                          monkeypatch):
+    source = write_csv('datos.csv', 'dni', '1')
+
+    def failing_close(writer):
+        raise ResultWriterError('disco lleno')
+
+    def failing_type(selector, text):
+        raise RuntimeError('ventana cerrada')
+
+    monkeypatch.setattr(ResultWriter, 'close', failing_close)
+    monkeypatch.setattr(desktop, 'type_text', failing_type)
+    children = [action('t', 'type', selector='auto_id:txtDni', text='{{fila.dni}}')]
+
+    with pytest.raises(Exception, match='ventana cerrada'):
+        run_loop(executor, source, children, output={'file': str(tmp_path / 'salida.csv')})
+
+    monkeypatch.setattr(desktop, 'type_text', lambda selector, text: None)
+    with pytest.raises(WorkflowExecutorError, match='disco lleno'):
+        run_loop(executor, source, children, output={'file': str(tmp_path / 'salida.csv')})
+
+
+def test_reject_file_header_comes_from_the_first_file(executor, write_csv, tmp_path):
+    write_csv('a.csv', 'dni,nombre', ',Ana', '2,Luis')
+    write_csv('b.csv', 'dni,nombre,zona', ',Eva,Norte')
+    rejects = tmp_path / 'rechazos.csv'
+
+    run_loop(executor, tmp_path / '?.csv', [], validate={'dni': {'required': True}},
+             rejectFile=str(rejects))
+
+    assert read_csv(rejects) == [['fila', 'file', 'dni', 'nombre', 'motivo'],
+                                 ['2', 'a.csv', '', 'Ana', 'dni: vacío'],
+                                 ['2', 'b.csv', '', 'Eva', 'dni: vacío']]
+    assert any('zona' in line for line in executor.get_logs())
+
+
+def test_glob_sources_run_in_order_and_skip_unreadable_files(executor, desktop, write_csv, tmp_path):
+    write_csv('ventas_2.csv', 'nombre', 'Luis')
+    write_csv('ventas_1.csv', 'nombre', 'Ana')
+    (tmp_path / 'ventas_3.csv').write_bytes(b'nombre\n\xff\xfe\n')
+    output = tmp_path / 'salida.csv'
+    children = [action('t', 'type', selector='auto_id:txtNombre', text='{{fila.nombre}}')]
+
+    run_loop(executor, tmp_path / 'ventas_*.csv', children, continueOnError=True, prefetch=1,
+             output={'file': str(output), 'columns': ['nombre']})
+
+    assert desktop.typed == ['Ana', 'Luis']
+    rows = read_csv(output)
+    assert rows[0] == ['nombre', 'file', 'status', 'error']
+    assert rows[1:3] == [['Ana', 'ventas_1.csv', 'ok', ''], ['Luis', 'ventas_2.csv', 'ok', '']]
+    assert rows[3][1:3] == ['ventas_3.csv', 'error']
+
+
+def test_resolve_sources_expands_patterns_once(executor, write_csv, tmp_path):
+    first = write_csv('a.csv', 'x')
+    second = write_csv('b.csv', 'x')
+
+    paths = executor._resolve_sources([str(second), str(tmp_path / '*.csv')])
+
+    assert paths == [second, first]
+
+
+def test_invalid_rows_abort_the_loop_before_any_action(executor, desktop, write_csv):
+    source = write_csv('datos.csv', 'dni', '12345678', '1234')
+    children = [action('t', 'type', selector='auto_id:txtDni', text='{{fila.dni}}')]
+
+    with pytest.raises(WorkflowExecutorError, match='Validación'):
+        run_loop(executor, source, children, validate={'dni': {'regex': r'\d{8}'}})
+
+    assert desktop.typed == []
+
+
+def test_ledger_skips_processed_rows_before_limit(executor, desktop, write_csv, tmp_path):
+    source = write_csv('datos.csv', 'id', '1', '2', '3', '4', '5')
+    ledger = {'key': '{{fila.id}}', 'file': str(tmp_path / 'procesados.sqlite')}
+    children = [action('t', 'type', selector='auto_id:txtId', text='{{fila.id}}')]
+
+    batches = []
+    for _ in range(4):
+        desktop.typed.clear()
+        run_loop(executor, source, children, limit=2, ledger=ledger)
+        batches.append(list(desktop.typed))
+
+    assert batches == [['1', '2'], ['3', '4'], ['5'], []]
+
+
+def test_ledger_failure_stops_the_loop_after_writing_the_row(executor, desktop, write_csv, tmp_path,
+                                                             monkeypatch):
+    source = write_csv('datos.csv', 'id', '1', '2')
+    output = tmp_path / 'salida.csv'
+
+    def failing_record(ledger, key):
+        raise RowLedgerError('base bloqueada')
+
+    monkeypatch.setattr(RowLedger, 'record', failing_record)
+    children = [action('t', 'type', selector='auto_id:txtId', text='{{fila.id}}')]
+
+    with pytest.raises(WorkflowExecutorError, match='base bloqueada'):
+        run_loop(executor, source, children, continueOnError=True,
+                 ledger={'key': '{{fila.id}}', 'file': str(tmp_path / 'procesados.sqlite')},
+                 output={'file': str(output), 'columns': ['id']})
+
+    assert desktop.typed == ['1']
+    assert read_csv(output) == [['id', 'status', 'error'], ['1', 'ok', '']]
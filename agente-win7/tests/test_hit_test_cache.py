@@ -0,0 +1,86 @@
+import pytest
+
+from engine.hit_test_cache import HitTestCache
+
+
+class FakeUser32:
+    """user32 simulado: ventana en primer plano y raíz de cada handle"""
+
+    def __init__(self):
+        self.foreground = 100
+
+    def GetForegroundWindow(self):
+        return self.foreground
+
+    def GetAncestor(self, hwnd, flag):
+        return 100
+
+
+class FakeElement:
+    def __init__(self, handle=0, children=0):
+        self.handle = handle
+        self._children = [object()] * children
+
+    def children(self):
+        return self._children
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = HitTestCache(max_entries=3)
+    cache._user32 = FakeUser32()
+    windows = {'root_rect': (0, 0, 500, 400), 'at_point': 100}
+    monkeypatch.setattr(cache, '_window_rect', lambda hwnd: windows['root_rect'])
+    monkeypatch.setattr(cache, '_window_at', lambda x, y: windows['at_point'])
+    cache.windows = windows
+    # El hover siempre consulta antes de guardar: fija la ventana en primer plano
+    assert cache.lookup(0, 0) is None
+    return cache
+
+
+def test_leaf_is_served_from_cache(cache):
+    button = FakeElement()
+    cache.store(15, 15, button, (10, 10, 50, 30))
+
+    assert cache.lookup(20, 20).element is button
+    assert cache.lookup(60, 60) is None
+    assert cache.get_stats()['hits'] == 1 and cache.get_stats()['misses'] == 2
+
+
+def test_container_never_hides_unresolved_children(cache):
+    cache.store(5, 5, FakeElement(children=3), (0, 0, 200, 200))
+    assert cache.lookup(50, 50) is None
+
+    edit = FakeElement()
+    cache.store(50, 50, edit, (40, 40, 80, 60))
+    assert cache.lookup(50, 50).element is edit
+
+
+def test_entry_with_own_window_requires_window_from_point(cache):
+    cache.store(20, 20, FakeElement(handle=555), (10, 10, 50, 30))
+    cache.windows['at_point'] = 777
+    assert cache.lookup(20, 20) is None
+
+    cache.windows['at_point'] = 555
+    assert cache.lookup(20, 20) is not None
+
+
+def test_moved_root_window_or_new_foreground_invalidates(cache):
+    cache.store(20, 20, FakeElement(), (10, 10, 50, 30))
+    cache.windows['root_rect'] = (5, 5, 505, 405)
+    assert cache.lookup(20, 20) is None
+    assert cache.get_stats()['entries'] == 0
+
+    cache.store(20, 20, FakeElement(), (10, 10, 50, 30))
+    cache._user32.foreground = 200
+    assert cache.lookup(20, 20) is None
+    assert cache.get_stats()['entries'] == 0
+
+
+def test_lru_keeps_recent_entries(cache):
+    for left in (0, 100, 200, 300):
+        cache.store(left + 1, 1, FakeElement(), (left, 0, left + 50, 50))
+
+    assert cache.get_stats()['entries'] == 3
+    assert cache.lookup(1, 1) is None
+    assert cache.lookup(301, 1) is not None
@@ -0,0 +1,128 @@
+import logging
+
+import pytest
+
+from log_pipeline import RateLimitFilter, read_log_since, tail_log
+
+
+def make_record(message, level=logging.INFO, lineno=10, created=0.0, args=None):
+    record = logging.LogRecord('engine.prueba', level, 'modulo.py', lineno, message, args, None)
+    record.created = created
+    return record
+
+
+def test_duplicates_from_the_same_site_are_dropped_inside_the_window():
+    rate_filter = RateLimitFilter(duplicate_window=10.0)
+
+    assert rate_filter.filter(make_record('fila %d', args=(1,), created=0.0))
+    assert not rate_filter.filter(make_record('fila %d', args=(1,), created=5.0))
+    assert rate_filter.filter(make_record('fila %d', args=(1,), created=11.0))
+
+
+def test_same_message_from_another_site_is_kept():
+    rate_filter = RateLimitFilter()
+
+    assert rate_filter.filter(make_record('hola', lineno=1))
+    assert rate_filter.filter(make_record('hola', lineno=2))
+
+
+def test_errors_are_never_deduplicated():
+    rate_filter = RateLimitFilter()
+
+    for second in range(3):
+        assert rate_filter.filter(make_record('falló', level=logging.ERROR, created=float(second)))
+
+
+def test_rate_limit_only_applies_below_info():
+    rate_filter = RateLimitFilter(burst=2, per_second=1.0)
+
+    debug = [rate_filter.filter(make_record('d %d', logging.DEBUG, args=(i,))) for i in range(4)]
+    info = [rate_filter.filter(make_record('i %d', logging.INFO, lineno=20, args=(i,))) for i in range(4)]
+
+    assert debug == [True, True, False, False]
+    assert info == [True] * 4
+    assert rate_filter.total_suppressed == 2
+
+
+def test_rate_limited_record_is_not_formatted():
+    class Exploding:
+        def __str__(self):
+            raise AssertionError("no debe formatearse")
+
+    rate_filter = RateLimitFilter(burst=1, per_second=0.0)
+    assert rate_filter.filter(make_record('%s', logging.DEBUG, args=('ok',)))
+    assert not rate_filter.filter(make_record('%s', logging.DEBUG, args=(Exploding(),)))
+
+
+def test_next_emitted_record_reports_suppressed_count():
+    rate_filter = RateLimitFilter(duplicate_window=10.0)
+    rate_filter.filter(make_record('igual', created=0.0))
+    rate_filter.filter(make_record('igual', created=1.0))
+    rate_filter.filter(make_record('igual', created=2.0))
+
+    record = make_record('distinto', created=3.0)
+    assert rate_filter.filter(record)
+    assert record.getMessage() == 'distinto [2 mensajes suprimidos desde este punto]'
+
+
+def log_line(second, name, level, message):
+    return f"2026-01-01 10:00:{second:02d},000 - {name} - {level} - {message}"
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    path = tmp_path / 'agente.log'
+    lines = [
+        log_line(1, 'engine.executor', 'INFO', 'inicio'),
+        log_line(2, 'engine.desktop', 'DEBUG', 'buscando'),
+        log_line(3, 'engine.executor', 'ERROR', 'falló'),
+        'Traceback (most recent call last):',
+        '  ValueError: x',
+        log_line(4, 'engine.executor.loop', 'INFO', 'fin'),
+    ]
+    path.write_bytes(('\n'.join(lines) + '\n').encode('utf-8'))
+    return path
+
+
+def test_tail_returns_last_lines_and_end_cursor(log_file):
+    lines, cursor = tail_log(str(log_file), lines=2)
+
+    assert lines == ['  ValueError: x', log_line(4, 'engine.executor.loop', 'INFO', 'fin')]
+    assert cursor == log_file.stat().st_size
+
+
+def test_tail_filters_keep_tracebacks_with_their_record(log_file):
+    lines, _ = tail_log(str(log_file), lines=10, level='WARNING')
+    assert lines == [log_line(3, 'engine.executor', 'ERROR', 'falló'),
+                     'Traceback (most recent call last):', '  ValueError: x']
+
+    lines, _ = tail_log(str(log_file), lines=10, logger_name='engine.executor')
+    assert len(lines) == 5
+
+
+def test_tail_reads_across_small_blocks(log_file, monkeypatch):
+    import log_pipeline
+    monkeypatch.setattr(log_pipeline, 'TAIL_BLOCK_SIZE', 7)
+    assert tail_log(str(log_file), lines=6)[0] == log_file.read_text(encoding='utf-8').splitlines()
+
+
+def test_read_since_returns_only_new_complete_lines(log_file):
+    _, cursor = tail_log(str(log_file), lines=1)
+    with open(log_file, 'ab') as handle:
+        handle.write(log_line(5, 'engine.executor', 'INFO', 'nuevo').encode('utf-8') + b'\nincomple')
+
+    lines, next_cursor = read_log_since(str(log_file), cursor)
+
+    assert lines == [log_line(5, 'engine.executor', 'INFO', 'nuevo')]
+    assert next_cursor == log_file.stat().st_size - len(b'incomple')
+    assert read_log_since(str(log_file), next_cursor) == ([], next_cursor)
+
+
+def test_read_since_restarts_after_rotation(log_file):
+    lines, _ = read_log_since(str(log_file), 10 ** 9, lines=1)
+    assert lines == [log_line(1, 'engine.executor', 'INFO', 'inicio')]
+
+
+def test_invalid_level_is_rejected(log_file):
+    with pytest.raises(ValueError):
+        tail_log(str(log_file), level='RUIDO')
@@ -0,0 +1,60 @@
+import csv
+
+import pytest
+
+from engine.result_writer import ResultWriter, ResultWriterError
+
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8-sig') as handle:
+        return list(csv.reader(handle))
+
+
+def test_csv_is_published_on_close(tmp_path):
+    path = tmp_path / 'salida.csv'
+    writer = ResultWriter(str(path), ['ruc', 'status'], flush_rows=1)
+    writer.write({'ruc': '20123', 'status': 'ok', 'extra': 'ignorado'})
+
+    assert not path.exists()
+    assert read_csv(writer.partial_path) == [['ruc', 'status'], ['20123', 'ok']]
+
+    writer.close()
+    assert read_csv(path) == [['ruc', 'status'], ['20123', 'ok']]
+    assert not writer.partial_path.exists()
+    assert writer.rows_written == 1
+
+
+def test_header_from_first_record(tmp_path):
+    path = tmp_path / 'salida.tsv'
+    with ResultWriter(str(path)) as writer:
+        writer.write_many([{'a': 1, 'b': None}, {'a': 2}])
+
+    assert path.read_text(encoding='utf-8-sig').splitlines() == ['a\tb', '1\t', '2\t']
+
+
+def test_empty_output_keeps_header(tmp_path):
+    path = tmp_path / 'vacio.csv'
+    ResultWriter(str(path), ['ruc']).close()
+    assert read_csv(path) == [['ruc']]
+
+
+def test_xlsx_output(tmp_path):
+    openpyxl = pytest.importorskip('openpyxl')
+    path = tmp_path / 'salida.xlsx'
+    with ResultWriter(str(path), ['ruc', 'status'], sheet_name='Hoja') as writer:
+        writer.write({'ruc': '20123', 'status': 'ok'})
+
+    sheet = openpyxl.load_workbook(path)['Hoja']
+    assert [list(row) for row in sheet.iter_rows(values_only=True)] == [['ruc', 'status'], ['20123', 'ok']]
+
+
+def test_unsupported_format(tmp_path):
+    with pytest.raises(ResultWriterError):
+        ResultWriter(str(tmp_path / 'salida.json'))
+
+
+def test_write_after_close(tmp_path):
+    writer = ResultWriter(str(tmp_path / 'salida.csv'), ['a'])
+    writer.close()
+    with pytest.raises(ResultWriterError):
+        writer.write({'a': 1})
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine.row_ledger import RowLedger, RowLedgerError, render_keys
+
+
+def test_render_keys_normalizes_columns():
+    frame = pd.DataFrame({'dni': [12345678.0, 87654321.0, np.nan], 'rdl': ['A ', 'B', 'C']})
+    keys = render_keys(frame, '{{fila.dni}}-{{fila.rdl}}')
+
+    assert keys.tolist() == ['12345678-A', '87654321-B', None]
+
+
+@pytest.mark.parametrize('template', ['sin columnas', '{{fila.falta}}', '{{variable}}'])
+def test_render_keys_rejects_bad_templates(template):
+    with pytest.raises(RowLedgerError):
+        render_keys(pd.DataFrame({'dni': ['1']}), template)
+
+
+def test_ledger_persists_between_runs(tmp_path):
+    path = tmp_path / 'procesados.sqlite'
+    with RowLedger(str(path), 'Afiliaciones') as ledger:
+        ledger.record('1')
+        ledger.record('1')
+        ledger.record('2')
+        assert ledger.recorded == 2
+
+    with RowLedger(str(path), 'Afiliaciones') as ledger:
+        assert '1' in ledger and '2' in ledger
+        assert len(ledger) == 2
+
+    with RowLedger(str(path), 'Otro workflow') as ledger:
+        assert len(ledger) == 0
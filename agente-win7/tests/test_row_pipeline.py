@@ -0,0 +1,71 @@
+import threading
+
+import pytest
+
+from engine.row_pipeline import FilePrefetcher, RowPipeline, _BackgroundProducer
+
+
+def test_background_producer_requires_produce():
+    with pytest.raises(TypeError):
+        _BackgroundProducer(1, 'sin-productor')
+
+
+def test_rows_arrive_in_order_with_rendered_values():
+    rows = [{'n': i} for i in range(100)]
+
+    with RowPipeline(rows, lambda row: {'{{fila.n}}': str(row['n'])}, depth=4) as pipeline:
+        prepared = list(pipeline)
+
+    assert [item.index for item in prepared] == list(range(1, 101))
+    assert [item.rendered['{{fila.n}}'] for item in prepared] == [str(i) for i in range(100)]
+    assert prepared[0].row is rows[0]
+
+
+def test_prepare_error_is_raised_at_its_row():
+    def prepare(row):
+        if row['n'] == 2:
+            raise ValueError('fila inválida')
+        return {}
+
+    seen = []
+    with RowPipeline([{'n': 1}, {'n': 2}, {'n': 3}], prepare) as pipeline:
+        with pytest.raises(ValueError, match='fila inválida'):
+            for item in pipeline:
+                seen.append(item.index)
+
+    assert seen == [1]
+
+
+def test_leaving_early_stops_the_producer():
+    prepared = []
+
+    def prepare(row):
+        prepared.append(row)
+        return {}
+
+    with RowPipeline([{}] * 1000, prepare, depth=2) as pipeline:
+        next(iter(pipeline))
+        thread = pipeline._thread
+
+    thread.join(timeout=2)
+    assert not thread.is_alive()
+    assert len(prepared) < 10
+
+
+def test_file_prefetcher_reports_failed_files_and_continues(tmp_path):
+    paths = [tmp_path / 'a.csv', tmp_path / 'b.csv', tmp_path / 'c.csv']
+    threads = set()
+
+    def load(path):
+        threads.add(threading.current_thread().name)
+        if path.endswith('b.csv'):
+            raise IOError('bloqueado')
+        return path.upper()
+
+    with FilePrefetcher(paths, load) as prefetcher:
+        results = list(prefetcher)
+
+    assert [(path, data) for path, data, _ in results] == [
+        (paths[0], str(paths[0]).upper()), (paths[1], None), (paths[2], str(paths[2]).upper())]
+    assert isinstance(results[1][2], IOError)
+    assert threads == {'file-prefetch'}
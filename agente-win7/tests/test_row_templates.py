@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from engine.row_templates import (column_text, is_row_template, key_text, render_columns,
+                                  render_row_template)
+
+
+def test_is_row_template_requires_only_row_placeholders():
+    assert is_row_template('{{fila.ruc}}-{{fila.rdl}}')
+    assert not is_row_template('{{fila.ruc}} {{texto}}')
+    assert not is_row_template('sin variables')
+
+
+def test_render_columns_matches_row_by_row_render():
+    frame = pd.DataFrame({'ruc': [20123, 20456], 'monto': [1.5, np.nan], 'nombre': ['Ana', None]})
+    templates = ['{{fila.ruc}}: {{fila.nombre}}', 'M={{fila.monto}}', '{{fila.falta}}']
+
+    rendered = render_columns(frame, templates)
+
+    for position, record in enumerate(frame.to_dict('records')):
+        for template in templates:
+            assert rendered[template][position] == render_row_template(template, record)
+
+
+def test_render_columns_skips_duplicated_columns():
+    frame = pd.DataFrame([[1, 2]], columns=['a', 'a'])
+    assert render_columns(frame, ['{{fila.a}}']) is None
+
+
+def test_column_text_is_what_templates_type():
+    values = pd.Series([12345678.0, np.nan])
+    assert column_text(values).tolist() == ['12345678.0', 'nan']
+
+
+def test_key_text_drops_integer_decimals_and_blanks():
+    values = pd.Series([12345678.0, np.nan, 5.0])
+    assert key_text(values).tolist() == ['12345678', '', '5']
+    assert key_text(pd.Series([' A ', None])).tolist() == ['A', '']
+    assert key_text(pd.Series([1.5, 2.0])).tolist() == ['1.5', '2.0']
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine.row_validation import RowValidationError, validate_frame
+
+
+def test_valid_frame_has_no_invalid_rows():
+    frame = pd.DataFrame({'dni': ['12345678', '87654321'], 'cuenta': [1, 5]})
+    report = validate_frame(frame, {'dni': {'required': True, 'regex': r'\d{8}'},
+                                    'cuenta': {'min': 1, 'max': 5}})
+
+    assert report.ok
+    assert report.valid.tolist() == [True, True]
+
+
+def test_reasons_and_file_row_numbers():
+    frame = pd.DataFrame({'dni': ['12345678', '', '1234', '12345678'],
+                          'fecha': ['01/02/2020', '31/02/2020', None, '15/03/2021']})
+    report = validate_frame(frame, {'dni': {'required': True, 'regex': r'\d{8}', 'unique': True},
+                                    'fecha': {'dateFormat': '%d/%m/%Y'}})
+
+    assert [(row.row_number, row.reasons) for row in report.invalid] == [
+        (3, ['dni: vacío', 'fecha: fecha inválida (formato %d/%m/%Y)']),
+        (4, [r'dni: no coincide con \d{8}']),
+        (5, ['dni: duplicado']),
+    ]
+    assert report.valid.tolist() == [True, False, False, False]
+
+
+def test_rules_check_the_typed_text():
+    # Columna de enteros con un vacío: se lee como float y {{fila.dni}} escribe '12345678.0'
+    frame = pd.DataFrame({'dni': [12345678.0, np.nan]})
+    report = validate_frame(frame, {'dni': {'regex': r'\d{8}'}})
+
+    assert [row.reasons for row in report.invalid] == [[r'dni: no coincide con \d{8}']]
+
+
+def test_blank_values_only_fail_required():
+    frame = pd.DataFrame({'codigo': ['  ', None, 'X1']})
+    report = validate_frame(frame, {'codigo': {'regex': r'X\d', 'unique': True}})
+    assert report.ok
+
+    report = validate_frame(frame, {'codigo': {'required': True}})
+    assert [row.position for row in report.invalid] == [0, 1]
+
+
+def test_numeric_range():
+    frame = pd.DataFrame({'monto': ['10', 'abc', '0', '99']})
+    report = validate_frame(frame, {'monto': {'min': 1, 'max': 50}})
+
+    assert report.counts == {'monto: no numérico': 1, 'monto: menor que 1': 1, 'monto: mayor que 50': 1}
+
+
+def test_row_numbers_follow_the_original_index():
+    frame = pd.DataFrame({'dni': ['1', 'x']}, index=[10, 20])
+    report = validate_frame(frame, {'dni': {'regex': r'\d'}})
+    assert report.invalid[0].row_number == 22
+
+
+@pytest.mark.parametrize('rules', [
+    {'falta': {'required': True}},
+    {'dni': {'obligatorio': True}},
+    {'dni': {'regex': '('}},
+    {'dni': {'min': 'uno'}},
+    ['dni'],
+])
+def test_invalid_rules_raise(rules):
+    with pytest.raises(RowValidationError):
+        validate_frame(pd.DataFrame({'dni': ['1']}), rules)
@@ -0,0 +1,103 @@
+import json
+
+import pytest
+
+from engine.selector_stats import SelectorStats, selector_kind
+
+
+AUTO_ID = {'auto_id': 'txtRuc'}
+TITLE = {'title': 'RUC', 'control_type': 'Edit'}
+IMAGE = {'image': '3f2a9c'}
+
+
+@pytest.fixture
+def stats(tmp_path):
+    return SelectorStats(store_path=tmp_path / 'selector_stats.json')
+
+
+def record_many(stats, selector, latencies, success=True, app='app'):
+    for latency in latencies:
+        stats.record(app, selector, latency, success)
+
+
+def test_selector_kind_names_strategies():
+    assert selector_kind({'path': [{'ct': 'Pane'}], 'auto_id': 'x'}) == 'path'
+    assert selector_kind(TITLE) == 'title+control_type'
+    assert selector_kind({}) == 'empty'
+
+
+def test_rank_keeps_declared_order_without_history(stats):
+    assert stats.rank('app', [IMAGE, AUTO_ID, TITLE]) == [IMAGE, AUTO_ID, TITLE]
+
+
+def test_rank_moves_failing_and_slow_strategies_last(stats):
+    record_many(stats, AUTO_ID, [10, 10, 10], success=False)
+    record_many(stats, IMAGE, [400, 400, 400])
+    record_many(stats, TITLE, [50, 60, 70])
+
+    assert stats.rank('app', [AUTO_ID, IMAGE, TITLE]) == [TITLE, IMAGE, AUTO_ID]
+    # El historial es por aplicación
+    assert stats.rank('otra', [AUTO_ID, IMAGE, TITLE]) == [AUTO_ID, IMAGE, TITLE]
+
+
+def test_rank_uses_strategy_history_for_new_selectors(stats):
+    record_many(stats, {'title': 'Guardar', 'control_type': 'Button'}, [20, 20, 20])
+    record_many(stats, {'auto_id': 'btnGuardar'}, [20, 20, 20], success=False)
+
+    new_auto_id = {'auto_id': 'btnSalir'}
+    new_title = {'title': 'Salir', 'control_type': 'Button'}
+    assert stats.rank('app', [new_auto_id, new_title]) == [new_title, new_auto_id]
+
+
+def test_history_round_trips_through_disk(stats, tmp_path):
+    record_many(stats, AUTO_ID, [12.34, 20])
+    stats.flush()
+
+    reloaded = SelectorStats(store_path=tmp_path / 'selector_stats.json')
+
+    assert reloaded.samples('app', AUTO_ID) == [12.3, 20.0]
+    assert reloaded.get_entries('app')['app']['auto_id']['attempts'] == 2
+    reloaded.forget('app')
+    assert json.loads((tmp_path / 'selector_stats.json').read_text(encoding='utf-8')) == {}
+
+
+def test_parse_selector_turns_picker_alternatives_into_strategies(executor):
+    parsed = executor._parse_selector(['auto_id:txtRuc', 'name:RUC|control_type:Edit', 'image:3f2a9c'])
+
+    assert parsed == {'strategies': [AUTO_ID, TITLE, IMAGE]}
+    assert executor._parse_selector(['auto_id:txtRuc']) == AUTO_ID
+
+
+def test_timeout_for_needs_samples_and_resets_after_a_failure(stats):
+    record_many(stats, AUTO_ID, [100] * 9)
+    assert stats.timeout_for('app', AUTO_ID, maximum=30) is None
+
+    record_many(stats, AUTO_ID, [300])
+    assert stats.timeout_for('app', AUTO_ID, maximum=30) == 2.0
+
+    record_many(stats, AUTO_ID, [4000] * 10)
+    assert stats.timeout_for('app', AUTO_ID, maximum=30) == 12.0
+    assert stats.timeout_for('app', AUTO_ID, maximum=5) == 5
+
+    record_many(stats, AUTO_ID, [0], success=False)
+    assert stats.timeout_for('app', AUTO_ID, maximum=30) is None
+
+
+def test_timeout_for_keeps_enabled_phase_separate(stats):
+    for _ in range(10):
+        stats.record('app', AUTO_ID, 1500, True, phase='enabled')
+
+    assert stats.timeout_for('app', AUTO_ID, maximum=30) is None
+    assert stats.timeout_for('app', AUTO_ID, maximum=30, phase='enabled') == 4.5
+
+
+def test_execute_works_with_engines_without_selector_stats(executor, desktop):
+    workflow = {'name': 'sin historial', 'edges': [],
+                'nodes': [{'id': 'n1', 'type': 'action',
+                           'data': {'actionType': 'type',
+                                    'params': {'selector': 'auto_id:txtRuc', 'text': '2010'}}}]}
+
+    result = executor.execute(workflow)
+
+    assert result['status'] == 'success'
+    assert desktop.typed == ['2010']
@@ -0,0 +1,121 @@
+import math
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+from engine.excel import ExcelEngine, ExcelEngineError
+from engine.table import ColumnIndex, Table, lookup_key
+
+
+def test_views_share_columns_and_keep_positions():
+    table = Table.from_frame(pd.DataFrame({'estado': ['ok', 'pendiente', 'pendiente'],
+                                           'ruc': ['1', '2', '3']}))
+    pending = table.filter('estado', 'pendiente')
+
+    assert len(pending) == 2
+    assert pending.column('ruc') == ['2', '3']
+    assert pending[1:].to_records() == [{'estado': 'pendiente', 'ruc': '3'}]
+    assert table.select(['ruc'])[0].to_dict() == {'ruc': '1'}
+    with pytest.raises(KeyError):
+        table.select(['no_existe'])
+
+
+def test_from_records_fills_missing_keys():
+    table = Table.from_records([{'a': 1}, {'b': 2}])
+
+    assert table.columns == ['a', 'b']
+    assert table.to_records() == [{'a': 1, 'b': None}, {'a': None, 'b': 2}]
+    assert Table.coerce(table) is table
+
+
+def test_rows_are_read_only_mappings():
+    table = Table.from_columns({'a': [1, 2], 'b': ['x', 'y']})
+    row = table[-1]
+
+    assert dict(row) == {'a': 2, 'b': 'y'}
+    assert row.get('falta', 'defecto') == 'defecto'
+    assert 'a' in row and 'falta' not in row
+    with pytest.raises(IndexError):
+        table[2]
+
+
+def test_to_frame_keeps_visible_rows_and_columns():
+    table = Table.from_columns({'a': [1, 2, 3], 'b': [4, 5, 6]})
+    frame = table.where([True, False, True]).select(['b']).to_frame()
+
+    assert frame.to_dict('list') == {'b': [4, 6]}
+
+
+def test_cursor_reuses_a_single_view():
+    table = Table.from_columns({'a': [1, 2, 3]})
+    values = [row['a'] for row in table.where([True, False, True]).cursor()]
+    views = list(table.cursor())
+
+    assert values == [1, 3]
+    assert views[0] is views[-1]
+    assert [row['a'] for row in table] == [1, 2, 3]
+
+
+def test_column_index_interns_names_and_projects_slots():
+    index = ColumnIndex([''.join(['ru', 'c']), 'monto', 3])
+    projected = index.project(['monto', 3])
+
+    assert index.names[0] is sys.intern('ruc')
+    assert projected.names == ('monto', 3)
+    assert projected.slots == {'monto': 1, 3: 2}
+    assert 'ruc' not in projected and len(projected) == 2
+
+
+@pytest.mark.parametrize('value, expected', [
+    (1203, '1203'),
+    (1203.0, '1203'),
+    ('1203', '1203'),
+    ('1203.0', '1203'),
+    (' 1203.00 ', '1203'),
+    ('-5.0', '-5'),
+    (1203.5, '1203.5'),
+    ('1203.5', '1203.5'),
+    ('00120.0', '00120'),
+    ('ABC ', 'ABC'),
+])
+def test_lookup_key_normalizes_integers_and_text(value, expected):
+    assert lookup_key(value) == expected
+
+
+@pytest.mark.parametrize('value', [None, math.nan, '', '   '])
+def test_lookup_key_empty_values_have_no_key(value):
+    assert lookup_key(value) is None
+
+
+def test_index_by_matches_float_and_text_keys():
+    table = Table.from_columns({'codigo': [1203.0, 7.0, None], 'nombre': ['a', 'b', 'c']})
+    index = table.index_by('codigo')
+
+    assert index == {'1203': 0, '7': 1}
+    assert table.row_at(index[lookup_key('1203.0')])['nombre'] == 'a'
+
+
+def test_index_by_keeps_first_occurrence():
+    table = Table.from_columns({'codigo': ['1', '1.0', '2'], 'nombre': ['a', 'b', 'c']})
+    assert table.index_by('codigo') == {'1': 0, '2': 2}
+
+
+def test_lookup_index_reuses_table_until_the_file_changes(write_csv):
+    path = write_csv('clientes.csv', 'codigo,nombre', '1203,Ana')
+    excel = ExcelEngine()
+
+    table, index = excel.lookup_index(str(path), 'codigo')
+    again, same_index = excel.lookup_index(str(path), 'codigo')
+    assert again is table and same_index is index
+
+    write_csv('clientes.csv', 'codigo,nombre', '1203,Ana', '7,Luis')
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    changed, index = excel.lookup_index(str(path), 'codigo')
+    assert changed is not table
+    assert index == {'1203': 0, '7': 1}
+
+    with pytest.raises(ExcelEngineError):
+        excel.lookup_index(str(path), 'falta')
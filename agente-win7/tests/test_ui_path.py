@@ -0,0 +1,79 @@
+import pytest
+
+from engine.ui_path import decode_path, encode_path, match_segment, signature_matches
+
+
+BUTTON = {'ct': 'Button', 'cls': 'Button'}
+
+
+def child(name=None, aid=None, ct='Button', cls='Button'):
+    signature = {'ct': ct, 'cls': cls}
+    if name:
+        signature['name'] = name
+    if aid:
+        signature['aid'] = aid
+    return signature
+
+
+def test_match_segment_prefers_auto_id_over_position():
+    candidates = [('a', child('Aceptar', 'ok')), ('b', child('Cancelar', 'cancel'))]
+
+    element, exact = match_segment(candidates, dict(BUTTON, aid='cancel', idx=0))
+
+    assert element == 'b'
+    assert exact is False
+
+
+def test_match_segment_is_exact_when_everything_matches():
+    candidates = [('edit', child(ct='Edit', cls='Edit')), ('a', child('Aceptar')), ('b', child('Cancelar'))]
+
+    assert match_segment(candidates, dict(BUTTON, name='Cancelar', idx=1)) == ('b', True)
+
+
+def test_match_segment_breaks_ties_by_distance_to_original_index():
+    candidates = [('a', child('x')), ('b', child('x')), ('c', child('x'))]
+
+    element, exact = match_segment(candidates, dict(BUTTON, name='x', idx=5))
+
+    assert element == 'c'
+    assert exact is False
+
+
+def test_match_segment_rejects_children_without_points():
+    candidates = [('a', child('Aceptar')), ('b', child('Cancelar'))]
+
+    assert match_segment(candidates, dict(BUTTON, name='Otro', idx=7)) == (None, False)
+    assert match_segment([('e', child(ct='Edit', cls='Edit'))], BUTTON) == (None, False)
+
+
+def test_path_round_trip():
+    segments = [{'ct': 'Pane', 'idx': 0}, dict(BUTTON, name='Añadir', idx=2)]
+
+    selector = encode_path(segments)
+
+    assert selector.startswith('path:[')
+    assert 'Añadir' in selector
+    assert decode_path(selector) == segments
+
+
+@pytest.mark.parametrize('selector', ['path:{"ct":"Button"}', 'path:["Button"]',
+                                      'path:[{"ct":"Pane"},3]', 'path:[{"ct"'])
+def test_decode_path_rejects_invalid_paths(selector):
+    with pytest.raises(ValueError):
+        decode_path(selector)
+
+
+def test_signature_matches_uses_auto_id_then_name():
+    assert signature_matches(child('otro', 'ok'), dict(BUTTON, aid='ok', name='Aceptar'))
+    assert not signature_matches(child('Aceptar', 'x'), dict(BUTTON, aid='ok', name='Aceptar'))
+    assert signature_matches(child('Aceptar'), dict(BUTTON, name='Aceptar'))
+    assert signature_matches(child('Cualquiera'), BUTTON)
+    assert not signature_matches(child(ct='Edit', cls='Edit'), BUTTON)
+
+
+def test_parse_selector_decodes_frontend_path_string(executor):
+    parsed = executor._parse_selector({'path': '[{"ct":"Button","name":"Aceptar"}]'})
+
+    assert parsed == {'path': [{'ct': 'Button', 'name': 'Aceptar'}]}
+    assert executor._parse_selector({'path': '["Button"]'}) == {}
+    assert executor._parse_selector({'auto_id': 'ok'}) == {'auto_id': 'ok'}
@@ -0,0 +1,117 @@
+from types import SimpleNamespace
+
+import pytest
+
+from engine import ui_tree
+from engine.ui_tree import TreeCache, TreeSnapshot, diff_snapshots
+
+
+class FakeElement:
+    """Wrapper mínimo con element_info y children(), como los de pywinauto"""
+
+    def __init__(self, control_type, name='', auto_id='', rect=(0, 0, 10, 10), handle=0,
+                 children=()):
+        left, top, right, bottom = rect
+        self.element_info = SimpleNamespace(
+            control_type=control_type, class_name=control_type, name=name,
+            automation_id=auto_id, handle=handle,
+            rectangle=SimpleNamespace(left=left, top=top, right=right, bottom=bottom))
+        self._children = list(children)
+        self.children_calls = 0
+
+    def children(self):
+        self.children_calls += 1
+        return self._children
+
+
+def window(ok_name='Aceptar', edit_text='', extra=False):
+    buttons = [FakeElement('Button', ok_name, 'ok', rect=(10, 10, 50, 30)),
+               FakeElement('Button', 'Cancelar', 'cancel', rect=(60, 10, 100, 30))]
+    if extra:
+        buttons.append(FakeElement('Button', 'Ayuda', 'help', rect=(110, 10, 150, 30)))
+    pane = FakeElement('Pane', children=[FakeElement('Edit', edit_text, 'ruc')] + buttons)
+    return FakeElement('Window', 'Factura', handle=100, children=[pane])
+
+
+def test_snapshot_indexes_siblings_by_type_and_builds_paths():
+    snapshot = TreeSnapshot(window())
+
+    cancel = next(node for node in snapshot.nodes if node.signature.get('aid') == 'cancel')
+    assert len(snapshot.nodes) == 5
+    assert snapshot.found_index(cancel) == 1
+    assert snapshot.path(cancel) == [{'ct': 'Pane', 'cls': 'Pane', 'idx': 0},
+                                     {'ct': 'Button', 'cls': 'Button', 'name': 'Cancelar',
+                                      'aid': 'cancel', 'idx': 1}]
+    assert snapshot.find({'path': snapshot.path(cancel)}) == ([cancel], 'path')
+    nodes, strategy = snapshot.find({'control_type': 'Button'})
+    assert [node.signature['aid'] for node in nodes] == ['ok', 'cancel']
+    assert strategy == 'control_type'
+
+
+def test_snapshot_truncates_at_max_nodes():
+    snapshot = TreeSnapshot(window(), max_nodes=3)
+
+    assert snapshot.truncated
+    assert len(snapshot.nodes) == 3
+    # Hasta profundidad 1 el recorrido está completo; con 2 nodos no
+    assert not snapshot.limited(1, 10).truncated
+    assert snapshot.limited(2, 2).truncated
+
+
+def test_diff_reports_changes_additions_and_removals():
+    base = TreeSnapshot(window())
+    target = TreeSnapshot(window(ok_name='Guardar', edit_text='2010', extra=True))
+
+    diff = diff_snapshots(base, target)
+
+    assert diff['base'] == base.id and diff['target'] == target.id
+    assert [entry['key'] for entry in diff['added']] == ['Window.Window[0]/Pane.Pane[0]/Button.Button[2]']
+    assert diff['removed'] == []
+    changes = {entry['key'].rsplit('/', 1)[-1]: entry['changes'] for entry in diff['changed']}
+    assert changes == {'Edit.Edit[0]': {'name': [None, '2010']},
+                       'Button.Button[0]': {'name': ['Aceptar', 'Guardar']}}
+
+    reverse = diff_snapshots(target, base)
+    assert [entry['key'] for entry in reverse['removed']] == [diff['added'][0]['key']]
+
+
+def test_cache_reuses_fresh_snapshots_without_wrappers():
+    cache = TreeCache(ttl=60)
+    root = window()
+
+    first = cache.get(100, lambda: root)
+    second = cache.get(100, lambda: pytest.fail('no debe recorrer de nuevo'))
+
+    assert second is first
+    assert all(node.element is None for node in first.nodes)
+    assert cache.find(first.id) is first
+    assert cache.get_stats() == {'windows': 1, 'snapshots': 1, 'hits': 1, 'misses': 1}
+
+
+def test_cache_serves_smaller_limits_and_walks_again_for_larger(monkeypatch):
+    cache = TreeCache(ttl=60)
+    first = cache.get(100, window, max_depth=2)
+
+    shallow = cache.get(100, window, max_depth=1)
+    assert shallow.id == first.id
+    assert len(shallow.nodes) == 2
+
+    deeper = cache.get(100, window, max_depth=5)
+    assert deeper.id != first.id
+    assert cache.get_stats()['snapshots'] == 2
+
+    now = ui_tree.time.time()
+    monkeypatch.setattr(ui_tree.time, 'time', lambda: now + 61)
+    assert cache.get(100, window, max_depth=5).id != deeper.id
+
+
+def test_cache_keeps_limited_history_and_windows():
+    cache = TreeCache(history=2, max_windows=2)
+    for _ in range(3):
+        cache.get(1, window, refresh=True)
+    cache.get(2, window)
+    cache.get(3, window)
+
+    assert cache.get_stats()['windows'] == 2
+    cache.clear(3)
+    assert cache.get_stats() == {'windows': 1, 'snapshots': 1, 'hits': 0, 'misses': 5}
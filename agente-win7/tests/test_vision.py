@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from engine.vision import (ReferenceStore, TemplateMatcher, VisionSelectorError, crop_reference,
+                           match_ncc)
+
+
+def synthetic_screen(seed):
+    """Captura sintética en grises: ruido suavizado (tiene textura a toda escala)"""
+    noise = np.random.default_rng(seed).integers(0, 255, (60, 80)).astype(np.uint8)
+    return np.asarray(Image.fromarray(noise).resize((320, 240), Image.BILINEAR))
+
+
+@pytest.fixture
+def screen():
+    return synthetic_screen(7)
+
+
+def test_match_ncc_peaks_at_the_template_position(screen):
+    template = screen[100:140, 50:110].astype(np.float32)
+    scores = match_ncc(screen.astype(np.float32), template)
+
+    assert scores.shape == (240 - 40 + 1, 320 - 60 + 1)
+    assert np.unravel_index(np.argmax(scores), scores.shape) == (100, 50)
+    assert scores.max() == pytest.approx(1.0, abs=1e-4)
+
+
+def test_match_ncc_handles_flat_and_oversized_templates(screen):
+    image = screen.astype(np.float32)
+    assert not match_ncc(image, np.full((10, 10), 5.0, dtype=np.float32)).any()
+    assert match_ncc(image[:5, :5], image[:10, :10]).size == 0
+
+
+def test_locate_returns_click_point_and_remembers_position(screen):
+    matcher = TemplateMatcher(store=ReferenceStore('/nonexistent'))
+    matcher.add_reference('ref', Image.fromarray(screen[60:110, 150:230]), (10, 20))
+
+    match = matcher.locate('ref', screen)
+    assert (match.left, match.top, match.x, match.y, match.scale) == (150, 60, 160, 80, 1.0)
+
+    # Elemento desplazado: lo encuentra la búsqueda cercana a la última posición
+    moved = np.roll(screen, shift=(6, -9), axis=(0, 1))
+    match = matcher.locate('ref', moved)
+    assert (match.left, match.top) == (141, 66)
+
+
+@pytest.mark.parametrize('scale', [0.8, 0.9, 1.1, 1.25])
+def test_locate_finds_a_scaled_reference(screen, scale):
+    reference = Image.fromarray(screen[60:120, 100:200])
+    scaled = reference.resize((round(100 * scale), round(60 * scale)), Image.BILINEAR)
+    canvas = Image.fromarray(synthetic_screen(3))
+    canvas.paste(scaled, (180, 150))
+
+    matcher = TemplateMatcher(store=ReferenceStore('/nonexistent'))
+    matcher.add_reference('ref', reference, (50, 30))
+    match = matcher.locate('ref', canvas)
+
+    assert match.scale == scale
+    assert (match.left, match.top) == (180, 150)
+    assert (match.x, match.y) == (180 + round(50 * scale), 150 + round(30 * scale))
+
+
+def test_locate_returns_none_below_threshold(screen):
+    other = np.random.default_rng(1).integers(0, 255, (40, 40)).astype(np.uint8)
+    matcher = TemplateMatcher(store=ReferenceStore('/nonexistent'))
+    matcher.add_reference('ref', Image.fromarray(other), (20, 20))
+
+    assert matcher.locate('ref', screen) is None
+
+
+def test_reference_store_round_trip(tmp_path, screen):
+    store = ReferenceStore(tmp_path)
+    ref_id = store.save(Image.fromarray(screen[:30, :30]), (4, 5), {'window_title': 'SUNAT'})
+
+    image, meta = store.load(ref_id)
+    assert image.size == (30, 30)
+    assert meta == {'window_title': 'SUNAT', 'offset': [4, 5], 'size': [30, 30]}
+    with pytest.raises(VisionSelectorError):
+        store.load('no_existe')
+
+
+def test_crop_reference_is_clamped_to_the_capture():
+    capture = Image.new('L', (100, 50))
+    crop, offset = crop_reference(capture, (200, 300, 300, 350), 205, 310, half_size=20)
+
+    assert crop.size == (25, 30)
+    assert offset == (5, 10)
+    with pytest.raises(VisionSelectorError):
+        crop_reference(capture, (200, 300, 300, 350), 10, 10)
@@ -0,0 +1,65 @@
+"""
+Benchmark de selectores por imagen
+Mide latencia y score de TemplateMatcher.locate sobre capturas grabadas:
+    python tools/vision_benchmark.py --template ref.png --offset 20,12 capturas/*.png
+
+engine/vision.py se carga por ruta: solo depende de numpy y Pillow, así que
+corre también fuera de Windows (engine/__init__ importa pywinauto)
+"""
+
+import argparse
+import importlib.util
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from PIL import Image
+
+VISION_PATH = Path(__file__).resolve().parent.parent / 'engine' / 'vision.py'
+
+
+def _load_vision():
+    spec = importlib.util.spec_from_file_location('vision', VISION_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    vision = _load_vision()
+
+    parser = argparse.ArgumentParser(description="Benchmark de selectores por imagen")
+    parser.add_argument('--template', required=True, help="Imagen de referencia (PNG)")
+    parser.add_argument('--offset', default=None, help="Offset del click 'dx,dy' (default: centro)")
+    parser.add_argument('--repeat', type=int, default=5, help="Repeticiones por captura")
+    parser.add_argument('--threshold', type=float, default=vision.DEFAULT_THRESHOLD)
+    parser.add_argument('screenshots', nargs='+', help="Capturas de ventana grabadas")
+    args = parser.parse_args(argv)
+
+    template = Image.open(args.template)
+    template.load()
+    if args.offset:
+        offset = tuple(int(v) for v in args.offset.split(','))
+    else:
+        offset = (template.width // 2, template.height // 2)
+
+    matcher = vision.TemplateMatcher(threshold=args.threshold)
+    matcher.add_reference('bench', template, offset)
+
+    for path in args.screenshots:
+        haystack = vision.to_gray_array(Image.open(path))
+        timings = []
+        match = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            match = matcher.locate('bench', haystack)
+            timings.append((time.perf_counter() - start) * 1000)
+        first, rest = timings[0], sorted(timings[1:]) or timings
+        found = match.to_dict() if match else None
+        print(f"{path}: cold={first:.1f}ms warm_p50={rest[len(rest) // 2]:.1f}ms match={found}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
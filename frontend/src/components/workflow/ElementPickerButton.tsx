@@ -5,8 +5,8 @@ import { Button } from '../ui/button';
 import { ElementPickerModal } from './ElementPickerModal';
 
 interface ElementPickerButtonProps {
-  /** Callback cuando se captura un elemento */
-  onElementSelected: (selector: string) => void;
+  /** Callback cuando se captura un elemento (con las estrategias alternativas del agente) */
+  onElementSelected: (selector: string, alternatives?: string[]) => void;
   /** Modo de captura: 'desktop' o 'web' */
   mode?: 'desktop' | 'web';
   /** Selector actual (se muestra en el modal) */
@@ -31,8 +31,8 @@ export function ElementPickerButton({
     setIsModalOpen(false);
   };
 
-  const handleElementCaptured = (selector: string) => {
-    onElementSelected(selector);
+  const handleElementCaptured = (selector: string, alternatives?: string[]) => {
+    onElementSelected(selector, alternatives);
     setIsModalOpen(false);
   };
 
@@ -18,7 +18,7 @@ const POLLING_INTERVAL = 500;
 interface ElementPickerModalProps {
   isOpen: boolean;
   onClose: () => void;
-  onElementCaptured: (selector: string) => void;
+  onElementCaptured: (selector: string, alternatives?: string[]) => void;
   mode?: 'desktop' | 'web';
   currentSelector?: string;
 }
@@ -149,7 +149,7 @@ export function ElementPickerModal({
   // Confirmar selección
   const handleConfirm = useCallback(() => {
     if (capturedResult?.selector) {
-      onElementCaptured(capturedResult.selector);
+      onElementCaptured(capturedResult.selector, capturedResult.alternatives);
       handleClose();
     }
   }, [capturedResult, onElementCaptured, handleClose]);
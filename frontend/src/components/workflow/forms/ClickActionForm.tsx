@@ -18,9 +18,10 @@ export function ClickActionForm({ config, onChange }: ClickActionFormProps) {
   const [waitAfter, setWaitAfter] = useState(config.waitAfter?.toString() || '0');
   const [continueOnError, setContinueOnError] = useState(config.continueOnError ?? false);
 
-  const handleSelectorChange = (newSelector: string) => {
+  // Las alternativas solo vienen del picker; editar el selector a mano las descarta
+  const handleSelectorChange = (newSelector: string, alternatives?: string[]) => {
     setSelector(newSelector);
-    onChange({ selector: newSelector });
+    onChange({ selector: newSelector, selectorAlternatives: alternatives });
   };
 
   const handleClickTypeChange = (newType: 'left' | 'right' | 'double') => {
@@ -16,9 +16,10 @@ export function ExtractActionForm({ config, onChange }: ExtractActionFormProps)
   const [variableName, setVariableName] = useState(config.variableName || '');
   const [trimSpaces, setTrimSpaces] = useState(config.trimSpaces ?? true);
 
-  const handleSelectorChange = (newSelector: string) => {
+  // Las alternativas solo vienen del picker; editar el selector a mano las descarta
+  const handleSelectorChange = (newSelector: string, alternatives?: string[]) => {
     setSelector(newSelector);
-    onChange({ selector: newSelector });
+    onChange({ selector: newSelector, selectorAlternatives: alternatives });
   };
 
   const handleVariableNameChange = (value: string) => {
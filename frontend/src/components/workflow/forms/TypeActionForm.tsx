@@ -28,9 +28,10 @@ export function TypeActionForm({
   const [humanLike, setHumanLike] = useState(config.humanLike ?? false);
   const [speed, setSpeed] = useState(config.speed || 'normal');
 
-  const handleSelectorChange = (newSelector: string) => {
+  // Las alternativas solo vienen del picker; editar el selector a mano las descarta
+  const handleSelectorChange = (newSelector: string, alternatives?: string[]) => {
     setSelector(newSelector);
-    onChange({ selector: newSelector });
+    onChange({ selector: newSelector, selectorAlternatives: alternatives });
   };
 
   const handleTextChange = (newText: string) => {
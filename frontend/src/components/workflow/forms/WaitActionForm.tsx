@@ -28,9 +28,10 @@ export function WaitActionForm({ config, onChange }: WaitActionFormProps) {
     onChange({ duration: num });
   };
 
-  const handleSelectorChange = (newSelector: string) => {
+  // Las alternativas solo vienen del picker; editar el selector a mano las descarta
+  const handleSelectorChange = (newSelector: string, alternatives?: string[]) => {
     setSelector(newSelector);
-    onChange({ selector: newSelector });
+    onChange({ selector: newSelector, selectorAlternatives: alternatives });
   };
 
   const handleTimeoutChange = (value: string) => {
@@ -90,12 +90,12 @@ function transformNode(node: Node, allNodes: Node[], allEdges: Edge[]): AgentNod
     const params: Record<string, unknown> = {};
     
     if (actionType === 'click') {
-      params.selector = parseSelector(config.selector as string);
+      params.selector = selectorParam(config);
       if (config.clickType) {
         params.double = config.clickType === 'double';
       }
     } else if (actionType === 'type') {
-      params.selector = parseSelector(config.selector as string);
+      params.selector = selectorParam(config);
       params.text = config.text || '';
     } else if (actionType === 'wait') {
       const waitType = config.waitType as string || 'time';
@@ -106,11 +106,11 @@ function transformNode(node: Node, allNodes: Node[], allEdges: Edge[]): AgentNod
       if (waitType === 'time') {
         params.seconds = config.duration || 1;
       } else {
-        params.selector = parseSelector(config.selector as string);
+        params.selector = selectorParam(config);
         params.timeout = config.timeout || 30;
       }
     } else if (actionType === 'read-text' || actionType === 'extract') {
-      params.selector = parseSelector(config.selector as string);
+      params.selector = selectorParam(config);
       params.variableName = config.variableName || 'text';
     } else if (actionType === 'navigate') {
       params.url = config.url || '';
@@ -199,6 +199,22 @@ function transformEdges(edges: Edge[]): AgentEdge[] {
   }));
 }
 
+/**
+ * Selector de una acción para el agente
+ * Si el selector viene del picker con estrategias alternativas, se envían
+ * todas como lista de strings: el agente las parsea y las prueba en el
+ * orden aprendido. Si el selector se editó a mano (ya no coincide con la
+ * primera alternativa), se envía solo el selector.
+ */
+function selectorParam(config: Record<string, unknown>): unknown {
+  const selector = ((config.selector as string | undefined) || '').trim();
+  const alternatives = config.selectorAlternatives;
+  if (Array.isArray(alternatives) && alternatives.length > 1 && alternatives[0] === selector) {
+    return alternatives;
+  }
+  return parseSelector(selector);
+}
+
 /**
  * Parsea un selector string a objeto selector del agente
  * El agente espera un objeto con auto_id, title, control_type, class_name
@@ -68,6 +68,8 @@ export interface PickerResult {
   status: 'success' | 'error';
   /** Selector generado (ej: "auto_id:btnGuardar") */
   selector?: string;
+  /** Estrategias alternativas en orden de prioridad; la primera es `selector` */
+  alternatives?: string[];
   /** Propiedades del elemento */
   properties?: ElementProperties;
   /** Screenshot del elemento en Base64 */
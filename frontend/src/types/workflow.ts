@@ -25,6 +25,7 @@ export interface BaseActionConfig {
 export interface ClickActionConfig extends BaseActionConfig {
   type: 'click';
   selector: string;
+  selectorAlternatives?: string[]; // Estrategias capturadas por el picker (la primera es selector)
   clickType?: 'left' | 'right' | 'double';
   waitAfter?: number; // segundos
   continueOnError?: boolean;
@@ -33,6 +34,7 @@ export interface ClickActionConfig extends BaseActionConfig {
 export interface TypeActionConfig extends BaseActionConfig {
   type: 'type';
   selector: string;
+  selectorAlternatives?: string[]; // Estrategias capturadas por el picker (la primera es selector)
   text: string; // Puede contener {{variables}}
   clearBefore?: boolean;
   humanLike?: boolean;
@@ -44,6 +46,7 @@ export interface WaitActionConfig extends BaseActionConfig {
   waitType: 'time' | 'element-appear' | 'element-disappear';
   duration?: number; // segundos (si waitType === 'time')
   selector?: string; // (si waitType === 'element-*')
+  selectorAlternatives?: string[]; // Estrategias capturadas por el picker (la primera es selector)
   timeout?: number; // segundos máximo a esperar
 }
 
@@ -57,6 +60,7 @@ export interface NavigateActionConfig extends BaseActionConfig {
 export interface ExtractActionConfig extends BaseActionConfig {
   type: 'extract';
   selector: string;
+  selectorAlternatives?: string[]; // Estrategias capturadas por el picker (la primera es selector)
   variableName: string;
   trimSpaces?: boolean;
 }
@@ -96,6 +100,7 @@ export interface IfElseActionConfig extends BaseActionConfig {
 export interface ReadTextActionConfig extends BaseActionConfig {
   type: 'read-text';
   selector: string;
+  selectorAlternatives?: string[]; // Estrategias capturadas por el picker (la primera es selector)
   variableName: string;
   trimSpaces?: boolean;
 }